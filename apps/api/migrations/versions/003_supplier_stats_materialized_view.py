@@ -0,0 +1,42 @@
+"""Add per-day supplier statistics materialized view
+
+Revision ID: 003_supplier_stats_mv
+Revises: c6b9af8654a7
+Create Date: 2025-08-25 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '003_supplier_stats_mv'
+down_revision = 'c6b9af8654a7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Pre-aggregated supplier totals per day for the stats dashboard.
+    # Refreshed out-of-band by `flask refresh-supplier-stats`.
+    op.execute("""
+        CREATE MATERIALIZED VIEW mv_supplier_daily_stats AS
+        SELECT
+            supplier,
+            date_trunc('day', created_at)::date AS day,
+            COUNT(*) AS registrations,
+            SUM(weight) AS total_weight
+        FROM weight_registrations
+        WHERE deleted_at IS NULL
+        GROUP BY supplier, date_trunc('day', created_at)::date
+    """)
+
+    # REFRESH ... CONCURRENTLY requires a unique index on the view
+    op.execute(
+        'CREATE UNIQUE INDEX ux_mv_supplier_daily_stats_supplier_day '
+        'ON mv_supplier_daily_stats (supplier, day)'
+    )
+
+
+def downgrade():
+    op.execute('DROP MATERIALIZED VIEW IF EXISTS mv_supplier_daily_stats')
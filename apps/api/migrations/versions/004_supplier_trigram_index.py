@@ -0,0 +1,33 @@
+"""Add trigram index for supplier substring search
+
+Revision ID: 004_supplier_trgm
+Revises: 003_supplier_stats_mv
+Create Date: 2025-08-25 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '004_supplier_trgm'
+down_revision = '003_supplier_stats_mv'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        op.execute(
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_wr_supplier_trgm '
+            'ON weight_registrations USING gin (lower(supplier) gin_trgm_ops) '
+            'WHERE deleted_at IS NULL'
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.execute('DROP INDEX CONCURRENTLY IF EXISTS ix_wr_supplier_trgm')
@@ -0,0 +1,41 @@
+"""Add (created_at, id) keyset index for streamed exports
+
+Revision ID: 005_keyset_index
+Revises: 004_supplier_trgm
+Create Date: 2025-08-26 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '005_keyset_index'
+down_revision = '004_supplier_trgm'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The CSV export streams in keyset batches:
+    #   WHERE (created_at, id) < (:last_created_at, :last_id)
+    #   ORDER BY created_at DESC, id DESC LIMIT 1000
+    # Matching the index order lets each batch be an index range walk with
+    # no sort node, however deep into the export it is.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_wr_created_at_id',
+            'weight_registrations',
+            [sa.text('created_at DESC'), sa.text('id DESC')],
+            unique=False,
+            postgresql_concurrently=True
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_wr_created_at_id',
+            table_name='weight_registrations',
+            postgresql_concurrently=True
+        )
@@ -0,0 +1,68 @@
+"""Add covering and composite indexes for report filter predicates
+
+Revision ID: 006_report_covering_idx
+Revises: 005_keyset_index
+Create Date: 2025-08-27 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '006_report_covering_idx'
+down_revision = '005_keyset_index'
+branch_labels = None
+depends_on = None
+
+
+# (name, columns) for the equality + date range filters on reports:
+#   WHERE <column> = :value AND created_at >= :date_from AND created_at < :date_to
+COMPOSITE_INDEXES = (
+    ('ix_wr_supplier_created_at', ['supplier', 'created_at']),
+    ('ix_wr_cut_type_created_at', ['cut_type', 'created_at']),
+    ('ix_wr_registered_by_created_at', ['registered_by', 'created_at']),
+)
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        # The summary aggregations only read created_at plus the included
+        # columns (count(id), sum/avg(weight) grouped by cut_type, supplier
+        # or registered_by), so they can run as index-only scans over the
+        # date range. Keyed DESC to match the newest-first report order;
+        # the CSV export keeps using ix_wr_created_at_id for its
+        # (created_at, id) keyset walk.
+        op.create_index(
+            'ix_wr_created_covering',
+            'weight_registrations',
+            [sa.text('created_at DESC')],
+            unique=False,
+            postgresql_include=['id', 'weight', 'cut_type', 'supplier', 'registered_by', 'sync_status'],
+            postgresql_concurrently=True
+        )
+
+        for name, columns in COMPOSITE_INDEXES:
+            op.create_index(
+                name,
+                'weight_registrations',
+                columns,
+                unique=False,
+                postgresql_concurrently=True
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, _ in reversed(COMPOSITE_INDEXES):
+            op.drop_index(
+                name,
+                table_name='weight_registrations',
+                postgresql_concurrently=True
+            )
+
+        op.drop_index(
+            'ix_wr_created_covering',
+            table_name='weight_registrations',
+            postgresql_concurrently=True
+        )
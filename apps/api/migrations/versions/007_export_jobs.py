@@ -0,0 +1,46 @@
+"""Add export_jobs table for background registration exports
+
+Revision ID: 007_export_jobs
+Revises: 006_report_covering_idx
+Create Date: 2025-08-28 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '007_export_jobs'
+down_revision = '006_report_covering_idx'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('export_jobs',
+    sa.Column('id', sa.UUID(), server_default=sa.text('gen_random_uuid()'), nullable=False),
+    sa.Column('requested_by', sa.UUID(), nullable=False),
+    sa.Column('filters', postgresql.JSON(astext_type=sa.Text()), nullable=False),
+    sa.Column('status', sa.Enum('pending', 'running', 'done', 'error', name='export_job_statuses'), nullable=False),
+    sa.Column('row_count', sa.Integer(), nullable=True),
+    sa.Column('file_id', sa.String(length=255), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('NOW()'), nullable=False),
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['requested_by'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('export_jobs', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_export_jobs_requested_by'), ['requested_by'], unique=False)
+        batch_op.create_index(batch_op.f('ix_export_jobs_status'), ['status'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('export_jobs', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_export_jobs_status'))
+        batch_op.drop_index(batch_op.f('ix_export_jobs_requested_by'))
+
+    op.drop_table('export_jobs')
+    sa.Enum(name='export_job_statuses').drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,61 @@
+"""Index audit logs by (registration_id, timestamp DESC)
+
+Revision ID: 008_audit_reg_ts_idx
+Revises: 007_export_jobs
+Create Date: 2025-08-29 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '008_audit_reg_ts_idx'
+down_revision = '007_export_jobs'
+branch_labels = None
+depends_on = None
+
+
+# Single-column registration_id indexes made redundant by the composite one
+REDUNDANT_INDEXES = ('idx_audit_registration_id', 'ix_registration_audit_logs_registration_id')
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        # A registration's audit history:
+        #   WHERE registration_id = :id ORDER BY timestamp DESC
+        # is an index range walk with no sort node. registration_id is the
+        # leading column, so the two single-column indexes on it only cost
+        # writes and can go.
+        op.create_index(
+            'ix_audit_registration_timestamp',
+            'registration_audit_logs',
+            ['registration_id', sa.text('timestamp DESC')],
+            unique=False,
+            postgresql_concurrently=True
+        )
+
+        for name in REDUNDANT_INDEXES:
+            op.drop_index(
+                name,
+                table_name='registration_audit_logs',
+                postgresql_concurrently=True
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name in reversed(REDUNDANT_INDEXES):
+            op.create_index(
+                name,
+                'registration_audit_logs',
+                ['registration_id'],
+                unique=False,
+                postgresql_concurrently=True
+            )
+
+        op.drop_index(
+            'ix_audit_registration_timestamp',
+            table_name='registration_audit_logs',
+            postgresql_concurrently=True
+        )
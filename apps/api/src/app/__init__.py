@@ -81,6 +81,12 @@ def create_app(config_name=None):
     app.cli.add_command(clear_all)
     app.cli.add_command(seed_users_only)
     
+    from app.services.supplier_stats import refresh_supplier_stats_command
+    app.cli.add_command(refresh_supplier_stats_command)
+    
+    from app.services.export_jobs import export_worker_command
+    app.cli.add_command(export_worker_command)
+    
     # Register blueprints
     from app.routes.health import health_bp
     from app.routes.api_v1 import api_v1_bp
@@ -3,23 +3,98 @@ import os
 from datetime import timedelta
 from typing import Type
 
+import orjson
+
+
+def normalize_database_url(url: str) -> str:
+    """Point PostgreSQL URLs at the psycopg (v3) driver.
+    
+    Also fixes Heroku's legacy postgres:// scheme, which SQLAlchemy rejects.
+    
+    Args:
+        url (str): Database URL from the environment
+        
+    Returns:
+        str: URL usable by SQLAlchemy
+    """
+    if url and url.startswith('postgres://'):
+        url = url.replace('postgres://', 'postgresql://', 1)
+    if url and url.startswith('postgresql://'):
+        url = url.replace('postgresql://', 'postgresql+psycopg://', 1)
+    return url
+
+
+def _json_serializer(value) -> str:
+    """Encode a JSON column value with orjson.
+    
+    Args:
+        value: Value bound to a JSON column
+        
+    Returns:
+        str: JSON document text
+    """
+    return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS).decode()
+
+
+def build_engine_options(url: str) -> dict:
+    """Build SQLAlchemy engine options for the given database URL.
+    
+    PostgreSQL connections use server-side prepared statements from the
+    first execution (prepare_threshold=0) so the planner does not re-plan
+    the hot aggregate queries on every request.
+    
+    The pool is sized for concurrent export and summary requests. LIFO
+    checkout keeps a small set of connections hot and lets the rest idle
+    out; pre-ping and recycling drop connections the server has closed.
+    
+    JSON columns (audit log changes, export job filters) are encoded and
+    decoded with orjson instead of the stdlib json module.
+    
+    Args:
+        url (str): Normalized database URL
+        
+    Returns:
+        dict: Options passed to create_engine
+    """
+    if not url or not url.startswith('postgresql+psycopg://'):
+        return {}
+    
+    return {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', '20')),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', '10')),
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', '1800')),
+        'pool_pre_ping': True,
+        'pool_use_lifo': True,
+        'json_serializer': _json_serializer,
+        'json_deserializer': orjson.loads,
+        'connect_args': {
+            'prepare_threshold': int(os.environ.get('DB_PREPARE_THRESHOLD', '0'))
+        }
+    }
+
 
 class Config:
     """Base configuration class."""
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
-    DATABASE_URL = os.environ.get('DATABASE_URL') or 'postgresql://josedasilva@localhost/recepcion_db'
-    
-    # Fix Heroku postgres:// URL to postgresql:// for SQLAlchemy compatibility
-    if DATABASE_URL and DATABASE_URL.startswith('postgres://'):
-        DATABASE_URL = DATABASE_URL.replace('postgres://', 'postgresql://', 1)
+    DATABASE_URL = normalize_database_url(
+        os.environ.get('DATABASE_URL') or 'postgresql://josedasilva@localhost/recepcion_db'
+    )
     
     SQLALCHEMY_DATABASE_URI = DATABASE_URL
+    SQLALCHEMY_ENGINE_OPTIONS = build_engine_options(DATABASE_URL)
     REDIS_URL = os.environ.get('REDIS_URL') or 'redis://localhost:6379'
     CLOUDINARY_URL = os.environ.get('CLOUDINARY_URL')
     GOOGLE_VISION_API_KEY = os.environ.get('GOOGLE_VISION_API_KEY')
     LOG_LEVEL = os.environ.get('LOG_LEVEL') or 'INFO'
     TESTING = False
     
+    # Serve supervisor top-supplier stats from mv_supplier_daily_stats
+    # (requires migration 003 and a running `flask refresh-supplier-stats`)
+    SUPPLIER_STATS_FROM_VIEW = os.environ.get('SUPPLIER_STATS_FROM_VIEW', 'false').lower() == 'true'
+    
+    # Lifetime in seconds of the signed download links for background exports
+    EXPORT_DOWNLOAD_URL_TTL = int(os.environ.get('EXPORT_DOWNLOAD_URL_TTL', '3600'))
+    
     # Session configuration for Flask-Session with Redis
     SESSION_TYPE = 'redis'
     SESSION_PERMANENT = True
@@ -42,13 +117,12 @@ class DevelopmentConfig(Config):
 class TestingConfig(Config):
     """Testing environment configuration."""
     TESTING = True
-    DATABASE_URL = os.environ.get('TEST_DATABASE_URL') or 'sqlite:///:memory:'
-    
-    # Fix Heroku postgres:// URL to postgresql:// for SQLAlchemy compatibility
-    if DATABASE_URL and DATABASE_URL.startswith('postgres://'):
-        DATABASE_URL = DATABASE_URL.replace('postgres://', 'postgresql://', 1)
+    DATABASE_URL = normalize_database_url(
+        os.environ.get('TEST_DATABASE_URL') or 'sqlite:///:memory:'
+    )
     
     SQLALCHEMY_DATABASE_URI = DATABASE_URL
+    SQLALCHEMY_ENGINE_OPTIONS = build_engine_options(DATABASE_URL)
     WTF_CSRF_ENABLED = False
     
     # Use in-memory Redis for testing
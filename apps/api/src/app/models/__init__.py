@@ -6,6 +6,7 @@ from app import db
 from .user import User
 from .registration import WeightRegistration
 from .ocr_log import OCRProcessingLog
+from .export_job import ExportJob
 
 # Make models available at package level
-__all__ = ['db', 'User', 'WeightRegistration', 'OCRProcessingLog']
\ No newline at end of file
+__all__ = ['db', 'User', 'WeightRegistration', 'OCRProcessingLog', 'ExportJob']
\ No newline at end of file
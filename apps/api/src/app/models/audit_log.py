@@ -16,7 +16,7 @@ class RegistrationAuditLog(db.Model):
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid4, server_default=db.text('gen_random_uuid()'))
     
     # Reference to registration
-    registration_id = Column(UUID(as_uuid=True), nullable=False, index=True)
+    registration_id = Column(UUID(as_uuid=True), nullable=False)
     
     # Action performed
     action = Column(SQLEnum('CREATE', 'UPDATE', 'DELETE', name='audit_actions'), nullable=False)
@@ -39,7 +39,9 @@ class RegistrationAuditLog(db.Model):
     
     # Table constraints and indexes
     __table_args__ = (
-        Index('idx_audit_registration_id', 'registration_id'),
+        # A registration's history, newest first; also serves plain
+        # registration_id lookups as the leading column
+        Index('ix_audit_registration_timestamp', 'registration_id', timestamp.desc()),
         Index('idx_audit_user_id', 'user_id'),
         Index('idx_audit_timestamp', 'timestamp'),
         Index('idx_audit_action', 'action'),
@@ -0,0 +1,59 @@
+"""ExportJob model for background registration exports."""
+from datetime import datetime
+from uuid import uuid4
+from sqlalchemy import Column, String, DateTime, Integer, Text, ForeignKey, Enum as SQLEnum
+from sqlalchemy.dialects.postgresql import UUID, JSON
+from sqlalchemy.orm import relationship
+from . import db
+
+
+class ExportJob(db.Model):
+    """Registration export requested by a supervisor and built by the export worker."""
+
+    __tablename__ = 'export_jobs'
+
+    # Primary key
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid4, server_default=db.text('gen_random_uuid()'))
+
+    # Requester and export filters (same keys as GET /reports/export)
+    requested_by = Column(UUID(as_uuid=True), ForeignKey('users.id'), nullable=False, index=True)
+    filters = Column(JSON, nullable=False, default=dict)
+
+    # Processing state
+    status = Column(SQLEnum('pending', 'running', 'done', 'error', name='export_job_statuses'),
+                    nullable=False, default='pending', index=True)
+    row_count = Column(Integer, nullable=True)
+    file_id = Column(String(255), nullable=True)  # Cloudinary public_id of the gzipped CSV
+    error = Column(Text, nullable=True)
+
+    # Timestamps
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow, server_default=db.text('NOW()'))
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+    # Relationships
+    user = relationship('User', foreign_keys=[requested_by])
+
+    def __init__(self, requested_by, filters=None):
+        """Initialize ExportJob instance."""
+        self.requested_by = requested_by
+        self.filters = filters or {}
+        self.status = 'pending'
+
+    def __repr__(self):
+        """String representation of ExportJob."""
+        return f'<ExportJob {self.id} {self.status}>'
+
+    def to_dict(self):
+        """Convert ExportJob instance to dictionary."""
+        return {
+            'id': str(self.id),
+            'requested_by': str(self.requested_by),
+            'filters': self.filters,
+            'status': self.status,
+            'row_count': self.row_count,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
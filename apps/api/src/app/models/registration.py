@@ -9,6 +9,10 @@ from sqlalchemy.orm import relationship
 from flask_sqlalchemy import SQLAlchemy
 from . import db
 
+# Valid cut types, in display order
+CUT_TYPES = ('jamón', 'chuleta')
+VALID_CUT_TYPES = frozenset(CUT_TYPES)
+
 
 class WeightRegistration(db.Model):
     """WeightRegistration model for storing meat reception weight data with full traceability."""
@@ -20,7 +24,7 @@ class WeightRegistration(db.Model):
     
     # Weight and meat data
     weight = Column(DECIMAL(8, 3), nullable=False)
-    cut_type = Column(SQLEnum('jamón', 'chuleta', name='cut_types'), nullable=False)
+    cut_type = Column(SQLEnum(*CUT_TYPES, name='cut_types'), nullable=False)
     supplier = Column(String(255), nullable=False, index=True)
     
     # User relationship and photo
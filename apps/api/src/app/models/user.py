@@ -3,9 +3,14 @@ from datetime import datetime
 from app import db
 from sqlalchemy import Column, String, Boolean, DateTime, text
 from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import relationship
 from flask_login import UserMixin
 import uuid
 
+# Valid user roles, in display order
+USER_ROLES = ('operator', 'supervisor')
+VALID_ROLES = frozenset(USER_ROLES)
+
 
 class User(UserMixin, db.Model):
     """User model representing operators and supervisors in the meat reception system."""
@@ -25,6 +30,10 @@ class User(UserMixin, db.Model):
     created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
     last_login = Column(DateTime, nullable=True)
     
+    # Lado inverso de WeightRegistration.user; to_dict() no lo serializa
+    registrations = relationship('WeightRegistration', back_populates='user',
+                                 foreign_keys='WeightRegistration.registered_by')
+    
     def __init__(self, name, role='operator'):
         self.name = name
         self.role = role
@@ -2,15 +2,20 @@
 import re
 from datetime import datetime, timedelta
 from collections import defaultdict
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, request, current_app
 from flask_login import login_user, logout_user, current_user, login_required
 from sqlalchemy.exc import SQLAlchemyError
 from app.models.user import User
 from app.models import db
+from app.utils.json_response import error_response, ojsonify
 
 # Simple in-memory rate limiting storage
 login_attempts = defaultdict(list)
 
+# Largest login body worth parsing: a 255-character name, even with every
+# character \u-escaped, fits well within this
+MAX_LOGIN_BODY_SIZE = 4 * 1024
+
 auth_bp = Blueprint('auth', __name__, url_prefix='/api/v1/auth')
 
 def check_rate_limit(ip_address, max_attempts=10, window_minutes=1):
@@ -72,79 +77,41 @@ def login():
         client_ip = request.remote_addr or 'unknown'
         if not check_rate_limit(client_ip):
             current_app.logger.warning(f"Rate limit exceeded for IP: {client_ip}")
-            return jsonify({
-                'error': {
-                    'code': 'RATE_LIMIT_EXCEEDED',
-                    'message': 'Too many login attempts. Please try again later.',
-                    'timestamp': datetime.utcnow().isoformat(),
-                    'requestId': request.headers.get('X-Request-ID', 'unknown')
-                }
-            }), 429
+            return error_response('RATE_LIMIT_EXCEEDED', 'Too many login attempts. Please try again later.', 429)
         
         if not request.is_json:
-            return jsonify({
-                'error': {
-                    'code': 'INVALID_REQUEST',
-                    'message': 'Request must be JSON',
-                    'timestamp': datetime.utcnow().isoformat(),
-                    'requestId': request.headers.get('X-Request-ID', 'unknown')
-                }
-            }), 400
+            return error_response('INVALID_REQUEST', 'Request must be JSON', 400)
+        
+        # Reject oversized bodies before reading and decoding them
+        if request.content_length and request.content_length > MAX_LOGIN_BODY_SIZE:
+            return error_response('PAYLOAD_TOO_LARGE', 'Request body is too large', 413)
         
         data = request.get_json()
         name = data.get('name', '')
         
         name = sanitize_name_input(name)
         if not name:
-            return jsonify({
-                'error': {
-                    'code': 'VALIDATION_ERROR',
-                    'message': 'Name is required and must contain only valid characters',
-                    'timestamp': datetime.utcnow().isoformat(),
-                    'requestId': request.headers.get('X-Request-ID', 'unknown')
-                }
-            }), 400
+            return error_response('VALIDATION_ERROR', 'Name is required and must contain only valid characters', 400)
         
         if len(name) > 255:
-            return jsonify({
-                'error': {
-                    'code': 'VALIDATION_ERROR',
-                    'message': 'Name must be 255 characters or less',
-                    'timestamp': datetime.utcnow().isoformat(),
-                    'requestId': request.headers.get('X-Request-ID', 'unknown')
-                }
-            }), 400
+            return error_response('VALIDATION_ERROR', 'Name must be 255 characters or less', 400)
         
         user = User.query.filter_by(name=name).first()
         
         if not user:
             current_app.logger.warning(f"Login attempt for non-existent user: {name}")
-            return jsonify({
-                'error': {
-                    'code': 'AUTHENTICATION_ERROR',
-                    'message': 'Invalid credentials',
-                    'timestamp': datetime.utcnow().isoformat(),
-                    'requestId': request.headers.get('X-Request-ID', 'unknown')
-                }
-            }), 401
+            return error_response('AUTHENTICATION_ERROR', 'Invalid credentials', 401)
 
         if not user.is_active:
             current_app.logger.warning(f"Login attempt for inactive user: {name}")
-            return jsonify({
-                'error': {
-                    'code': 'AUTHENTICATION_ERROR',
-                    'message': 'Account is inactive',
-                    'timestamp': datetime.utcnow().isoformat(),
-                    'requestId': request.headers.get('X-Request-ID', 'unknown')
-                }
-            }), 401
+            return error_response('AUTHENTICATION_ERROR', 'Account is inactive', 401)
 
         user.last_login = datetime.utcnow()
         db.session.commit()
 
         login_user(user, remember=True, duration=current_app.config['PERMANENT_SESSION_LIFETIME'])
         current_app.logger.info(f"Successful login for user: {name} (ID: {user.id})")
-        return jsonify(user.to_dict()), 200
+        return ojsonify(user.to_dict())
 
     except SQLAlchemyError as e:
         import traceback
@@ -154,27 +121,13 @@ def login():
         if hasattr(e, 'orig'):
             current_app.logger.error(f"DBAPI error origin: {repr(e.orig)}")
         db.session.rollback()
-        return jsonify({
-            'error': {
-                'code': 'DATABASE_ERROR',
-                'message': 'Database operation failed',
-                'timestamp': datetime.utcnow().isoformat(),
-                'requestId': request.headers.get('X-Request-ID', 'unknown')
-            }
-        }), 500
+        return error_response('DATABASE_ERROR', 'Database operation failed', 500)
 
     except Exception as e:
         import traceback
         tb = traceback.format_exc()
         current_app.logger.error(f"Unexpected error during login: {str(e)}\n{tb}")
-        return jsonify({
-            'error': {
-                'code': 'INTERNAL_ERROR',
-                'message': 'Internal server error',
-                'timestamp': datetime.utcnow().isoformat(),
-                'requestId': request.headers.get('X-Request-ID', 'unknown')
-            }
-        }), 500
+        return error_response('INTERNAL_ERROR', 'Internal server error', 500)
 
 @auth_bp.route('/logout', methods=['POST'])
 @login_required
@@ -193,21 +146,14 @@ def logout():
         user_name = current_user.name if current_user.is_authenticated else 'unknown'
         logout_user()
         current_app.logger.info(f"Successful logout for user: {user_name}")
-        return jsonify({
+        return ojsonify({
             'message': 'Logout successful',
             'timestamp': datetime.utcnow().isoformat()
-        }), 200
+        })
         
     except Exception as e:
         current_app.logger.error(f"Unexpected error during logout: {str(e)}")
-        return jsonify({
-            'error': {
-                'code': 'INTERNAL_ERROR',
-                'message': 'Internal server error',
-                'timestamp': datetime.utcnow().isoformat(),
-                'requestId': request.headers.get('X-Request-ID', 'unknown')
-            }
-        }), 500
+        return error_response('INTERNAL_ERROR', 'Internal server error', 500)
 
 @auth_bp.route('/current-user', methods=['GET'])
 @login_required
@@ -224,36 +170,15 @@ def current_user_info():
     """
     try:
         if not current_user.is_authenticated:
-            return jsonify({
-                'error': {
-                    'code': 'AUTHENTICATION_ERROR',
-                    'message': 'Not authenticated',
-                    'timestamp': datetime.utcnow().isoformat(),
-                    'requestId': request.headers.get('X-Request-ID', 'unknown')
-                }
-            }), 401
+            return error_response('AUTHENTICATION_ERROR', 'Not authenticated', 401)
         
-        return jsonify(current_user.to_dict()), 200
+        return ojsonify(current_user.to_dict())
         
     except Exception as e:
         current_app.logger.error(f"Unexpected error getting current user: {str(e)}")
-        return jsonify({
-            'error': {
-                'code': 'INTERNAL_ERROR',
-                'message': 'Internal server error',
-                'timestamp': datetime.utcnow().isoformat(),
-                'requestId': request.headers.get('X-Request-ID', 'unknown')
-            }
-        }), 500
+        return error_response('INTERNAL_ERROR', 'Internal server error', 500)
 
 @auth_bp.errorhandler(401)
 def unauthorized(error):
     """Handle unauthorized access attempts."""
-    return jsonify({
-        'error': {
-            'code': 'AUTHENTICATION_ERROR',
-            'message': 'Authentication required',
-            'timestamp': datetime.utcnow().isoformat(),
-            'requestId': request.headers.get('X-Request-ID', 'unknown')
-        }
-    }), 401
\ No newline at end of file
+    return error_response('AUTHENTICATION_ERROR', 'Authentication required', 401)
\ No newline at end of file
@@ -3,6 +3,7 @@ from datetime import datetime, date, timedelta
 from flask import Blueprint, jsonify, current_app
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy import func, and_
+from sqlalchemy.orm import joinedload
 from app.models.registration import WeightRegistration
 from app.models.user import User
 from app.models import db
@@ -98,7 +99,9 @@ def get_dashboard_stats():
         ]
         
         # Recent registrations (last 10)
-        recent_registrations = WeightRegistration.query.order_by(
+        recent_registrations = WeightRegistration.query.options(
+            joinedload(WeightRegistration.user)
+        ).order_by(
             WeightRegistration.created_at.desc()
         ).limit(10).all()
         
@@ -1,22 +1,100 @@
 """Weight registration routes for creating and managing weight entries."""
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 from decimal import Decimal
 import re
 from urllib.parse import urlparse
 from flask import Blueprint, request, jsonify, current_app
 from flask_login import current_user
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy import and_, func, or_
-from app.models.registration import WeightRegistration
+from sqlalchemy import and_, bindparam, func, literal_column, or_, select
+from sqlalchemy.orm import joinedload
+from app.models.registration import WeightRegistration, CUT_TYPES, VALID_CUT_TYPES
+from app.models.user import User
 from app.models import db
 from app.middleware.auth_middleware import operator_or_supervisor_required, supervisor_only
+from app.services.supplier_stats import top_suppliers_from_view
 from app.utils.audit import log_registration_action, calculate_changes
-from app.utils.pagination import apply_cursor_pagination, get_pagination_params, create_pagination_response
+from app.utils.pagination import (
+    CURSOR_ORDER_FIELDS, apply_cursor_pagination, get_cursor_value, get_pagination_params,
+    create_pagination_response
+)
 from app.utils.rate_limiting import rate_limit
+from app.utils.json_response import ojsonify
+from app.utils.serialization import REGISTRATION_ROW_COLUMNS, serialize_registration_row
+from app.utils.dates import parse_ymd
 
 # Create registrations blueprint
 registrations_bp = Blueprint('registrations', __name__, url_prefix='/api/v1/registrations')
 
+_ONE_DAY = timedelta(days=1)
+
+_CUT_TYPE_CHOICES = ', '.join(CUT_TYPES)
+
+# date_trunc units for the stats endpoint's grouping parameter
+_GROUPING_UNITS = {
+    'daily': 'day',
+    'weekly': 'week',
+    'monthly': 'month'
+}
+
+def _build_stats_statements(operator_scoped):
+    """Build the aggregate statements used by get_registration_stats.
+    
+    Statements are built once at import time for each scope so the request
+    path only binds parameters (date_from, date_to and, when scoped,
+    user_id) instead of composing and re-hashing queries per request.
+    
+    Args:
+        operator_scoped: Whether to restrict rows to registered_by == :user_id
+        
+    Returns:
+        Dictionary of prepared select statements
+    """
+    criteria = [
+        WeightRegistration.created_at >= bindparam('date_from'),
+        WeightRegistration.created_at <= bindparam('date_to'),
+        WeightRegistration.deleted_at.is_(None)
+    ]
+    if operator_scoped:
+        criteria.append(WeightRegistration.registered_by == bindparam('user_id'))
+    where = and_(*criteria)
+    
+    count = func.count(WeightRegistration.id)
+    total_weight = func.sum(WeightRegistration.weight)
+    
+    statements = {
+        'totals': select(count, total_weight).where(where),
+        'by_cut_type': select(
+            WeightRegistration.cut_type, count, total_weight
+        ).where(where).group_by(WeightRegistration.cut_type),
+        'by_supplier': select(
+            WeightRegistration.supplier, count, total_weight
+        ).where(where).group_by(WeightRegistration.supplier).order_by(
+            total_weight.desc()
+        ).limit(5)
+    }
+    
+    # Time series bucketed by each grouping. A single GROUP BY
+    # (bucket, cut_type) returns every bucket in one round-trip.
+    for grouping, unit in _GROUPING_UNITS.items():
+        bucket = func.date_trunc(
+            literal_column(f"'{unit}'"),
+            WeightRegistration.created_at,
+            type_=db.DateTime
+        ).label('bucket')
+        statements[('time_series', grouping)] = select(
+            bucket, WeightRegistration.cut_type, count, total_weight
+        ).where(where).group_by(bucket, WeightRegistration.cut_type).order_by(bucket)
+    
+    return statements
+
+
+# Stats statements keyed by operator scoping (True: operator, False: global)
+_STATS_STATEMENTS = {
+    True: _build_stats_statements(operator_scoped=True),
+    False: _build_stats_statements(operator_scoped=False)
+}
+
 
 def validate_photo_url(url):
     """Validate photo URL for security and format.
@@ -74,6 +152,23 @@ def validate_photo_url(url):
     return True, None
 
 
+def _get_live_registration(registration_id):
+    """Look up a registration by primary key, ignoring soft-deleted ones.
+    
+    Uses the session identity map before falling back to a primary-key SELECT.
+    
+    Args:
+        registration_id: UUID of the registration
+        
+    Returns:
+        WeightRegistration, or None if missing or soft deleted
+    """
+    registration = db.session.get(WeightRegistration, registration_id)
+    if registration is None or registration.deleted_at is not None:
+        return None
+    return registration
+
+
 @registrations_bp.route('', methods=['POST'])
 @operator_or_supervisor_required
 def create_registration():
@@ -135,12 +230,11 @@ def create_registration():
             }), 400
         
         # Validate cut_type
-        valid_cut_types = ['jamón', 'chuleta']
-        if data['cut_type'] not in valid_cut_types:
+        if data['cut_type'] not in VALID_CUT_TYPES:
             return jsonify({
                 'error': {
                     'code': 'VALIDATION_ERROR',
-                    'message': f'Cut type must be one of: {", ".join(valid_cut_types)}',
+                    'message': f'Cut type must be one of: {_CUT_TYPE_CHOICES}',
                     'timestamp': datetime.utcnow().isoformat(),
                     'requestId': request.headers.get('X-Request-ID', 'unknown')
                 }
@@ -196,11 +290,17 @@ def create_registration():
         )
         
         db.session.add(registration)
+        # Flush to assign the id; the audit INSERT would flush it anyway
+        db.session.flush()
+        
+        # Record the audit entry in the same transaction as the insert
+        log_registration_action(registration.id, 'CREATE', None)
+        
         db.session.commit()
         
         current_app.logger.info(f"Registration created by user {current_user.name} (ID: {current_user.id})")
         
-        return jsonify(registration.to_dict()), 201
+        return ojsonify(registration.to_dict(), 201)
         
     except SQLAlchemyError as e:
         current_app.logger.error(f"Database error creating registration: {str(e)}")
@@ -323,12 +423,11 @@ def list_registrations():
             query = query.filter(WeightRegistration.supplier.ilike(f'%{supplier}%'))
         
         if cut_type:
-            valid_cut_types = ['jamón', 'chuleta']
-            if cut_type not in valid_cut_types:
+            if cut_type not in VALID_CUT_TYPES:
                 return jsonify({
                     'error': {
                         'code': 'VALIDATION_ERROR',
-                        'message': f'Invalid cut_type. Must be one of: {", ".join(valid_cut_types)}',
+                        'message': f'Invalid cut_type. Must be one of: {_CUT_TYPE_CHOICES}',
                         'timestamp': datetime.utcnow().isoformat(),
                         'requestId': request.headers.get('X-Request-ID', 'unknown')
                     }
@@ -338,7 +437,7 @@ def list_registrations():
         # Apply date filters
         if date_from:
             try:
-                date_from_obj = datetime.strptime(date_from, '%Y-%m-%d').date()
+                date_from_obj = parse_ymd(date_from)
                 query = query.filter(WeightRegistration.created_at >= date_from_obj)
             except ValueError:
                 return jsonify({
@@ -352,7 +451,7 @@ def list_registrations():
         
         if date_to:
             try:
-                date_to_obj = datetime.strptime(date_to, '%Y-%m-%d').date()
+                date_to_obj = parse_ymd(date_to)
                 # Add one day to include the entire date_to day
                 query = query.filter(WeightRegistration.created_at < date_to_obj)
             except ValueError:
@@ -371,8 +470,10 @@ def list_registrations():
         # Get total count for pagination
         total_count = query.count()
         
-        # Apply pagination
-        registrations = query.offset((page - 1) * limit).limit(limit).all()
+        # Apply pagination; to_dict() serializes reg.user, so load it in the same query
+        registrations = query.options(
+            joinedload(WeightRegistration.user)
+        ).offset((page - 1) * limit).limit(limit).all()
         
         # Calculate total weight for current filter
         weight_sum_query = WeightRegistration.query
@@ -419,7 +520,7 @@ def list_registrations():
             'has_prev': page > 1
         }
         
-        return jsonify(response_data), 200
+        return ojsonify(response_data)
         
     except SQLAlchemyError as e:
         current_app.logger.error(f"Database error listing registrations: {str(e)}")
@@ -475,8 +576,10 @@ def today_registrations():
         if current_user.role == 'operator':
             query = query.filter(WeightRegistration.registered_by == current_user.id)
         
-        # Order by most recent first
-        registrations = query.order_by(WeightRegistration.created_at.desc()).all()
+        # Order by most recent first; to_dict() serializes reg.user, so load it in the same query
+        registrations = query.options(
+            joinedload(WeightRegistration.user)
+        ).order_by(WeightRegistration.created_at.desc()).all()
         
         # Calculate summary statistics
         total_count = len(registrations)
@@ -511,7 +614,7 @@ def today_registrations():
             'date': today.isoformat()
         }
         
-        return jsonify(response_data), 200
+        return ojsonify(response_data)
         
     except Exception as e:
         current_app.logger.error(f"Unexpected error getting today's registrations: {str(e)}")
@@ -552,7 +655,7 @@ def get_registration(registration_id):
                 }
             }), 403
         
-        return jsonify(registration.to_dict()), 200
+        return ojsonify(registration.to_dict())
         
     except Exception as e:
         current_app.logger.error(f"Unexpected error getting registration {registration_id}: {str(e)}")
@@ -607,12 +710,7 @@ def update_registration(registration_id):
         data = request.get_json()
         
         # Find the registration
-        registration = WeightRegistration.query.filter(
-            and_(
-                WeightRegistration.id == registration_id,
-                WeightRegistration.deleted_at.is_(None)  # Exclude soft deleted
-            )
-        ).first()
+        registration = _get_live_registration(registration_id)
         
         if not registration:
             return jsonify({
@@ -649,12 +747,11 @@ def update_registration(registration_id):
                 }), 400
         
         if 'cut_type' in data:
-            valid_cut_types = ['jamón', 'chuleta']
-            if data['cut_type'] not in valid_cut_types:
+            if data['cut_type'] not in VALID_CUT_TYPES:
                 return jsonify({
                     'error': {
                         'code': 'VALIDATION_ERROR',
-                        'message': f'Tipo de corte debe ser uno de: {", ".join(valid_cut_types)}',
+                        'message': f'Tipo de corte debe ser uno de: {_CUT_TYPE_CHOICES}',
                         'timestamp': datetime.utcnow().isoformat(),
                         'requestId': request.headers.get('X-Request-ID', 'unknown')
                     }
@@ -716,21 +813,21 @@ def update_registration(registration_id):
         registration.update_reason = data.get('update_reason', 'manual_update')
         registration.updated_at = datetime.utcnow()
         
-        db.session.commit()
-        
-        # Log the update action
+        # Record the audit entry in the same transaction as the update
         log_registration_action(registration.id, 'UPDATE', changes)
         
+        db.session.commit()
+        
         current_app.logger.info(f"Registration {registration_id} updated by user {current_user.name} (ID: {current_user.id})")
         
-        return jsonify({
+        return ojsonify({
             'registration': registration.to_dict(),
             'metadata': {
                 'updated_by': str(current_user.id),
                 'update_reason': registration.update_reason,
                 'changes': changes
             }
-        }), 200
+        })
         
     except SQLAlchemyError as e:
         current_app.logger.error(f"Database error updating registration {registration_id}: {str(e)}")
@@ -772,12 +869,7 @@ def delete_registration(registration_id):
     """
     try:
         # Find the registration
-        registration = WeightRegistration.query.filter(
-            and_(
-                WeightRegistration.id == registration_id,
-                WeightRegistration.deleted_at.is_(None)  # Exclude already deleted
-            )
-        ).first()
+        registration = _get_live_registration(registration_id)
         
         if not registration:
             return jsonify({
@@ -792,11 +884,11 @@ def delete_registration(registration_id):
         # Perform soft delete
         registration.soft_delete(current_user.id)
         
-        db.session.commit()
-        
-        # Log the delete action
+        # Record the audit entry in the same transaction as the delete
         log_registration_action(registration.id, 'DELETE', {'deleted_by': str(current_user.id)})
         
+        db.session.commit()
+        
         current_app.logger.info(f"Registration {registration_id} deleted by supervisor {current_user.name} (ID: {current_user.id})")
         
         return '', 204
@@ -834,10 +926,10 @@ def get_registration_stats():
     Query parameters:
         - date_from: Start date (YYYY-MM-DD, default: 30 days ago)
         - date_to: End date (YYYY-MM-DD, default: today)
-        - grouping: Grouping level ('daily', 'weekly', 'monthly', default: 'daily')
+        - grouping: Time series bucket size ('daily', 'weekly', 'monthly', default: 'daily')
     
     Returns:
-        200: Statistics object with aggregated data
+        200: Statistics object with aggregated data and time series
         400: Invalid query parameters
         401: Not authenticated
         500: Server error
@@ -853,7 +945,7 @@ def get_registration_stats():
             date_from = datetime.utcnow().date().replace(day=1)  # First day of current month
         else:
             try:
-                date_from = datetime.strptime(date_from_str, '%Y-%m-%d').date()
+                date_from = parse_ymd(date_from_str)
             except ValueError:
                 return jsonify({
                     'error': {
@@ -868,7 +960,7 @@ def get_registration_stats():
             date_to = datetime.utcnow().date()
         else:
             try:
-                date_to = datetime.strptime(date_to_str, '%Y-%m-%d').date()
+                date_to = parse_ymd(date_to_str)
             except ValueError:
                 return jsonify({
                     'error': {
@@ -880,7 +972,7 @@ def get_registration_stats():
                 }), 400
         
         # Validate grouping
-        valid_groupings = ['daily', 'weekly', 'monthly']
+        valid_groupings = list(_GROUPING_UNITS)
         if grouping not in valid_groupings:
             return jsonify({
                 'error': {
@@ -891,52 +983,38 @@ def get_registration_stats():
                 }
             }), 400
         
-        # Base query with date filtering and soft delete exclusion
-        base_query = WeightRegistration.query.filter(
-            and_(
-                WeightRegistration.created_at >= date_from,
-                WeightRegistration.created_at <= date_to,
-                WeightRegistration.deleted_at.is_(None)
-            )
-        )
-        
-        # Apply role-based filtering
-        if current_user.role == 'operator':
-            base_query = base_query.filter(WeightRegistration.registered_by == current_user.id)
+        # Pick the pre-built statements for this scope and bind parameters
+        operator_scoped = current_user.role == 'operator'
+        statements = _STATS_STATEMENTS[operator_scoped]
+        params = {'date_from': date_from, 'date_to': date_to}
+        if operator_scoped:
+            params['user_id'] = current_user.id
         
         # Calculate total statistics
-        total_count = base_query.count()
-        total_weight = db.session.query(func.sum(WeightRegistration.weight)).filter(
-            base_query.whereclause
-        ).scalar() or 0
+        total_count, total_weight = db.session.execute(statements['totals'], params).one()
+        total_weight = total_weight or 0
         
         average_weight = float(total_weight / total_count) if total_count > 0 else 0
         
         # Calculate statistics by cut type
-        cut_type_stats = {}
-        for cut_type in ['jamón', 'chuleta']:
-            cut_query = base_query.filter(WeightRegistration.cut_type == cut_type)
-            cut_count = cut_query.count()
-            cut_weight = db.session.query(func.sum(WeightRegistration.weight)).filter(
-                cut_query.whereclause
-            ).scalar() or 0
-            
+        cut_type_stats = {
+            cut_type: {'count': 0, 'total_weight': 0.0, 'average_weight': 0}
+            for cut_type in CUT_TYPES
+        }
+        for cut_type, cut_count, cut_weight in db.session.execute(statements['by_cut_type'], params):
+            cut_weight = cut_weight or 0
             cut_type_stats[cut_type] = {
                 'count': cut_count,
                 'total_weight': float(cut_weight),
                 'average_weight': float(cut_weight / cut_count) if cut_count > 0 else 0
             }
         
-        # Calculate statistics by supplier (top 5)
-        supplier_stats = db.session.query(
-            WeightRegistration.supplier,
-            func.count(WeightRegistration.id).label('count'),
-            func.sum(WeightRegistration.weight).label('total_weight')
-        ).filter(
-            base_query.whereclause
-        ).group_by(WeightRegistration.supplier).order_by(
-            func.sum(WeightRegistration.weight).desc()
-        ).limit(5).all()
+        # Calculate statistics by supplier (top 5). Unscoped requests read the
+        # pre-aggregated view when enabled instead of grouping live rows.
+        if current_app.config.get('SUPPLIER_STATS_FROM_VIEW') and not operator_scoped:
+            supplier_stats = top_suppliers_from_view(date_from, date_to, limit=5)
+        else:
+            supplier_stats = db.session.execute(statements['by_supplier'], params).all()
         
         supplier_data = {}
         for supplier, count, weight in supplier_stats:
@@ -946,6 +1024,28 @@ def get_registration_stats():
                 'average_weight': float(weight / count) if count > 0 else 0
             }
         
+        # Calculate time series; per-bucket totals are rolled up from the
+        # cut type rows
+        series_rows = db.session.execute(statements[('time_series', grouping)], params)
+        
+        time_series = []
+        for bucket_start, cut_type, count, weight in series_rows:
+            bucket_key = bucket_start.isoformat()
+            if not time_series or time_series[-1]['bucket'] != bucket_key:
+                time_series.append({
+                    'bucket': bucket_key,
+                    'count': 0,
+                    'total_weight': 0.0,
+                    'by_cut_type': {}
+                })
+            entry = time_series[-1]
+            entry['count'] += count
+            entry['total_weight'] += float(weight or 0)
+            entry['by_cut_type'][cut_type] = {
+                'count': count,
+                'total_weight': float(weight or 0)
+            }
+        
         response_data = {
             'stats': {
                 'total_registrations': total_count,
@@ -953,6 +1053,7 @@ def get_registration_stats():
                 'average_weight': round(average_weight, 2),
                 'by_cut_type': cut_type_stats,
                 'by_supplier': supplier_data,
+                'time_series': time_series,
                 'date_range': {
                     'from': date_from.isoformat(),
                     'to': date_to.isoformat(),
@@ -966,7 +1067,7 @@ def get_registration_stats():
             }
         }
         
-        return jsonify(response_data), 200
+        return ojsonify(response_data)
         
     except SQLAlchemyError as e:
         current_app.logger.error(f"Database error calculating statistics: {str(e)}")
@@ -991,6 +1092,22 @@ def get_registration_stats():
         }), 500
 
 
+def _carried_search_totals(cursor):
+    """Get the search totals carried in a pagination cursor.
+    
+    Args:
+        cursor: Cursor string from the previous page (may be None)
+        
+    Returns:
+        Dictionary with count and weight, or None if the cursor has no valid totals
+    """
+    totals = get_cursor_value(cursor, 'totals')
+    try:
+        return {'count': int(totals['count']), 'weight': float(totals['weight'])}
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
 @registrations_bp.route('/search', methods=['GET'])
 @rate_limit(limit=60, window=60, per='user')  # 60 requests per minute per user
 @operator_or_supervisor_required
@@ -998,8 +1115,8 @@ def search_registrations():
     """Advanced search for weight registrations with multiple criteria.
     
     Query parameters:
-        - q: General search query (searches supplier names)
-        - supplier: Exact or partial supplier name match
+        - q: General search query (searches supplier names, min 3 characters)
+        - supplier: Partial supplier name match (min 3 characters)
         - cut_type: Filter by cut type ('jamón' or 'chuleta')
         - min_weight: Minimum weight (kg)
         - max_weight: Maximum weight (kg)
@@ -1009,6 +1126,7 @@ def search_registrations():
         - sort_order: Sort direction ('asc' or 'desc', default: 'desc')
         - cursor: Pagination cursor
         - limit: Items per page (1-100, default: 20)
+        - include_total: '1' to include total_count and the weight summary
     
     Returns:
         200: Search results with pagination
@@ -1030,9 +1148,10 @@ def search_registrations():
         date_to_str = request.args.get('date_to', '').strip()
         sort_by = request.args.get('sort_by', 'created_at')
         sort_order = request.args.get('sort_order', 'desc')
+        include_total = request.args.get('include_total') == '1'
         
         # Validate sort parameters
-        valid_sort_fields = ['weight', 'created_at', 'supplier', 'cut_type']
+        valid_sort_fields = CURSOR_ORDER_FIELDS[WeightRegistration]
         if sort_by not in valid_sort_fields:
             return jsonify({
                 'error': {
@@ -1054,7 +1173,7 @@ def search_registrations():
             }), 400
         
         # Validate cut_type if provided
-        if cut_type and cut_type not in ['jamón', 'chuleta']:
+        if cut_type and cut_type not in VALID_CUT_TYPES:
             return jsonify({
                 'error': {
                     'code': 'INVALID_SEARCH_CRITERIA',
@@ -1095,13 +1214,25 @@ def search_registrations():
                 }
             }), 400
         
+        # Validate search term length (shorter terms cannot use the trigram index)
+        search_term = query_text or supplier
+        if search_term and len(search_term) < 3:
+            return jsonify({
+                'error': {
+                    'code': 'INVALID_SEARCH_CRITERIA',
+                    'message': 'El término de búsqueda debe tener al menos 3 caracteres',
+                    'timestamp': datetime.utcnow().isoformat(),
+                    'requestId': request.headers.get('X-Request-ID', 'unknown')
+                }
+            }), 400
+        
         # Parse dates
         date_from = None
         date_to = None
         
         if date_from_str:
             try:
-                date_from = datetime.strptime(date_from_str, '%Y-%m-%d').date()
+                date_from = parse_ymd(date_from_str)
             except ValueError:
                 return jsonify({
                     'error': {
@@ -1114,7 +1245,7 @@ def search_registrations():
         
         if date_to_str:
             try:
-                date_to = datetime.strptime(date_to_str, '%Y-%m-%d').date()
+                date_to = parse_ymd(date_to_str)
             except ValueError:
                 return jsonify({
                     'error': {
@@ -1125,8 +1256,10 @@ def search_registrations():
                     }
                 }), 400
         
-        # Build base query
-        query = WeightRegistration.query.filter(
+        # Build base query (column rows joined with the registering user)
+        query = db.session.query(*REGISTRATION_ROW_COLUMNS).join(
+            User, WeightRegistration.registered_by == User.id
+        ).filter(
             WeightRegistration.deleted_at.is_(None)  # Exclude soft deleted
         )
         
@@ -1134,10 +1267,12 @@ def search_registrations():
         if current_user.role == 'operator':
             query = query.filter(WeightRegistration.registered_by == current_user.id)
         
-        # Apply search filters
-        if query_text or supplier:
-            search_term = query_text or supplier
-            query = query.filter(WeightRegistration.supplier.ilike(f'%{search_term}%'))
+        # Apply search filters. lower(supplier) matches the ix_wr_supplier_trgm
+        # expression index so substring matches avoid a sequential scan.
+        if search_term:
+            query = query.filter(
+                func.lower(WeightRegistration.supplier).like(f'%{search_term.lower()}%')
+            )
         
         if cut_type:
             query = query.filter(WeightRegistration.cut_type == cut_type)
@@ -1152,9 +1287,22 @@ def search_registrations():
             query = query.filter(WeightRegistration.created_at >= date_from)
         
         if date_to:
-            # Include the entire end date
-            end_datetime = datetime.combine(date_to, datetime.max.time())
-            query = query.filter(WeightRegistration.created_at <= end_datetime)
+            # Include the entire end date (half-open range up to the next day)
+            query = query.filter(WeightRegistration.created_at < date_to + _ONE_DAY)
+        
+        # Totals require scanning every match, so they are opt-in; has_next
+        # already comes from the limit+1 probe. Count and sum share one query,
+        # run on the first page only: the cursor carries them to later pages,
+        # so they reflect the matches when the search started.
+        totals = None
+        if include_total:
+            totals = _carried_search_totals(pagination_params['cursor'])
+            if totals is None:
+                total_count, total_weight = db.session.query(
+                    func.count(WeightRegistration.id),
+                    func.sum(WeightRegistration.weight)
+                ).filter(query.whereclause).one()
+                totals = {'count': total_count, 'weight': float(total_weight or 0)}
         
         # Apply cursor-based pagination
         items, next_cursor, has_next = apply_cursor_pagination(
@@ -1163,28 +1311,16 @@ def search_registrations():
             cursor=pagination_params['cursor'],
             limit=pagination_params['limit'],
             order_by=sort_by,
-            order_dir=sort_order
+            order_dir=sort_order,
+            cursor_extra={'totals': totals} if totals else None
         )
         
-        # Get total count for search results
-        total_count = query.count()
-        
-        # Calculate total weight for current search
-        total_weight = db.session.query(func.sum(WeightRegistration.weight)).filter(
-            query.whereclause
-        ).scalar() or 0
-        
         response_data = {
-            'search_results': [item.to_dict() for item in items],
+            'search_results': [serialize_registration_row(item._mapping) for item in items],
             'pagination': {
                 'has_next': has_next,
                 'next_cursor': next_cursor,
-                'count': len(items),
-                'total_count': total_count
-            },
-            'summary': {
-                'total_weight': float(total_weight),
-                'average_weight': float(total_weight / total_count) if total_count > 0 else 0
+                'count': len(items)
             },
             'search_criteria': {
                 'query': query_text,
@@ -1199,7 +1335,15 @@ def search_registrations():
             }
         }
         
-        return jsonify(response_data), 200
+        if totals:
+            total_count, total_weight = totals['count'], totals['weight']
+            response_data['pagination']['total_count'] = total_count
+            response_data['summary'] = {
+                'total_weight': total_weight,
+                'average_weight': total_weight / total_count if total_count > 0 else 0
+            }
+        
+        return ojsonify(response_data)
         
     except SQLAlchemyError as e:
         current_app.logger.error(f"Database error during search: {str(e)}")
@@ -1273,12 +1417,7 @@ def update_registration_photo(registration_id):
             }), 400
         
         # Find the registration
-        registration = WeightRegistration.query.filter(
-            and_(
-                WeightRegistration.id == registration_id,
-                WeightRegistration.deleted_at.is_(None)  # Exclude soft deleted
-            )
-        ).first()
+        registration = _get_live_registration(registration_id)
         
         if not registration:
             return jsonify({
@@ -1327,23 +1466,15 @@ def update_registration_photo(registration_id):
                     }
                 }), 400
         
-        # Store old photo URL for audit purposes
+        # Store old photo URL for cleanup and the response
         old_photo_url = registration.photo_url
         
-        # Calculate changes for audit log
-        changes = {
-            'photo_url': {
-                'old': old_photo_url,
-                'new': photo_url
-            }
-        }
-        
+        # Calculate changes for audit log; a repeated upload of the same
+        # photo has none
+        new_values = {'photo_url': photo_url}
         if ocr_confidence is not None:
-            old_confidence = float(registration.ocr_confidence) if registration.ocr_confidence else None
-            changes['ocr_confidence'] = {
-                'old': old_confidence,
-                'new': ocr_confidence
-            }
+            new_values['ocr_confidence'] = ocr_confidence
+        changes = calculate_changes(registration, new_values)
         
         # Update the registration
         registration.photo_url = photo_url
@@ -1355,11 +1486,11 @@ def update_registration_photo(registration_id):
         registration.update_reason = data.get('update_reason', 'photo_update')
         registration.updated_at = datetime.utcnow()
         
-        db.session.commit()
-        
-        # Log the update action
+        # Record the audit entry in the same transaction as the update
         log_registration_action(registration.id, 'UPDATE', changes)
         
+        db.session.commit()
+        
         current_app.logger.info(f"Photo updated for registration {registration_id} by user {current_user.name} (ID: {current_user.id})")
         
         # TODO: In production, implement old photo cleanup from storage here
@@ -1367,7 +1498,7 @@ def update_registration_photo(registration_id):
         if old_photo_url and old_photo_url != photo_url:
             current_app.logger.info(f"Old photo URL marked for cleanup: {old_photo_url}")
         
-        return jsonify({
+        return ojsonify({
             'registration': registration.to_dict(),
             'metadata': {
                 'updated_by': str(current_user.id),
@@ -1375,7 +1506,7 @@ def update_registration_photo(registration_id):
                 'old_photo_url': old_photo_url,
                 'changes': changes
             }
-        }), 200
+        })
         
     except SQLAlchemyError as e:
         current_app.logger.error(f"Database error updating photo for registration {registration_id}: {str(e)}")
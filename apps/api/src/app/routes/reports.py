@@ -1,19 +1,41 @@
 """Reports and export routes for supervisor data analysis."""
 import csv
+import hashlib
 import io
+import uuid
+import zlib
+import orjson
 from datetime import datetime, date
-from flask import Blueprint, request, jsonify, current_app, make_response
+from flask import Blueprint, Response, request, jsonify, current_app, stream_with_context
 from flask_login import current_user
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy import and_
-from app.models.registration import WeightRegistration
+from app.models.registration import WeightRegistration, CUT_TYPES, VALID_CUT_TYPES
 from app.models.user import User
+from app.models.export_job import ExportJob
 from app.models import db
 from app.middleware.auth_middleware import supervisor_only
+from app.services.export_jobs import export_download_url
+from app.services.registration_export import (
+    CSV_HEADER,
+    EXPORT_FILTER_KEYS,
+    build_export_statement,
+    csv_row,
+    iter_export_batches
+)
+from app.utils.dates import parse_ymd
+from app.utils.cache import TTLCache
+from app.utils.json_response import error_response, ojsonify
 
 # Create reports blueprint
 reports_bp = Blueprint('reports', __name__, url_prefix='/api/v1/reports')
 
+_CUT_TYPE_CHOICES = ', '.join(CUT_TYPES)
+
+# Rendered /summary bodies keyed by (start_date, end_date, range version).
+# Dashboards poll the same ranges; the TTL bounds staleness of user names.
+_summary_cache = TTLCache(maxsize=256, ttl=60)
+
 
 @reports_bp.route('/export', methods=['GET'])
 @supervisor_only
@@ -26,7 +48,9 @@ def export_registrations():
         - supplier: Filter by supplier name
         - cut_type: Filter by cut type
         - user_id: Filter by user who registered
-        - format: Export format (csv, json) - defaults to csv
+        - format: Export format (csv, ndjson, json) - defaults to csv.
+          json buffers the whole export in one document and is deprecated
+          in favour of ndjson, which streams one registration per line.
     
     Returns:
         200: CSV file with registration data
@@ -35,162 +59,134 @@ def export_registrations():
         403: Insufficient permissions (not supervisor)
     """
     try:
-        # Parse query parameters
-        date_from = request.args.get('date_from', '').strip()
-        date_to = request.args.get('date_to', '').strip()
-        supplier = request.args.get('supplier', '').strip()
-        cut_type = request.args.get('cut_type', '').strip()
-        user_id = request.args.get('user_id', '').strip()
         export_format = request.args.get('format', 'csv').strip().lower()
         
         # Validate export format
-        if export_format not in ['csv', 'json']:
-            return jsonify({
-                'error': {
-                    'code': 'VALIDATION_ERROR',
-                    'message': 'Format must be csv or json',
-                    'timestamp': datetime.utcnow().isoformat(),
-                    'requestId': request.headers.get('X-Request-ID', 'unknown')
-                }
-            }), 400
+        if export_format not in ['csv', 'ndjson', 'json']:
+            return error_response('VALIDATION_ERROR', 'Format must be csv, ndjson or json', 400)
         
-        # Start with base query including user information
-        query = db.session.query(
-            WeightRegistration,
-            User.name.label('user_name'),
-            User.role.label('user_role')
-        ).join(User, WeightRegistration.registered_by == User.id)
+        filters, filter_error = _parse_export_filters(request.args)
+        if filter_error:
+            return filter_error
         
-        # Apply date filters
-        if date_from:
-            try:
-                date_from_obj = datetime.strptime(date_from, '%Y-%m-%d').date()
-                query = query.filter(WeightRegistration.created_at >= date_from_obj)
-            except ValueError:
-                return jsonify({
-                    'error': {
-                        'code': 'VALIDATION_ERROR',
-                        'message': 'Invalid date_from format. Use YYYY-MM-DD',
-                        'timestamp': datetime.utcnow().isoformat(),
-                        'requestId': request.headers.get('X-Request-ID', 'unknown')
-                    }
-                }), 400
-        
-        if date_to:
-            try:
-                date_to_obj = datetime.strptime(date_to, '%Y-%m-%d').date()
-                # Add one day to include the entire date_to day
-                query = query.filter(WeightRegistration.created_at < date_to_obj)
-            except ValueError:
-                return jsonify({
-                    'error': {
-                        'code': 'VALIDATION_ERROR',
-                        'message': 'Invalid date_to format. Use YYYY-MM-DD',
-                        'timestamp': datetime.utcnow().isoformat(),
-                        'requestId': request.headers.get('X-Request-ID', 'unknown')
-                    }
-                }), 400
-        
-        # Apply optional filters
-        if supplier:
-            query = query.filter(WeightRegistration.supplier.ilike(f'%{supplier}%'))
-        
-        if cut_type:
-            valid_cut_types = ['jamón', 'chuleta']
-            if cut_type not in valid_cut_types:
-                return jsonify({
-                    'error': {
-                        'code': 'VALIDATION_ERROR',
-                        'message': f'Invalid cut_type. Must be one of: {", ".join(valid_cut_types)}',
-                        'timestamp': datetime.utcnow().isoformat(),
-                        'requestId': request.headers.get('X-Request-ID', 'unknown')
-                    }
-                }), 400
-            query = query.filter(WeightRegistration.cut_type == cut_type)
-        
-        if user_id:
-            query = query.filter(WeightRegistration.registered_by == user_id)
-        
-        # Order by creation date
-        query = query.order_by(WeightRegistration.created_at.desc())
-        
-        # Execute query
-        results = query.all()
+        # Explicit columns joined with user information
+        query = build_export_statement(filters)
         
         if export_format == 'csv':
-            return _export_csv(results, date_from, date_to)
+            return _export_csv(query, filters.get('date_from'), filters.get('date_to'))
+        elif export_format == 'ndjson':
+            return _export_ndjson(query)
         else:
-            return _export_json(results)
+            # Order by creation date
+            query = query.order_by(WeightRegistration.created_at.desc())
+            return _export_json(db.session.execute(query).mappings().all())
         
     except SQLAlchemyError as e:
         current_app.logger.error(f"Database error exporting registrations: {str(e)}")
-        return jsonify({
-            'error': {
-                'code': 'DATABASE_ERROR',
-                'message': 'Database operation failed',
-                'timestamp': datetime.utcnow().isoformat(),
-                'requestId': request.headers.get('X-Request-ID', 'unknown')
-            }
-        }), 500
+        return error_response('DATABASE_ERROR', 'Database operation failed', 500)
         
     except Exception as e:
         current_app.logger.error(f"Unexpected error exporting registrations: {str(e)}")
-        return jsonify({
-            'error': {
-                'code': 'INTERNAL_ERROR',
-                'message': 'Internal server error',
-                'timestamp': datetime.utcnow().isoformat(),
-                'requestId': request.headers.get('X-Request-ID', 'unknown')
-            }
-        }), 500
+        return error_response('INTERNAL_ERROR', 'Internal server error', 500)
+
+
+def _parse_export_filters(args):
+    """Validate export filters from a request's arguments.
+    
+    Args:
+        args: Query arguments or a JSON body with any of EXPORT_FILTER_KEYS
+        
+    Returns:
+        Tuple of (filters dict with the non-empty values, None) on success,
+        or (None, error response) when a filter is invalid
+    """
+    if not isinstance(args, dict):
+        return None, error_response('VALIDATION_ERROR', 'Filters must be a JSON object', 400)
+    
+    filters = {}
+    for key in EXPORT_FILTER_KEYS:
+        value = args.get(key)
+        if value is None:
+            continue
+        if not isinstance(value, str):
+            return None, error_response('VALIDATION_ERROR', f'{key} must be a string', 400)
+        value = value.strip()
+        if value:
+            filters[key] = value
+    
+    for key in ('date_from', 'date_to'):
+        if key in filters:
+            try:
+                parse_ymd(filters[key])
+            except ValueError:
+                return None, error_response('VALIDATION_ERROR', f'Invalid {key} format. Use YYYY-MM-DD', 400)
+    
+    if 'user_id' in filters:
+        try:
+            uuid.UUID(filters['user_id'])
+        except ValueError:
+            return None, error_response('VALIDATION_ERROR', 'Invalid user_id. Must be a UUID', 400)
+    
+    if 'cut_type' in filters and filters['cut_type'] not in VALID_CUT_TYPES:
+        return None, error_response(
+            'VALIDATION_ERROR',
+            f'Invalid cut_type. Must be one of: {_CUT_TYPE_CHOICES}',
+            400
+        )
+    
+    return filters, None
 
 
-def _export_csv(results, date_from=None, date_to=None):
-    """Export results as CSV format."""
-    output = io.StringIO()
-    writer = csv.writer(output)
+def _gzip_stream(chunks):
+    """Gzip-compress a stream of text chunks on the fly.
     
-    # Write header
-    writer.writerow([
-        'ID',
-        'Weight (kg)',
-        'Cut Type',
-        'Supplier',
-        'Registered By',
-        'User Role',
-        'Photo URL',
-        'OCR Confidence',
-        'Sync Status',
-        'Created At',
-        'Updated At'
-    ])
+    Each chunk is sync-flushed so the client keeps receiving data while the
+    export runs, while still compressing a whole batch of rows at a time.
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)  # gzip container
+    for chunk in chunks:
+        yield compressor.compress(chunk.encode('utf-8')) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+
+def _export_csv(query, date_from=None, date_to=None):
+    """Export results as a streamed CSV response.
     
-    # Write data rows
-    for result in results:
-        registration = result.WeightRegistration
-        user_name = result.user_name
-        user_role = result.user_role
-        
-        writer.writerow([
-            str(registration.id),
-            registration.weight,
-            registration.cut_type,
-            registration.supplier,
-            user_name,
-            user_role,
-            registration.photo_url or '',
-            registration.ocr_confidence or '',
-            registration.sync_status,
-            registration.created_at.isoformat(),
-            registration.updated_at.isoformat()
-        ])
+    Rows come from iter_export_batches() and are sent one batch at a time,
+    so memory stays flat however large the export is. The body is gzip
+    encoded when the client accepts it.
+    """
+    # One buffer reused for every batch: writerows() formats a whole batch in
+    # a single call, then the text is handed on and the buffer reset.
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
     
-    # Create response
-    output.seek(0)
-    csv_data = output.getvalue()
-    output.close()
+    def drain():
+        chunk = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return chunk
     
-    response = make_response(csv_data)
+    def generate():
+        # Write header
+        writer.writerow(CSV_HEADER)
+        yield drain()
+        
+        # Write data rows
+        exported = 0
+        for rows in iter_export_batches(query):
+            writer.writerows(map(csv_row, rows))
+            yield drain()
+            exported += len(rows)
+        
+        current_app.logger.info(f"Export completed: {exported} registrations exported as CSV")
+    
+    if request.accept_encodings['gzip'] > 0:
+        response = Response(stream_with_context(_gzip_stream(generate())), mimetype='text/csv')
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = Response(stream_with_context(generate()), mimetype='text/csv')
+    response.vary.add('Accept-Encoding')
     
     # Generate filename with date range
     filename = 'weight_registrations'
@@ -202,23 +198,61 @@ def _export_csv(results, date_from=None, date_to=None):
         filename += f'_to_{date_to}'
     filename += '.csv'
     
-    response.headers['Content-Type'] = 'text/csv'
     response.headers['Content-Disposition'] = f'attachment; filename={filename}'
     
-    current_app.logger.info(f"Export completed: {len(results)} registrations exported as CSV")
-    
     return response
 
 
+def _export_record(row):
+    """Serialize an export row for the JSON formats.
+    
+    Same fields as serialize_registration_row() plus the registering user's
+    name and role, assembled in one literal since this runs once per row.
+    """
+    user_created_at = row['user_created_at']
+    user_last_login = row['user_last_login']
+    return {
+        'id': str(row['id']),
+        'weight': float(row['weight']),
+        'cut_type': row['cut_type'],
+        'supplier': row['supplier'],
+        'registered_by': str(row['registered_by']),
+        'photo_url': row['photo_url'],
+        'ocr_confidence': float(row['ocr_confidence']) if row['ocr_confidence'] else None,
+        'created_at': row['created_at'].isoformat() if row['created_at'] else None,
+        'updated_at': row['updated_at'].isoformat() if row['updated_at'] else None,
+        'deleted_at': row['deleted_at'].isoformat() if row['deleted_at'] else None,
+        'sync_status': row['sync_status'],
+        'updated_by': str(row['updated_by']) if row['updated_by'] else None,
+        'update_reason': row['update_reason'],
+        'user': {
+            'id': str(row['user_id']),
+            'name': row['user_name'],
+            'role': row['user_role'],
+            'created_at': user_created_at.isoformat() if user_created_at else None,
+            'last_login': user_last_login.isoformat() if user_last_login else None
+        },
+        'registered_by_name': row['user_name'],
+        'registered_by_role': row['user_role']
+    }
+
+
+def _export_ndjson(query):
+    """Export results as a streamed NDJSON response, one registration per line."""
+    def generate():
+        exported = 0
+        for rows in iter_export_batches(query):
+            yield b''.join(orjson.dumps(_export_record(row)) + b'\n' for row in rows)
+            exported += len(rows)
+        
+        current_app.logger.info(f"Export completed: {exported} registrations exported as NDJSON")
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
 def _export_json(results):
-    """Export results as JSON format."""
-    data = []
-    for result in results:
-        registration = result.WeightRegistration
-        reg_dict = registration.to_dict()
-        reg_dict['registered_by_name'] = result.user_name
-        reg_dict['registered_by_role'] = result.user_role
-        data.append(reg_dict)
+    """Export results as JSON format (deprecated, see _export_ndjson)."""
+    data = [_export_record(row) for row in results]
     
     response_data = {
         'registrations': data,
@@ -229,7 +263,91 @@ def _export_json(results):
     
     current_app.logger.info(f"Export completed: {len(results)} registrations exported as JSON")
     
-    return jsonify(response_data), 200
+    return ojsonify(response_data)
+
+
+@reports_bp.route('/export/jobs', methods=['POST'])
+@supervisor_only
+def create_export_job():
+    """Queue a background CSV export (supervisors only).
+    
+    For large ranges that would tie up a web worker streaming
+    GET /export. The export worker writes a gzipped CSV to Cloudinary;
+    poll GET /export/jobs/<job_id> for the download link.
+    
+    Request format:
+        POST /api/v1/reports/export/jobs
+        {
+            "date_from": "2025-08-01",
+            "date_to": "2025-09-01",
+            "supplier": "Proveedor",
+            "cut_type": "jamón",
+            "user_id": "..."
+        }
+    
+    Returns:
+        202: Queued export job
+        400: Invalid filters
+        401: Not authenticated
+        403: Insufficient permissions (not supervisor)
+    """
+    try:
+        body = request.get_json(silent=True)
+        filters, filter_error = _parse_export_filters({} if body is None else body)
+        if filter_error:
+            return filter_error
+        
+        job = ExportJob(requested_by=current_user.id, filters=filters)
+        db.session.add(job)
+        db.session.commit()
+        
+        current_app.logger.info(f"Export job {job.id} queued by {current_user.name}")
+        
+        return jsonify(job.to_dict()), 202
+        
+    except SQLAlchemyError as e:
+        current_app.logger.error(f"Database error queuing export job: {str(e)}")
+        db.session.rollback()
+        return error_response('DATABASE_ERROR', 'Database operation failed', 500)
+        
+    except Exception as e:
+        current_app.logger.error(f"Unexpected error queuing export job: {str(e)}")
+        return error_response('INTERNAL_ERROR', 'Internal server error', 500)
+
+
+@reports_bp.route('/export/jobs/<job_id>', methods=['GET'])
+@supervisor_only
+def get_export_job(job_id):
+    """Get the status of a background export (supervisors only).
+    
+    Returns:
+        200: Export job; includes a signed, expiring download_url once done
+        401: Not authenticated
+        403: Insufficient permissions (not supervisor)
+        404: Export job not found
+    """
+    try:
+        try:
+            job = db.session.get(ExportJob, uuid.UUID(job_id))
+        except ValueError:
+            job = None
+        
+        if not job:
+            return error_response('EXPORT_JOB_NOT_FOUND', 'No se encontró la exportación con el ID especificado', 404)
+        
+        response_data = job.to_dict()
+        if job.status == 'done':
+            response_data['download_url'] = export_download_url(job)
+        
+        return jsonify(response_data), 200
+        
+    except SQLAlchemyError as e:
+        current_app.logger.error(f"Database error getting export job: {str(e)}")
+        return error_response('DATABASE_ERROR', 'Database operation failed', 500)
+        
+    except Exception as e:
+        current_app.logger.error(f"Unexpected error getting export job: {str(e)}")
+        return error_response('INTERNAL_ERROR', 'Internal server error', 500)
 
 
 @reports_bp.route('/summary', methods=['GET'])
@@ -259,17 +377,10 @@ def get_summary_report():
         else:
             # Parse provided dates
             try:
-                start_date = datetime.strptime(date_from, '%Y-%m-%d').date() if date_from else date.today().replace(day=1)
-                end_date = datetime.strptime(date_to, '%Y-%m-%d').date() if date_to else date.today()
+                start_date = parse_ymd(date_from) if date_from else date.today().replace(day=1)
+                end_date = parse_ymd(date_to) if date_to else date.today()
             except ValueError:
-                return jsonify({
-                    'error': {
-                        'code': 'VALIDATION_ERROR',
-                        'message': 'Invalid date format. Use YYYY-MM-DD',
-                        'timestamp': datetime.utcnow().isoformat(),
-                        'requestId': request.headers.get('X-Request-ID', 'unknown')
-                    }
-                }), 400
+                return error_response('VALIDATION_ERROR', 'Invalid date format. Use YYYY-MM-DD', 400)
         
         # Build query for date range
         query_filter = and_(
@@ -277,18 +388,29 @@ def get_summary_report():
             WeightRegistration.created_at < end_date
         )
         
-        # Total registrations and weight
-        total_registrations = WeightRegistration.query.filter(query_filter).count()
-        total_weight = db.session.query(
-            db.func.sum(WeightRegistration.weight)
-        ).filter(query_filter).scalar() or 0
+        # Cheap probe of the range's contents: any insert, edit, soft or hard
+        # delete changes it, so a cached summary is only reused while the
+        # underlying rows are unchanged.
+        version = db.session.query(
+            db.func.count(WeightRegistration.id),
+            db.func.max(WeightRegistration.created_at),
+            db.func.max(WeightRegistration.updated_at)
+        ).filter(query_filter).one()
+        cache_key = (start_date, end_date, tuple(version))
         
-        # Average weight
-        avg_weight = db.session.query(
-            db.func.avg(WeightRegistration.weight)
-        ).filter(query_filter).scalar() or 0
+        # The same probe doubles as the conditional GET validator
+        etag = hashlib.sha1(repr(cache_key).encode('utf-8')).hexdigest()
+        if request.if_none_match.contains(etag):
+            return _summary_response(current_app.response_class(status=304), etag)
         
-        # By cut type
+        cached_body = _summary_cache.get(cache_key)
+        if cached_body is not None:
+            return _summary_response(
+                current_app.response_class(cached_body, mimetype='application/json'), etag
+            )
+        
+        # By cut type. Totals are rolled up from these rows instead of running
+        # separate count/sum/avg scans over the same date range.
         cut_type_summary = db.session.query(
             WeightRegistration.cut_type,
             db.func.count(WeightRegistration.id).label('count'),
@@ -296,6 +418,10 @@ def get_summary_report():
             db.func.avg(WeightRegistration.weight).label('avg_weight')
         ).filter(query_filter).group_by(WeightRegistration.cut_type).all()
         
+        total_registrations = sum(item.count for item in cut_type_summary)
+        total_weight = sum(item.total_weight or 0 for item in cut_type_summary)
+        avg_weight = total_weight / total_registrations if total_registrations else 0
+        
         # By user
         user_summary = db.session.query(
             User.name,
@@ -356,15 +482,19 @@ def get_summary_report():
             'generated_at': datetime.utcnow().isoformat()
         }
         
-        return jsonify(response_data), 200
+        response = jsonify(response_data)
+        _summary_cache.set(cache_key, response.get_data())
+        
+        return _summary_response(response, etag)
         
     except Exception as e:
         current_app.logger.error(f"Unexpected error generating summary report: {str(e)}")
-        return jsonify({
-            'error': {
-                'code': 'INTERNAL_ERROR',
-                'message': 'Internal server error',
-                'timestamp': datetime.utcnow().isoformat(),
-                'requestId': request.headers.get('X-Request-ID', 'unknown')
-            }
-        }), 500
\ No newline at end of file
+        return error_response('INTERNAL_ERROR', 'Internal server error', 500)
+
+
+def _summary_response(response, etag):
+    """Attach the summary's validator and caching headers to a response."""
+    response.set_etag(etag)
+    response.cache_control.private = True
+    response.cache_control.max_age = 30
+    return response
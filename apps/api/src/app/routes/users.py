@@ -1,15 +1,77 @@
 """User management routes for supervisor administration."""
-from datetime import datetime
 from flask import Blueprint, request, jsonify, current_app
 from flask_login import current_user
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
-from app.models.user import User
+from sqlalchemy.orm import load_only
+from app.models.user import User, USER_ROLES, VALID_ROLES
 from app.models import db
 from app.middleware.auth_middleware import supervisor_only
+from app.utils.json_response import error_response
 
 # Create users blueprint
 users_bp = Blueprint('users', __name__, url_prefix='/api/v1/users')
 
+_ROLE_ERROR = f"Role must be one of: {', '.join(USER_ROLES)}"
+
+# SQLSTATE unique_violation
+UNIQUE_VIOLATION = '23505'
+
+
+def _is_unique_violation(error):
+    """Check whether an IntegrityError comes from a UNIQUE constraint.
+    
+    Args:
+        error: IntegrityError raised by the flush/commit
+        
+    Returns:
+        True for unique violations, False for other constraint failures
+    """
+    orig = error.orig
+    # psycopg exposes the SQLSTATE; sqlite3 only the extended error name
+    if getattr(orig, 'sqlstate', None) == UNIQUE_VIOLATION:
+        return True
+    return getattr(orig, 'sqlite_errorname', None) == 'SQLITE_CONSTRAINT_UNIQUE'
+
+
+def _validate_user_fields(data, required=()):
+    """Validate and normalize user fields from a request body in one pass.
+    
+    Args:
+        data: Decoded JSON body
+        required: Fields that must be present and non-empty
+        
+    Returns:
+        Tuple of (normalized fields present in the body, None), or
+        (None, error message) for the first invalid field
+    """
+    if not isinstance(data, dict):
+        return None, 'Request body must be a JSON object'
+    
+    for key in required:
+        if not data.get(key):
+            return None, f'{key.capitalize()} is required'
+    
+    fields = {}
+    
+    if 'name' in data:
+        name = data['name'].strip() if isinstance(data['name'], str) else ''
+        if len(name) < 2 or len(name) > 255:
+            return None, 'Name must be between 2 and 255 characters'
+        fields['name'] = name
+    
+    if 'role' in data:
+        role = data['role'].strip().lower() if isinstance(data['role'], str) else None
+        if role not in VALID_ROLES:
+            return None, _ROLE_ERROR
+        fields['role'] = role
+    
+    if 'active' in data:
+        if not isinstance(data['active'], bool):
+            return None, 'Active must be a boolean value'
+        fields['active'] = data['active']
+    
+    return fields, None
+
 
 @users_bp.route('', methods=['GET'])
 @supervisor_only
@@ -22,7 +84,10 @@ def list_users():
         403: Insufficient permissions (not supervisor)
     """
     try:
-        users = User.query.order_by(User.created_at.desc()).all()
+        # Only the columns User.to_dict() serializes
+        users = User.query.options(
+            load_only(User.id, User.name, User.role, User.created_at, User.last_login)
+        ).order_by(User.created_at.desc()).all()
         
         response_data = {
             'users': [user.to_dict() for user in users],
@@ -33,14 +98,7 @@ def list_users():
         
     except Exception as e:
         current_app.logger.error(f"Unexpected error listing users: {str(e)}")
-        return jsonify({
-            'error': {
-                'code': 'INTERNAL_ERROR',
-                'message': 'Internal server error',
-                'timestamp': datetime.utcnow().isoformat(),
-                'requestId': request.headers.get('X-Request-ID', 'unknown')
-            }
-        }), 500
+        return error_response('INTERNAL_ERROR', 'Internal server error', 500)
 
 
 @users_bp.route('', methods=['POST'])
@@ -65,81 +123,18 @@ def create_user():
     try:
         # Validate request data
         if not request.is_json:
-            return jsonify({
-                'error': {
-                    'code': 'INVALID_REQUEST',
-                    'message': 'Request must be JSON',
-                    'timestamp': datetime.utcnow().isoformat(),
-                    'requestId': request.headers.get('X-Request-ID', 'unknown')
-                }
-            }), 400
-        
-        data = request.get_json()
+            return error_response('INVALID_REQUEST', 'Request must be JSON', 400)
         
-        # Validate required fields
-        if 'name' not in data or not data['name']:
-            return jsonify({
-                'error': {
-                    'code': 'VALIDATION_ERROR',
-                    'message': 'Name is required',
-                    'timestamp': datetime.utcnow().isoformat(),
-                    'requestId': request.headers.get('X-Request-ID', 'unknown')
-                }
-            }), 400
+        fields, message = _validate_user_fields(request.get_json(), required=('name', 'role'))
+        if message:
+            return error_response('VALIDATION_ERROR', message, 400)
+        name = fields['name']
+        role = fields['role']
         
-        if 'role' not in data or not data['role']:
-            return jsonify({
-                'error': {
-                    'code': 'VALIDATION_ERROR',
-                    'message': 'Role is required',
-                    'timestamp': datetime.utcnow().isoformat(),
-                    'requestId': request.headers.get('X-Request-ID', 'unknown')
-                }
-            }), 400
-        
-        # Validate name
-        name = data['name'].strip()
-        if len(name) < 2 or len(name) > 255:
-            return jsonify({
-                'error': {
-                    'code': 'VALIDATION_ERROR',
-                    'message': 'Name must be between 2 and 255 characters',
-                    'timestamp': datetime.utcnow().isoformat(),
-                    'requestId': request.headers.get('X-Request-ID', 'unknown')
-                }
-            }), 400
-        
-        # Validate role
-        valid_roles = ['operator', 'supervisor']
-        role = data['role'].strip().lower()
-        if role not in valid_roles:
-            return jsonify({
-                'error': {
-                    'code': 'VALIDATION_ERROR',
-                    'message': f'Role must be one of: {", ".join(valid_roles)}',
-                    'timestamp': datetime.utcnow().isoformat(),
-                    'requestId': request.headers.get('X-Request-ID', 'unknown')
-                }
-            }), 400
-        
-        # Check if user with this name already exists
-        existing_user = User.query.filter_by(name=name).first()
-        if existing_user:
-            return jsonify({
-                'error': {
-                    'code': 'USER_EXISTS',
-                    'message': 'A user with this name already exists',
-                    'timestamp': datetime.utcnow().isoformat(),
-                    'requestId': request.headers.get('X-Request-ID', 'unknown')
-                }
-            }), 409
-        
-        # Create new user
-        user = User(
-            name=name,
-            role=role,
-            active=data.get('active', True)  # Default to active
-        )
+        # Create new user. Name uniqueness is enforced by the UNIQUE(name)
+        # constraint and reported from the IntegrityError handler below.
+        # users has no active column, so a validated 'active' is not stored.
+        user = User(name=name, role=role)
         
         db.session.add(user)
         db.session.commit()
@@ -151,37 +146,18 @@ def create_user():
     except IntegrityError as e:
         current_app.logger.error(f"Integrity error creating user: {str(e)}")
         db.session.rollback()
-        return jsonify({
-            'error': {
-                'code': 'USER_EXISTS',
-                'message': 'A user with this name already exists',
-                'timestamp': datetime.utcnow().isoformat(),
-                'requestId': request.headers.get('X-Request-ID', 'unknown')
-            }
-        }), 409
+        if not _is_unique_violation(e):
+            return error_response('DATABASE_ERROR', 'Database operation failed', 500)
+        return error_response('USER_EXISTS', 'A user with this name already exists', 409)
         
     except SQLAlchemyError as e:
         current_app.logger.error(f"Database error creating user: {str(e)}")
         db.session.rollback()
-        return jsonify({
-            'error': {
-                'code': 'DATABASE_ERROR',
-                'message': 'Database operation failed',
-                'timestamp': datetime.utcnow().isoformat(),
-                'requestId': request.headers.get('X-Request-ID', 'unknown')
-            }
-        }), 500
+        return error_response('DATABASE_ERROR', 'Database operation failed', 500)
         
     except Exception as e:
         current_app.logger.error(f"Unexpected error creating user: {str(e)}")
-        return jsonify({
-            'error': {
-                'code': 'INTERNAL_ERROR',
-                'message': 'Internal server error',
-                'timestamp': datetime.utcnow().isoformat(),
-                'requestId': request.headers.get('X-Request-ID', 'unknown')
-            }
-        }), 500
+        return error_response('INTERNAL_ERROR', 'Internal server error', 500)
 
 
 @users_bp.route('/<user_id>', methods=['PUT'])
@@ -211,74 +187,15 @@ def update_user(user_id):
         
         # Validate request data
         if not request.is_json:
-            return jsonify({
-                'error': {
-                    'code': 'INVALID_REQUEST',
-                    'message': 'Request must be JSON',
-                    'timestamp': datetime.utcnow().isoformat(),
-                    'requestId': request.headers.get('X-Request-ID', 'unknown')
-                }
-            }), 400
-        
-        data = request.get_json()
-        
-        # Update name if provided
-        if 'name' in data:
-            name = data['name'].strip()
-            if len(name) < 2 or len(name) > 255:
-                return jsonify({
-                    'error': {
-                        'code': 'VALIDATION_ERROR',
-                        'message': 'Name must be between 2 and 255 characters',
-                        'timestamp': datetime.utcnow().isoformat(),
-                        'requestId': request.headers.get('X-Request-ID', 'unknown')
-                    }
-                }), 400
-            
-            # Check if another user has this name
-            if name != user.name:
-                existing_user = User.query.filter_by(name=name).first()
-                if existing_user:
-                    return jsonify({
-                        'error': {
-                            'code': 'USER_EXISTS',
-                            'message': 'A user with this name already exists',
-                            'timestamp': datetime.utcnow().isoformat(),
-                            'requestId': request.headers.get('X-Request-ID', 'unknown')
-                        }
-                    }), 409
-            
-            user.name = name
+            return error_response('INVALID_REQUEST', 'Request must be JSON', 400)
         
-        # Update role if provided
-        if 'role' in data:
-            valid_roles = ['operator', 'supervisor']
-            role = data['role'].strip().lower()
-            if role not in valid_roles:
-                return jsonify({
-                    'error': {
-                        'code': 'VALIDATION_ERROR',
-                        'message': f'Role must be one of: {", ".join(valid_roles)}',
-                        'timestamp': datetime.utcnow().isoformat(),
-                        'requestId': request.headers.get('X-Request-ID', 'unknown')
-                    }
-                }), 400
-            
-            user.role = role
+        fields, message = _validate_user_fields(request.get_json())
+        if message:
+            return error_response('VALIDATION_ERROR', message, 400)
         
-        # Update active status if provided
-        if 'active' in data:
-            if not isinstance(data['active'], bool):
-                return jsonify({
-                    'error': {
-                        'code': 'VALIDATION_ERROR',
-                        'message': 'Active must be a boolean value',
-                        'timestamp': datetime.utcnow().isoformat(),
-                        'requestId': request.headers.get('X-Request-ID', 'unknown')
-                    }
-                }), 400
-            
-            user.active = data['active']
+        # Apply only the provided fields, after the whole body validated
+        for key, value in fields.items():
+            setattr(user, key, value)
         
         db.session.commit()
         
@@ -289,37 +206,18 @@ def update_user(user_id):
     except IntegrityError as e:
         current_app.logger.error(f"Integrity error updating user: {str(e)}")
         db.session.rollback()
-        return jsonify({
-            'error': {
-                'code': 'USER_EXISTS',
-                'message': 'A user with this name already exists',
-                'timestamp': datetime.utcnow().isoformat(),
-                'requestId': request.headers.get('X-Request-ID', 'unknown')
-            }
-        }), 409
+        if not _is_unique_violation(e):
+            return error_response('DATABASE_ERROR', 'Database operation failed', 500)
+        return error_response('USER_EXISTS', 'A user with this name already exists', 409)
         
     except SQLAlchemyError as e:
         current_app.logger.error(f"Database error updating user: {str(e)}")
         db.session.rollback()
-        return jsonify({
-            'error': {
-                'code': 'DATABASE_ERROR',
-                'message': 'Database operation failed',
-                'timestamp': datetime.utcnow().isoformat(),
-                'requestId': request.headers.get('X-Request-ID', 'unknown')
-            }
-        }), 500
+        return error_response('DATABASE_ERROR', 'Database operation failed', 500)
         
     except Exception as e:
         current_app.logger.error(f"Unexpected error updating user: {str(e)}")
-        return jsonify({
-            'error': {
-                'code': 'INTERNAL_ERROR',
-                'message': 'Internal server error',
-                'timestamp': datetime.utcnow().isoformat(),
-                'requestId': request.headers.get('X-Request-ID', 'unknown')
-            }
-        }), 500
+        return error_response('INTERNAL_ERROR', 'Internal server error', 500)
 
 
 @users_bp.route('/<user_id>', methods=['GET'])
@@ -339,11 +237,4 @@ def get_user(user_id):
         
     except Exception as e:
         current_app.logger.error(f"Unexpected error getting user {user_id}: {str(e)}")
-        return jsonify({
-            'error': {
-                'code': 'INTERNAL_ERROR',
-                'message': 'Internal server error',
-                'timestamp': datetime.utcnow().isoformat(),
-                'requestId': request.headers.get('X-Request-ID', 'unknown')
-            }
-        }), 500
\ No newline at end of file
+        return error_response('INTERNAL_ERROR', 'Internal server error', 500)
\ No newline at end of file
@@ -1,5 +1,6 @@
 """User seed data for development and testing."""
 from datetime import datetime
+from sqlalchemy import delete, insert
 from app.models import db, User
 
 
@@ -12,28 +13,28 @@ def seed_users():
 
     # Create test operators
     operators = [
-        User(name='juan_operator', role='operator'),
-        User(name='maria_operator', role='operator'),
-        User(name='carlos_operator', role='operator'),
+        {'name': 'juan_operator', 'role': 'operator'},
+        {'name': 'maria_operator', 'role': 'operator'},
+        {'name': 'carlos_operator', 'role': 'operator'},
     ]
 
     # Create test supervisors
     supervisors = [
-        User(name='ana_supervisor', role='supervisor'),
-        User(name='luis_supervisor', role='supervisor'),
+        {'name': 'ana_supervisor', 'role': 'supervisor'},
+        {'name': 'luis_supervisor', 'role': 'supervisor'},
     ]
 
     try:
-        # Add all users to session
-        for user in operators + supervisors:
-            db.session.add(user)
+        # Insert all users in one executemany; id comes from the server
+        # default and created_at from the column default
+        db.session.execute(insert(User), operators + supervisors)
         
         # Commit all users
         db.session.commit()
         
         print(f"Successfully created {len(operators)} operators and {len(supervisors)} supervisors:")
         for user in operators + supervisors:
-            print(f"  - {user.name} ({user.role})")
+            print(f"  - {user['name']} ({user['role']})")
             
     except Exception as e:
         db.session.rollback()
@@ -44,10 +45,10 @@ def seed_users():
 def clear_users():
     """Remove all users from database (for testing purposes)."""
     try:
-        count = User.query.count()
+        # rowcount of the bulk DELETE replaces a separate COUNT(*)
+        count = db.session.execute(delete(User)).rowcount
+        db.session.commit()
         if count > 0:
-            User.query.delete()
-            db.session.commit()
             print(f"Deleted {count} users from database.")
         else:
             print("No users found to delete.")
@@ -0,0 +1,119 @@
+"""
+Background batching shared by the Vision batcher and the OCR log writer.
+
+Items are queued from request threads and handed to a daemon thread, which
+processes them in batches so one RPC or one INSERT serves many requests.
+"""
+
+import atexit
+import os
+import queue
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundBatcher:
+    """Process queued items in batches from a daemon thread.
+
+    The thread takes the first pending item, waits up to ``max_wait_time``
+    for more (up to ``max_batch_size``), then calls ``_process_batch`` once
+    with all of them. Subclasses implement ``_process_batch``.
+
+    When ``exit_flush_timeout`` is set, the process waits up to that many
+    seconds at interpreter exit for queued items to be processed, so a
+    recycled gunicorn worker or a SIGTERM does not drop them silently.
+    """
+
+    def __init__(self, max_batch_size: int, max_wait_time: float, thread_name: str,
+                 exit_flush_timeout: float = None):
+        self.max_batch_size = max_batch_size
+        self.max_wait_time = max_wait_time
+        self.thread_name = thread_name
+        self.exit_flush_timeout = exit_flush_timeout
+        self._pending = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker_pid = None
+        self._atexit_registered = False
+
+    def _put(self, item) -> None:
+        """Queue one item and make sure the worker thread is running."""
+        self._pending.put(item)
+        self._ensure_worker()
+
+    def flush(self, timeout: float = None) -> bool:
+        """
+        Block until every queued item has been processed.
+
+        Args:
+            timeout: Seconds to wait at most; None waits indefinitely
+
+        Returns:
+            True if the queue drained, False if the timeout expired first
+        """
+        if timeout is None:
+            self._pending.join()
+            return True
+
+        deadline = time.monotonic() + timeout
+        with self._pending.all_tasks_done:
+            while self._pending.unfinished_tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._pending.all_tasks_done.wait(remaining)
+        return True
+
+    def _process_batch(self, batch: list) -> None:
+        """Handle one batch of queued items."""
+        raise NotImplementedError
+
+    def _ensure_worker(self) -> None:
+        """Start the worker thread in this process if it is not running."""
+        # Threads do not survive a fork, so gunicorn workers start their own
+        if self._worker_pid == os.getpid():
+            return
+        with self._lock:
+            if self._worker_pid != os.getpid():
+                threading.Thread(target=self._run, name=self.thread_name, daemon=True).start()
+                self._worker_pid = os.getpid()
+                # Registrations are inherited across fork, so one is enough
+                if self.exit_flush_timeout is not None and not self._atexit_registered:
+                    atexit.register(self._flush_at_exit)
+                    self._atexit_registered = True
+
+    def _flush_at_exit(self) -> None:
+        """Give queued items a bounded chance to be processed before exit."""
+        if not self.flush(self.exit_flush_timeout):
+            logger.warning(
+                f"{self.thread_name}: {self._pending.unfinished_tasks} queued items "
+                f"dropped at exit after {self.exit_flush_timeout}s"
+            )
+
+    def _run(self) -> None:
+        """Process pending batches forever."""
+        while True:
+            batch = self._next_batch()
+            try:
+                self._process_batch(batch)
+            except Exception as e:
+                logger.error(f"{self.thread_name} dropped a batch of {len(batch)} items: {e}")
+            finally:
+                for _ in batch:
+                    self._pending.task_done()
+
+    def _next_batch(self) -> list:
+        """Block for the first item, then gather more until full or timed out."""
+        batch = [self._pending.get()]
+        deadline = time.monotonic() + self.max_wait_time
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._pending.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
@@ -0,0 +1,139 @@
+"""Background registration exports written to Cloudinary as gzipped CSV."""
+import csv
+import gzip
+import io
+import tempfile
+import time
+from datetime import datetime
+import click
+import cloudinary.uploader
+import cloudinary.utils
+from flask import current_app
+from flask.cli import with_appcontext
+from app.models import db
+from app.models.export_job import ExportJob
+from app.services.registration_export import (
+    CSV_HEADER,
+    build_export_statement,
+    csv_row,
+    iter_export_batches
+)
+
+# Exports smaller than this stay in memory before spilling to a temp file
+_SPOOL_MAX_SIZE = 8 * 1024 * 1024
+
+# Chunk size for Cloudinary's chunked (upload_large) API
+_UPLOAD_CHUNK_SIZE = 6 * 1024 * 1024
+
+
+def export_file_id(job):
+    """Cloudinary public_id under which a job's CSV is stored."""
+    return f'exports/{job.id}.csv.gz'
+
+
+def write_export_csv(query, fileobj):
+    """Write a gzip-compressed CSV export of query to fileobj.
+
+    Args:
+        query: Statement from build_export_statement()
+        fileobj: Binary file object to write to
+
+    Returns:
+        Number of registrations written
+    """
+    exported = 0
+    with gzip.GzipFile(fileobj=fileobj, mode='wb') as gz:
+        text = io.TextIOWrapper(gz, encoding='utf-8', newline='')
+        writer = csv.writer(text)
+        writer.writerow(CSV_HEADER)
+        for rows in iter_export_batches(query):
+            writer.writerows(csv_row(row) for row in rows)
+            exported += len(rows)
+        text.flush()
+        text.detach()
+    return exported
+
+
+def claim_next_export_job():
+    """Mark the oldest pending export job as running and return it.
+
+    SKIP LOCKED lets several workers poll the table without handing out
+    the same job twice.
+
+    Returns:
+        The claimed ExportJob, or None when nothing is pending
+    """
+    job = ExportJob.query.filter(
+        ExportJob.status == 'pending'
+    ).order_by(
+        ExportJob.created_at
+    ).with_for_update(skip_locked=True).first()
+
+    if job is not None:
+        job.status = 'running'
+        job.started_at = datetime.utcnow()
+    db.session.commit()
+    return job
+
+
+def run_export_job(job):
+    """Build a claimed job's CSV, upload it and record the outcome.
+
+    Args:
+        job: ExportJob in 'running' state
+    """
+    try:
+        with tempfile.SpooledTemporaryFile(max_size=_SPOOL_MAX_SIZE) as tmp:
+            row_count = write_export_csv(build_export_statement(job.filters), tmp)
+            tmp.seek(0)
+            cloudinary.uploader.upload_large(
+                tmp,
+                public_id=export_file_id(job),
+                resource_type='raw',
+                type='private',
+                chunk_size=_UPLOAD_CHUNK_SIZE
+            )
+
+        job.status = 'done'
+        job.row_count = row_count
+        job.file_id = export_file_id(job)
+        current_app.logger.info(f"Export job {job.id} completed: {row_count} registrations")
+
+    except Exception as e:
+        db.session.rollback()
+        job.status = 'error'
+        job.error = str(e)
+        current_app.logger.error(f"Export job {job.id} failed: {str(e)}")
+
+    job.finished_at = datetime.utcnow()
+    db.session.commit()
+
+
+def export_download_url(job):
+    """Signed, expiring download URL for a finished job's file."""
+    ttl = current_app.config.get('EXPORT_DOWNLOAD_URL_TTL', 3600)
+    return cloudinary.utils.private_download_url(
+        job.file_id,
+        '',
+        resource_type='raw',
+        type='private',
+        attachment=True,
+        expires_at=int(time.time()) + ttl
+    )
+
+
+@click.command('export-worker')
+@click.option('--interval', type=int, default=5,
+              help='Seconds to wait between polls when no job is pending (0 = drain once and exit).')
+@with_appcontext
+def export_worker_command(interval):
+    """Process pending registration export jobs."""
+    while True:
+        job = claim_next_export_job()
+        if job is not None:
+            run_export_job(job)
+            continue
+
+        if not interval:
+            break
+        time.sleep(interval)
@@ -0,0 +1,69 @@
+"""
+Background writer for OCR processing logs.
+
+OCR requests enqueue their log rows and return; a daemon thread writes them
+in batches with one multi-row INSERT and one commit, so the commit is no
+longer part of each request's latency.
+"""
+
+import logging
+from typing import Any, Dict
+
+from flask import Flask
+from sqlalchemy import insert
+
+from app.models.ocr_log import OCRProcessingLog
+from app.services.background_batch import BackgroundBatcher
+from app import db
+
+logger = logging.getLogger(__name__)
+
+OCR_LOG_BATCH_SIZE = 200
+OCR_LOG_MAX_WAIT_TIME = 0.1  # seconds to wait for more rows to join a batch
+OCR_LOG_EXIT_FLUSH_TIMEOUT = 5.0  # seconds to keep writing queued rows at exit
+
+
+class OCRLogWriter(BackgroundBatcher):
+    """Queue OCR log rows and insert them in batches from a daemon thread.
+
+    Rows still queued when the worker process exits are written within
+    ``exit_flush_timeout`` seconds; any left after that are logged as lost.
+    """
+
+    def __init__(self, batch_size: int = OCR_LOG_BATCH_SIZE,
+                 max_wait_time: float = OCR_LOG_MAX_WAIT_TIME,
+                 exit_flush_timeout: float = OCR_LOG_EXIT_FLUSH_TIMEOUT):
+        super().__init__(batch_size, max_wait_time, thread_name='ocr-log-writer',
+                         exit_flush_timeout=exit_flush_timeout)
+
+    def submit(self, app: Flask, row: Dict[str, Any]) -> None:
+        """
+        Queue one OCR log row for insertion.
+
+        Args:
+            app: Flask application whose database the row belongs to
+            row: OCRProcessingLog column values
+        """
+        self._put((app, row))
+
+    def _process_batch(self, batch: list) -> None:
+        """Write one batch of queued rows."""
+        self._write(batch)
+
+    def _write(self, batch: list) -> None:
+        """Insert a batch of rows, one transaction per application."""
+        rows_by_app = {}
+        for app, row in batch:
+            rows_by_app.setdefault(app, []).append(row)
+
+        for app, rows in rows_by_app.items():
+            with app.app_context():
+                try:
+                    db.session.execute(insert(OCRProcessingLog), rows)
+                    db.session.commit()
+                except Exception as e:
+                    logger.error(f"Failed to write {len(rows)} OCR processing logs: {e}")
+                    db.session.rollback()
+
+
+ocr_log_writer = OCRLogWriter()
@@ -4,25 +4,102 @@ Supports Tesseract OCR with Google Vision API fallback.
 """
 
 import re
+import json
 import time
+import hashlib
+import functools
 import logging
-from typing import Dict, Optional, Tuple, Any
+import threading
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple, Any, Union
 from io import BytesIO
+import redis
 import requests
+from requests.adapters import HTTPAdapter
 from PIL import Image
-import pytesseract
 import cv2
 import numpy as np
-from google.cloud import vision
-from google.api_core.exceptions import GoogleAPIError
+# pytesseract and the Google Cloud client libraries are imported where they
+# are used: they add ~0.3 s to every worker boot otherwise
+try:
+    # Optional in-process Tesseract bindings; without them every call spawns
+    # the tesseract CLI through pytesseract
+    import tesserocr
+except ImportError:
+    tesserocr = None
+from flask import current_app, has_app_context
 
-from app.models.ocr_log import OCRProcessingLog
-from app.utils.image_processing import preprocess_image_for_ocr
-from app import db
+from app.utils.image_processing import decode_grayscale, preprocess_array_for_ocr
+from app.services.ocr_log_writer import ocr_log_writer
+from app.services.vision_batch import VisionBatcher
+from app.utils.cache import TTLCache
 
 
 logger = logging.getLogger(__name__)
 
+# OCR results keyed by a hash of the image bytes; a re-photographed label
+# costs a 1-3 ms hash instead of 50-260 ms of Tesseract/Vision work.
+OCR_RESULT_CACHE_TTL = 86400  # seconds
+OCR_RESULT_FIELDS = ('extracted_text', 'extracted_weight', 'confidence_score', 'ocr_engine')
+_result_cache = TTLCache(maxsize=512, ttl=OCR_RESULT_CACHE_TTL)
+# Results are also shared between workers through Redis (REDIS_URL); a slow
+# or unreachable Redis is treated as a cache miss after this many seconds.
+OCR_RESULT_CACHE_REDIS_TIMEOUT = 0.5
+
+# Shared keep-alive session so image downloads reuse pooled Cloudinary
+# connections instead of paying a TCP+TLS handshake per request.
+IMAGE_DOWNLOAD_POOL_SIZE = 64
+_http_session = requests.Session()
+_http_session.mount('https://', HTTPAdapter(pool_maxsize=IMAGE_DOWNLOAD_POOL_SIZE))
+_http_session.mount('http://', HTTPAdapter(pool_maxsize=IMAGE_DOWNLOAD_POOL_SIZE))
+
+# JPEG quality of images uploaded to Google Vision
+VISION_JPEG_QUALITY = 85
+
+# Sentinels for clients that have not been created yet (None means unavailable)
+_VISION_CLIENT_UNSET = object()
+_REDIS_CLIENT_UNSET = object()
+
+
+@functools.lru_cache(maxsize=None)
+def _vision_retry():
+    """
+    Retry Vision quota (429 / RESOURCE_EXHAUSTED) and availability errors with
+    jittered exponential backoff (0.5 s, 1 s, 2 s, capped at 4 s) for up to 8 s.
+    Concurrency is already capped by the batcher: one batch RPC in flight per process.
+    """
+    from google.api_core import retry
+    from google.api_core.exceptions import ResourceExhausted, ServiceUnavailable, TooManyRequests
+    
+    return retry.Retry(
+        predicate=retry.if_exception_type(ResourceExhausted, TooManyRequests, ServiceUnavailable),
+        initial=0.5,
+        maximum=4.0,
+        multiplier=2.0,
+        timeout=8.0
+    )
+
+
+# Weight patterns in priority order, compiled once: number + optional decimal + weight unit.
+# Each entry is (pattern, value_is_in_grams).
+_WEIGHT_PATTERNS = tuple(
+    (re.compile(pattern), 'g' in pattern and 'kg' not in pattern)
+    for pattern in (
+        r'(\d+\.?\d*)\s*kg',  # X.X kg
+        r'(\d+\.?\d*)\s*k',   # X.X k
+        r'(\d+\.?\d*)\s*g',   # X.X g (convert to kg)
+        r'peso\s*:?\s*(\d+\.?\d*)',  # peso: X.X
+        r'weight\s*:?\s*(\d+\.?\d*)',  # weight: X.X
+    )
+)
+_NUMBER_PATTERN = re.compile(r'\b(\d+\.?\d*)\b')
+
+
+def image_content_hash(image_bytes: bytes) -> str:
+    """Return the cache key for raw image bytes."""
+    return hashlib.blake2b(image_bytes, digest_size=16).hexdigest()
+
 
 class OCRService:
     """Service for processing images and extracting weight information using OCR."""
@@ -32,12 +109,57 @@ class OCRService:
         # Configure Tesseract for Spanish language and number recognition
         self.tesseract_config = '--oem 3 --psm 6 -c tessedit_char_whitelist=0123456789.,KkGg'
         
-        # Initialize Google Vision client (will be configured via environment)
-        self.vision_client = None
+        # Persistent Tesseract API when tesserocr is installed (not thread-safe,
+        # so calls are serialized with a lock)
+        self._tess_api = None
+        self._tess_lock = threading.Lock()
+        if tesserocr is not None:
+            try:
+                self._tess_api = tesserocr.PyTessBaseAPI(
+                    lang='spa+eng', psm=tesserocr.PSM.SINGLE_BLOCK, oem=tesserocr.OEM.DEFAULT
+                )
+                self._tess_api.SetVariable('tessedit_char_whitelist', '0123456789.,KkGg')
+            except Exception as e:
+                logger.warning(f"tesserocr initialization failed, using pytesseract: {e}")
+                self._tess_api = None
+        
+        # Google Vision client, created on first use (see vision_client)
+        self._vision_client = _VISION_CLIENT_UNSET
+        self._vision_client_lock = threading.Lock()
+        
+        # Redis client for the shared result cache, created on first use
+        # (see _result_cache_redis)
+        self._redis_client = _REDIS_CLIENT_UNSET
+        self._redis_client_lock = threading.Lock()
+        
+        # Concurrent Vision fallbacks share one batch_annotate_images call
+        self.vision_batcher = VisionBatcher(self._annotate_vision_batch)
+    
+    @property
+    def vision_client(self):
+        """Google Vision client, or None if it cannot be configured.
+        
+        Creating the client looks up credentials (up to several seconds when
+        none are configured), so it happens on first use instead of at boot.
+        """
+        if self._vision_client is _VISION_CLIENT_UNSET:
+            with self._vision_client_lock:
+                if self._vision_client is _VISION_CLIENT_UNSET:
+                    self._vision_client = self._create_vision_client()
+        return self._vision_client
+    
+    @vision_client.setter
+    def vision_client(self, client):
+        self._vision_client = client
+    
+    def _create_vision_client(self):
+        """Create the Google Vision client (configured via environment)."""
         try:
-            self.vision_client = vision.ImageAnnotatorClient()
+            from google.cloud import vision
+            return vision.ImageAnnotatorClient()
         except Exception as e:
             logger.warning(f"Google Vision client initialization failed: {e}")
+            return None
     
     def process_image(self, image_url: str, registration_id: Optional[str] = None) -> Dict[str, Any]:
         """
@@ -53,28 +175,17 @@ class OCRService:
         start_time = time.time()
         
         try:
-            # Download image from URL
-            image = self._download_image(image_url)
-            
-            # Preprocess image for better OCR accuracy
-            processed_image = preprocess_image_for_ocr(image)
+            # Download the encoded image from URL
+            image_bytes = self._download_image_bytes(image_url)
             
-            # Try Tesseract OCR first
-            tesseract_result = self._extract_with_tesseract(processed_image)
+            # Reuse the result of an identical image processed earlier
+            content_hash = image_content_hash(image_bytes)
+            result = self._get_cached_result(content_hash)
             
-            # Check if Tesseract confidence is acceptable
-            if tesseract_result['confidence_score'] >= 0.7:
-                result = tesseract_result
-            else:
-                # Fallback to Google Vision API
-                logger.info("Tesseract confidence low, falling back to Google Vision")
-                vision_result = self._extract_with_google_vision(image)
-                
-                # Use best result based on confidence
-                if vision_result['confidence_score'] > tesseract_result['confidence_score']:
-                    result = vision_result
-                else:
-                    result = tesseract_result
+            if result is None:
+                result = self._run_ocr(image_bytes)
+                if result['confidence_score'] > 0:
+                    self._set_cached_result(content_hash, result)
             
             # Calculate processing time
             processing_time_ms = int((time.time() - start_time) * 1000)
@@ -120,46 +231,128 @@ class OCRService:
                 'error': str(e)
             }
     
-    def _download_image(self, image_url: str) -> Image.Image:
-        """Download image from URL or load from local file and return PIL Image object."""
+    def _run_ocr(self, image_bytes: bytes) -> Dict[str, Any]:
+        """Run Tesseract on the preprocessed image, falling back to Google Vision."""
+        # Decode straight to grayscale and preprocess for better OCR accuracy
+        processed_image = preprocess_array_for_ocr(decode_grayscale(image_bytes))
+        
+        # Try Tesseract OCR first
+        tesseract_result = self._extract_with_tesseract(processed_image)
+        
+        # Check if Tesseract confidence is acceptable
+        if tesseract_result['confidence_score'] >= 0.7:
+            return tesseract_result
+        
+        # Fallback to Google Vision API
+        logger.info("Tesseract confidence low, falling back to Google Vision")
+        vision_result = self._extract_with_google_vision(Image.open(BytesIO(image_bytes)))
+        
+        # Use best result based on confidence
+        if vision_result['confidence_score'] > tesseract_result['confidence_score']:
+            return vision_result
+        return tesseract_result
+    
+    def _get_cached_result(self, content_hash: str) -> Optional[Dict[str, Any]]:
+        """Look up a cached OCR result, checking this worker before Redis."""
+        cached = _result_cache.get(content_hash)
+        if cached is None:
+            redis_client = self._result_cache_redis()
+            if redis_client is None:
+                return None
+            try:
+                payload = redis_client.get(f"ocr:{content_hash}")
+            except Exception as e:
+                logger.warning(f"OCR result cache lookup failed: {e}")
+                return None
+            if payload is None:
+                return None
+            cached = tuple(json.loads(payload))
+            _result_cache.set(content_hash, cached)
+        
+        logger.info(f"OCR result cache hit for image {content_hash}")
+        return dict(zip(OCR_RESULT_FIELDS, cached))
+    
+    def _set_cached_result(self, content_hash: str, result: Dict[str, Any]) -> None:
+        """Store an OCR result for this worker and, when configured, in Redis."""
+        cached = tuple(result[field] for field in OCR_RESULT_FIELDS)
+        _result_cache.set(content_hash, cached)
+        
+        redis_client = self._result_cache_redis()
+        if redis_client is not None:
+            try:
+                redis_client.set(f"ocr:{content_hash}", json.dumps(cached), ex=OCR_RESULT_CACHE_TTL)
+            except Exception as e:
+                logger.warning(f"OCR result cache write failed: {e}")
+    
+    def _result_cache_redis(self):
+        """Redis client for the OCR result cache shared by all workers.
+        
+        Built from the app's REDIS_URL on first use and kept for the life of
+        the process. Returns None outside an app context before the client
+        exists, or when REDIS_URL is not configured.
+        """
+        if self._redis_client is _REDIS_CLIENT_UNSET:
+            if not has_app_context():
+                return None
+            with self._redis_client_lock:
+                if self._redis_client is _REDIS_CLIENT_UNSET:
+                    self._redis_client = self._create_redis_client(current_app.config.get('REDIS_URL'))
+        return self._redis_client
+    
+    def _create_redis_client(self, redis_url: Optional[str]):
+        """Create the result cache's Redis client (connects on first command)."""
+        if not redis_url:
+            return None
+        try:
+            return redis.Redis.from_url(
+                redis_url,
+                socket_connect_timeout=OCR_RESULT_CACHE_REDIS_TIMEOUT,
+                socket_timeout=OCR_RESULT_CACHE_REDIS_TIMEOUT
+            )
+        except Exception as e:
+            logger.warning(f"OCR result cache Redis client initialization failed: {e}")
+            return None
+    
+    def _download_image_bytes(self, image_url: str) -> bytes:
+        """Download image from URL or load from local file and return the encoded bytes."""
         try:
             # Handle local file URLs (for development/testing)
             if image_url.startswith('file://'):
                 local_path = image_url[7:]  # Remove 'file://' prefix
-                return Image.open(local_path)
+                with open(local_path, 'rb') as f:
+                    return f.read()
             
             # Handle remote URLs (production with Cloudinary)
-            response = requests.get(image_url, timeout=10)
+            response = _http_session.get(image_url, timeout=10)
             response.raise_for_status()
-            return Image.open(BytesIO(response.content))
+            return response.content
         except Exception as e:
             raise ValueError(f"Failed to load image from {image_url}: {e}")
     
-    def _extract_with_tesseract(self, image: Image.Image) -> Dict[str, Any]:
-        """Extract text using Tesseract OCR."""
+    def _extract_with_tesseract(self, image: Union[Image.Image, np.ndarray]) -> Dict[str, Any]:
+        """Extract text using Tesseract OCR from a PIL Image or OpenCV array."""
         try:
-            # Convert PIL Image to numpy array for OpenCV
-            image_np = np.array(image)
+            # Convert PIL Image to numpy array for OpenCV (arrays are used as-is)
+            image_np = np.asarray(image)
             if len(image_np.shape) == 3:
                 image_np = cv2.cvtColor(image_np, cv2.COLOR_RGB2GRAY)
             
-            # Extract text with confidence data
-            extracted_text = pytesseract.image_to_string(
-                image_np, 
-                config=self.tesseract_config,
-                lang='spa+eng'
-            )
-            
-            # Get confidence data
-            confidence_data = pytesseract.image_to_data(
-                image_np, 
-                config=self.tesseract_config,
-                lang='spa+eng',
-                output_type=pytesseract.Output.DICT
-            )
+            if self._tess_api is not None:
+                extracted_text, confidences = self._run_tesserocr(image_np)
+            else:
+                import pytesseract
+                
+                # Extract words and their confidences in a single Tesseract run
+                confidence_data = pytesseract.image_to_data(
+                    image_np, 
+                    config=self.tesseract_config,
+                    lang='spa+eng',
+                    output_type=pytesseract.Output.DICT
+                )
+                extracted_text = self._text_from_tesseract_data(confidence_data)
+                confidences = [float(conf) for conf in confidence_data['conf'] if float(conf) > 0]
             
             # Calculate average confidence
-            confidences = [int(conf) for conf in confidence_data['conf'] if int(conf) > 0]
             avg_confidence = (sum(confidences) / len(confidences) / 100) if confidences else 0.0
             
             # Extract weight from text
@@ -181,6 +374,23 @@ class OCRService:
                 'ocr_engine': 'tesseract'
             }
     
+    def _text_from_tesseract_data(self, data: Dict[str, list]) -> str:
+        """Rebuild the recognized text from image_to_data words, one line per text line."""
+        lines = {}
+        for word, block, par, line in zip(data['text'], data['block_num'],
+                                          data['par_num'], data['line_num']):
+            if word.strip():
+                lines.setdefault((block, par, line), []).append(word.strip())
+        return '\n'.join(' '.join(words) for words in lines.values())
+    
+    def _run_tesserocr(self, image_np: np.ndarray) -> Tuple[str, List[int]]:
+        """Recognize text in-process with the persistent tesserocr API."""
+        with self._tess_lock:
+            self._tess_api.SetImage(Image.fromarray(image_np))
+            text = self._tess_api.GetUTF8Text()
+            confidences = [conf for conf in self._tess_api.AllWordConfidences() if conf > 0]
+        return text, confidences
+    
     def _extract_with_google_vision(self, image: Image.Image) -> Dict[str, Any]:
         """Extract text using Google Vision API."""
         if not self.vision_client:
@@ -193,19 +403,19 @@ class OCRService:
             }
         
         try:
-            # Convert PIL Image to bytes
+            # Convert PIL Image to JPEG bytes (a fraction of the PNG upload size)
+            if image.mode not in ('RGB', 'L'):
+                image = image.convert('RGB')
             img_byte_arr = BytesIO()
-            image.save(img_byte_arr, format='PNG')
+            image.save(img_byte_arr, format='JPEG', quality=VISION_JPEG_QUALITY)
             img_byte_arr = img_byte_arr.getvalue()
             
-            # Create Vision API image object
-            vision_image = vision.Image(content=img_byte_arr)
-            
-            # Perform text detection
-            response = self.vision_client.text_detection(image=vision_image)
+            # Perform text detection (batched with other pending requests)
+            response = self.vision_batcher.annotate(img_byte_arr)
             texts = response.text_annotations
             
             if response.error.message:
+                from google.api_core.exceptions import GoogleAPIError
                 raise GoogleAPIError(response.error.message)
             
             if texts:
@@ -240,6 +450,17 @@ class OCRService:
                 'ocr_engine': 'google_vision'
             }
     
+    def _annotate_vision_batch(self, contents: List[bytes]) -> List[Any]:
+        """Run text detection for several encoded images in one Vision request."""
+        from google.cloud import vision
+        
+        feature = vision.Feature(type_=vision.Feature.Type.TEXT_DETECTION)
+        response = _vision_retry()(self.vision_client.batch_annotate_images)(requests=[
+            vision.AnnotateImageRequest(image=vision.Image(content=content), features=[feature])
+            for content in contents
+        ])
+        return list(response.responses)
+    
     def _extract_weight_from_text(self, text: str) -> Optional[float]:
         """
         Extract weight value from OCR text using pattern recognition.
@@ -248,23 +469,14 @@ class OCRService:
         # Clean text and convert to lowercase
         text = text.lower().replace(',', '.')
         
-        # Pattern to match weight values: number + optional decimal + weight unit
-        weight_patterns = [
-            r'(\d+\.?\d*)\s*kg',  # X.X kg
-            r'(\d+\.?\d*)\s*k',   # X.X k
-            r'(\d+\.?\d*)\s*g',   # X.X g (convert to kg)
-            r'peso\s*:?\s*(\d+\.?\d*)',  # peso: X.X
-            r'weight\s*:?\s*(\d+\.?\d*)',  # weight: X.X
-        ]
-        
-        for pattern in weight_patterns:
-            matches = re.findall(pattern, text)
-            if matches:
+        for pattern, in_grams in _WEIGHT_PATTERNS:
+            match = pattern.search(text)
+            if match:
                 try:
-                    weight = float(matches[0])
+                    weight = float(match.group(1))
                     
                     # Convert grams to kilograms if necessary
-                    if 'g' in pattern and 'kg' not in pattern:
+                    if in_grams:
                         weight = weight / 1000
                     
                     # Validate weight range (reasonable for meat boxes)
@@ -275,12 +487,9 @@ class OCRService:
                     continue
         
         # If no pattern matches, try to extract any number that could be a weight
-        number_pattern = r'\b(\d+\.?\d*)\b'
-        numbers = re.findall(number_pattern, text)
-        
-        for num_str in numbers:
+        for match in _NUMBER_PATTERN.finditer(text):
             try:
-                num = float(num_str)
+                num = float(match.group(1))
                 # Reasonable weight range for meat boxes in kg
                 if 0.1 <= num <= 50.0:
                     return num
@@ -301,19 +510,16 @@ class OCRService:
     def _log_ocr_processing(self, registration_id: str, extracted_text: str, 
                           confidence_score: float, processing_time_ms: int, 
                           ocr_engine: str) -> None:
-        """Log OCR processing attempt to database."""
+        """Queue an OCR processing attempt for the background log writer."""
         try:
-            ocr_log = OCRProcessingLog(
-                registration_id=registration_id,
-                extracted_text=extracted_text,
-                confidence_score=confidence_score,
-                processing_time_ms=processing_time_ms,
-                ocr_engine=ocr_engine
-            )
-            
-            db.session.add(ocr_log)
-            db.session.commit()
+            ocr_log_writer.submit(current_app._get_current_object(), {
+                'registration_id': uuid.UUID(str(registration_id)),
+                'extracted_text': extracted_text,
+                'confidence_score': confidence_score,
+                'processing_time_ms': processing_time_ms,
+                'ocr_engine': ocr_engine,
+                'created_at': datetime.utcnow()
+            })
             
         except Exception as e:
             logger.error(f"Failed to log OCR processing: {e}")
-            db.session.rollback()
\ No newline at end of file
@@ -0,0 +1,105 @@
+"""Registration export queries shared by the inline and background export paths."""
+from sqlalchemy import select, tuple_
+from app.models import db
+from app.models.registration import WeightRegistration
+from app.models.user import User
+from app.utils.dates import parse_ymd
+from app.utils.serialization import REGISTRATION_ROW_COLUMNS
+
+# Rows fetched per keyset batch
+EXPORT_BATCH_SIZE = 1000
+
+# Accepted filter keys, as sent in the export query string
+EXPORT_FILTER_KEYS = ('date_from', 'date_to', 'supplier', 'cut_type', 'user_id')
+
+CSV_HEADER = [
+    'ID',
+    'Weight (kg)',
+    'Cut Type',
+    'Supplier',
+    'Registered By',
+    'User Role',
+    'Photo URL',
+    'OCR Confidence',
+    'Sync Status',
+    'Created At',
+    'Updated At'
+]
+
+
+def build_export_statement(filters):
+    """Build the export SELECT for a set of already validated filters.
+
+    Args:
+        filters: Dict with any of EXPORT_FILTER_KEYS; dates as YYYY-MM-DD strings
+
+    Returns:
+        Select over REGISTRATION_ROW_COLUMNS joined with the registering user
+    """
+    query = select(*REGISTRATION_ROW_COLUMNS).join(
+        User, WeightRegistration.registered_by == User.id
+    )
+
+    if filters.get('date_from'):
+        query = query.filter(WeightRegistration.created_at >= parse_ymd(filters['date_from']))
+    if filters.get('date_to'):
+        query = query.filter(WeightRegistration.created_at < parse_ymd(filters['date_to']))
+    if filters.get('supplier'):
+        query = query.filter(WeightRegistration.supplier.ilike(f"%{filters['supplier']}%"))
+    if filters.get('cut_type'):
+        query = query.filter(WeightRegistration.cut_type == filters['cut_type'])
+    if filters.get('user_id'):
+        query = query.filter(WeightRegistration.registered_by == filters['user_id'])
+
+    return query
+
+
+def iter_export_batches(query, batch_size=EXPORT_BATCH_SIZE):
+    """Yield export rows newest first in keyset batches.
+
+    Each batch seeks on (created_at, id), served by ix_wr_created_at_id, so
+    memory stays flat and no batch pays an OFFSET or full-range sort.
+
+    Args:
+        query: Statement from build_export_statement()
+        batch_size: Rows fetched per round trip
+
+    Yields:
+        Lists of row mappings keyed by the REGISTRATION_ROW_COLUMNS names
+    """
+    last_key = None
+    while True:
+        batch_query = query
+        if last_key is not None:
+            batch_query = batch_query.where(
+                tuple_(WeightRegistration.created_at, WeightRegistration.id) < last_key
+            )
+        rows = db.session.execute(
+            batch_query.order_by(
+                WeightRegistration.created_at.desc(),
+                WeightRegistration.id.desc()
+            ).limit(batch_size)
+        ).mappings().all()
+
+        if rows:
+            yield rows
+        if len(rows) < batch_size:
+            break
+        last_key = (rows[-1]['created_at'], rows[-1]['id'])
+
+
+def csv_row(row):
+    """Format an export row mapping as a CSV record matching CSV_HEADER."""
+    return [
+        str(row['id']),
+        row['weight'],
+        row['cut_type'],
+        row['supplier'],
+        row['user_name'],
+        row['user_role'],
+        row['photo_url'] or '',
+        row['ocr_confidence'] or '',
+        row['sync_status'],
+        row['created_at'].isoformat(),
+        row['updated_at'].isoformat() if row['updated_at'] else ''
+    ]
@@ -0,0 +1,79 @@
+"""Pre-aggregated supplier statistics backed by a materialized view."""
+import time
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import Integer, cast, column, func, table, text
+from app.models import db
+
+# Lightweight handle on mv_supplier_daily_stats (see migration 003_supplier_stats_mv)
+supplier_daily_stats = table(
+    'mv_supplier_daily_stats',
+    column('supplier'),
+    column('day'),
+    column('registrations'),
+    column('total_weight')
+)
+
+
+def top_suppliers_from_view(date_from, date_to, limit=5):
+    """Get top suppliers by total weight from the materialized view.
+
+    Mirrors the live supplier aggregation in the stats endpoint for
+    unscoped (supervisor) requests. Data is as fresh as the last refresh.
+
+    Args:
+        date_from: First day included in the range
+        date_to: Range end (exclusive, matching the live query's day bound)
+        limit: Maximum number of suppliers to return
+
+    Returns:
+        List of (supplier, count, total_weight) tuples ordered by weight
+    """
+    total_weight = func.sum(supplier_daily_stats.c.total_weight)
+    return db.session.query(
+        supplier_daily_stats.c.supplier,
+        # SUM(bigint) is numeric in PostgreSQL; keep counts as integers
+        cast(func.sum(supplier_daily_stats.c.registrations), Integer),
+        total_weight
+    ).filter(
+        supplier_daily_stats.c.day >= date_from,
+        supplier_daily_stats.c.day < date_to
+    ).group_by(
+        supplier_daily_stats.c.supplier
+    ).order_by(
+        total_weight.desc()
+    ).limit(limit).all()
+
+
+def refresh_supplier_stats():
+    """Refresh the supplier statistics materialized view.
+
+    Uses CONCURRENTLY so readers of the stats endpoint are never blocked.
+    """
+    # REFRESH ... CONCURRENTLY cannot run inside a transaction block
+    with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        conn.execute(text('REFRESH MATERIALIZED VIEW CONCURRENTLY mv_supplier_daily_stats'))
+
+
+@click.command('refresh-supplier-stats')
+@click.option('--interval', type=int, default=0,
+              help='Keep refreshing every N seconds (0 = refresh once and exit).')
+@with_appcontext
+def refresh_supplier_stats_command(interval):
+    """Refresh the supplier statistics materialized view."""
+    while True:
+        started = time.monotonic()
+        try:
+            refresh_supplier_stats()
+            current_app.logger.info(
+                f"Supplier stats view refreshed in {(time.monotonic() - started) * 1000:.0f}ms"
+            )
+        except Exception as e:
+            current_app.logger.error(f"Error refreshing supplier stats view: {str(e)}")
+            if not interval:
+                raise
+
+        if not interval:
+            break
+        time.sleep(max(0, interval - (time.monotonic() - started)))
@@ -0,0 +1,63 @@
+"""
+Request coalescing for Google Vision text detection.
+
+Concurrent OCR fallbacks in a worker are grouped into a single
+batch_annotate_images call instead of one text_detection RPC each.
+"""
+
+import logging
+from concurrent.futures import Future
+from typing import Any, Callable, List
+
+from app.services.background_batch import BackgroundBatcher
+
+logger = logging.getLogger(__name__)
+
+# Vision accepts at most 16 images per batch_annotate_images request
+VISION_MAX_BATCH_SIZE = 16
+VISION_MAX_WAIT_TIME = 0.05  # seconds to wait for more requests to join a batch
+
+
+class VisionBatcher(BackgroundBatcher):
+    """Collect Vision requests from many threads and send them in batches.
+
+    Each batch of pending images is sent with one ``annotate_batch`` call.
+    Each caller blocks on its own future until the matching response is
+    available.
+    """
+
+    def __init__(self, annotate_batch: Callable[[List[bytes]], List[Any]],
+                 max_batch_size: int = VISION_MAX_BATCH_SIZE,
+                 max_wait_time: float = VISION_MAX_WAIT_TIME):
+        super().__init__(max_batch_size, max_wait_time, thread_name='vision-batcher')
+        self.annotate_batch = annotate_batch
+
+    def annotate(self, content: bytes, timeout: float = 30) -> Any:
+        """
+        Queue an encoded image and wait for its Vision response.
+
+        Args:
+            content: Encoded image bytes
+            timeout: Seconds to wait for the batch to complete
+
+        Returns:
+            The AnnotateImageResponse for this image
+        """
+        future = Future()
+        self._put((content, future))
+        return future.result(timeout=timeout)
+
+    def _process_batch(self, batch: list) -> None:
+        """Send one batch and hand each response back to its caller."""
+        try:
+            responses = self.annotate_batch([content for content, _ in batch])
+            if len(responses) != len(batch):
+                raise ValueError(f"Vision returned {len(responses)} responses for {len(batch)} images")
+        except Exception as e:
+            logger.error(f"Vision batch of {len(batch)} images failed: {e}")
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        for (_, future), response in zip(batch, responses):
+            future.set_result(response)
@@ -1,45 +1,101 @@
 """Audit logging utilities for tracking registration changes."""
 from datetime import datetime
-from flask import request, current_app
+from flask import g, has_request_context, request, current_app
 from flask_login import current_user
+from sqlalchemy import insert
 from app.models.audit_log import RegistrationAuditLog
 from app.models import db
 
 
 def log_registration_action(registration_id, action, changes=None):
-    """Log a registration action for audit purposes.
+    """Record a registration action for audit purposes.
+    
+    Shorthand for ``log_registration_actions`` with a single event.
     
     Args:
         registration_id: UUID of the registration
         action: Action performed ('CREATE', 'UPDATE', 'DELETE')
         changes: Dictionary of field changes (old_value -> new_value)
     """
+    log_registration_actions([(registration_id, action, changes)])
+
+
+def log_registration_actions(events):
+    """Record several registration actions for audit purposes.
+    
+    The entries are inserted in the current session's transaction and are
+    committed by the caller's ``db.session.commit()``, so they share the
+    transaction (and WAL flush) of the changes they describe. They are
+    written as plain row mappings with one executemany INSERT; their ids and
+    timestamps come from the column defaults, so no ORM objects are built
+    and nothing is fetched back. Call it before committing.
+    
+    The INSERT runs inside a SAVEPOINT. If it fails, only the savepoint is
+    rolled back, so the caller's changes (flushed before the savepoint) can
+    still be committed.
+    
+    UPDATE events without field changes are skipped: a repeated request that
+    leaves the registration as it was has nothing to audit.
+    
+    Args:
+        events: Iterable of (registration_id, action, changes) tuples
+    """
+    events = [event for event in events if event[1] != 'UPDATE' or event[2]]
+    if not events:
+        return
+    
     try:
-        # Get request metadata
-        ip_address = request.remote_addr if request else None
-        user_agent = request.headers.get('User-Agent') if request else None
+        # Request metadata is the same for every event
+        user_id = current_user.id
+        ip_address, user_agent = _request_audit_metadata()
         
-        # Create audit log entry
-        audit_log = RegistrationAuditLog(
-            registration_id=registration_id,
-            action=action,
-            user_id=current_user.id,
-            changes=changes,
-            ip_address=ip_address,
-            user_agent=user_agent
-        )
+        rows = [
+            {
+                'registration_id': registration_id,
+                'action': action,
+                'user_id': user_id,
+                'changes': changes,
+                'ip_address': ip_address,
+                'user_agent': user_agent
+            }
+            for registration_id, action, changes in events
+        ]
         
-        db.session.add(audit_log)
-        db.session.commit()
+        with db.session.begin_nested():
+            db.session.execute(insert(RegistrationAuditLog), rows)
         
-        current_app.logger.info(
-            f"Audit log created: {action} on registration {registration_id} by user {current_user.id}"
-        )
+        for row in rows:
+            current_app.logger.info(
+                f"Audit log recorded: {row['action']} on registration "
+                f"{row['registration_id']} by user {user_id}"
+            )
         
     except Exception as e:
+        # Don't let audit logging failures break the main operation. The
+        # savepoint has already been rolled back; a full rollback here would
+        # discard the caller's changes.
         current_app.logger.error(f"Failed to create audit log: {str(e)}")
-        # Don't let audit logging failures break the main operation
-        db.session.rollback()
+
+
+def _request_audit_metadata():
+    """Get the client IP and User-Agent for audit entries.
+    
+    Read from the request once and cached on ``g``, so every audit call in the
+    same request reuses them.
+    
+    Returns:
+        Tuple of (ip_address, user_agent); (None, None) outside a request
+    """
+    if not has_request_context():
+        return None, None
+    
+    metadata = getattr(g, '_audit_metadata', None)
+    if metadata is None:
+        metadata = g._audit_metadata = (
+            request.remote_addr,
+            sanitize_user_agent(request.headers.get('User-Agent'))
+        )
+    return metadata
 
 
 def calculate_changes(old_obj, new_data):
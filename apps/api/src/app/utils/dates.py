@@ -0,0 +1,28 @@
+"""Date parsing utilities for query parameters."""
+from datetime import date
+
+
+def parse_ymd(value):
+    """Parse a YYYY-MM-DD string into a date.
+
+    Fast replacement for ``datetime.strptime(value, '%Y-%m-%d').date()``
+    on the fixed format used by query parameters. It slices the string
+    directly instead of going through the regex-based strptime machinery.
+
+    Args:
+        value: Date string in YYYY-MM-DD format
+
+    Returns:
+        Parsed date object
+
+    Raises:
+        ValueError: If the string is not a valid YYYY-MM-DD date
+    """
+    if len(value) != 10 or value[4] != '-' or value[7] != '-':
+        raise ValueError(f"Invalid date format: {value!r}. Use YYYY-MM-DD")
+
+    digits = value[0:4] + value[5:7] + value[8:10]
+    if not (digits.isascii() and digits.isdigit()):
+        raise ValueError(f"Invalid date format: {value!r}. Use YYYY-MM-DD")
+
+    return date(int(value[0:4]), int(value[5:7]), int(value[8:10]))
@@ -0,0 +1,61 @@
+"""Fast JSON response helpers backed by orjson."""
+from datetime import datetime
+from decimal import Decimal
+import orjson
+from flask import current_app, request
+
+
+def _default(obj):
+    """Serialize types orjson does not handle natively.
+
+    Args:
+        obj: Object that orjson could not serialize
+
+    Returns:
+        JSON-compatible representation of the object
+    """
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def ojsonify(payload, status=200):
+    """Build a JSON response encoded with orjson.
+
+    Drop-in replacement for ``jsonify(payload), status`` on hot endpoints.
+    datetime, date and UUID values are serialized natively; Decimal values
+    are converted to float to match the models' ``to_dict()`` output.
+
+    Args:
+        payload: Dictionary or list to serialize
+        status: HTTP status code for the response
+
+    Returns:
+        Flask response with application/json mimetype
+    """
+    return current_app.response_class(
+        orjson.dumps(payload, default=_default),
+        status=status,
+        mimetype='application/json'
+    )
+
+
+def error_response(code, message, status):
+    """Build the standard API error response.
+
+    Args:
+        code: Machine-readable error code (e.g. VALIDATION_ERROR)
+        message: Human-readable error message
+        status: HTTP status code for the response
+
+    Returns:
+        Flask response with the {'error': {...}} envelope
+    """
+    return ojsonify({
+        'error': {
+            'code': code,
+            'message': message,
+            'timestamp': datetime.utcnow().isoformat(),
+            'requestId': request.headers.get('X-Request-ID', 'unknown')
+        }
+    }, status)
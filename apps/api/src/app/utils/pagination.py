@@ -1,27 +1,54 @@
 """Pagination utilities for efficient data retrieval."""
 import base64
-import json
+import sys
+import orjson
 from datetime import datetime
+from decimal import Decimal, InvalidOperation
 from flask import request
-from sqlalchemy import desc, asc
+from sqlalchemy import desc, asc, tuple_
+
+from app.models.registration import WeightRegistration
+
+
+if sys.version_info >= (3, 11):
+    # fromisoformat accepts a trailing Z natively
+    _parse_datetime = datetime.fromisoformat
+else:
+    def _parse_datetime(value):
+        """Parse an ISO 8601 cursor value, accepting a trailing Z."""
+        return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
+# Columns each model may be paginated on, mapped to (column, parser), where
+# the parser turns a decoded cursor value back into the column's Python type
+CURSOR_ORDER_FIELDS = {
+    WeightRegistration: {
+        'created_at': (WeightRegistration.created_at, _parse_datetime),
+        'weight': (WeightRegistration.weight, Decimal),
+        'supplier': (WeightRegistration.supplier, str),
+        'cut_type': (WeightRegistration.cut_type, str),
+    },
+}
 
 
 def encode_cursor(data):
-    """Encode cursor data to base64 string.
+    """Encode cursor data to an unpadded URL-safe base64 string.
     
     Args:
         data: Dictionary containing cursor data
         
     Returns:
-        Base64 encoded cursor string
+        Base64 encoded cursor string, safe to use in a query string as-is
     """
-    cursor_json = json.dumps(data, default=str)
-    return base64.b64encode(cursor_json.encode()).decode()
+    return base64.urlsafe_b64encode(orjson.dumps(data, default=str)).rstrip(b'=').decode('ascii')
 
 
 def decode_cursor(cursor_str):
     """Decode base64 cursor string to data.
     
+    Accepts both unpadded URL-safe cursors and the padded standard base64
+    cursors issued before them.
+    
     Args:
         cursor_str: Base64 encoded cursor string
         
@@ -29,54 +56,99 @@ def decode_cursor(cursor_str):
         Dictionary containing cursor data or None if invalid
     """
     try:
-        cursor_json = base64.b64decode(cursor_str.encode()).decode()
-        return json.loads(cursor_json)
-    except (ValueError, json.JSONDecodeError):
+        padded = cursor_str + '=' * (-len(cursor_str) % 4)
+        return orjson.loads(base64.urlsafe_b64decode(padded))
+    except ValueError:  # binascii.Error and orjson.JSONDecodeError
+        return None
+
+
+def get_cursor_value(cursor, key):
+    """Get a value carried in a pagination cursor.
+    
+    Args:
+        cursor: Cursor string from previous request (may be None)
+        key: Name of the carried value
+        
+    Returns:
+        The value, or None if there is no valid cursor or it lacks the key
+    """
+    if not cursor:
         return None
+    cursor_data = decode_cursor(cursor)
+    return cursor_data.get(key) if isinstance(cursor_data, dict) else None
 
 
-def apply_cursor_pagination(query, model, cursor=None, limit=20, order_by='created_at', order_dir='desc'):
+def apply_cursor_pagination(query, model, cursor=None, limit=20, order_by='created_at', order_dir='desc',
+                            generate_next_cursor=True, cursor_extra=None):
     """Apply cursor-based pagination to a SQLAlchemy query.
     
+    Pages seek on the row value (order_field, id), with the primary key as a
+    tiebreaker so rows sharing a timestamp are neither skipped nor repeated.
+    For created_at this is served by ix_wr_created_at_id (created_at DESC,
+    id DESC) as an index range scan with no sort, in either direction.
+    
     Args:
         query: SQLAlchemy query object
         model: SQLAlchemy model class
         cursor: Cursor string from previous request
         limit: Number of items per page (max 100)
-        order_by: Field to order by (default: created_at)
+        order_by: Field to order by, one of CURSOR_ORDER_FIELDS[model]
+            (default: created_at)
         order_dir: Order direction ('asc' or 'desc', default: 'desc')
+        generate_next_cursor: Set False when only this page is needed to skip
+            encoding a cursor (next_cursor is then always None)
+        cursor_extra: JSON values carried into the next cursor, such as totals
+            computed on the first page (read back with get_cursor_value)
         
     Returns:
         Tuple of (items, next_cursor, has_next)
+        
+    Raises:
+        ValueError: If order_by is not a sortable field of the model
     """
     # Validate and sanitize limit
     limit = min(max(1, limit), 100)
     
     # Get the order field and direction
-    order_field = getattr(model, order_by, model.created_at)
+    order_spec = CURSOR_ORDER_FIELDS.get(model, {}).get(order_by)
+    if order_spec is None:
+        raise ValueError(f'Cannot paginate {model.__name__} on {order_by!r}')
+    order_field, parse_cursor_value = order_spec
     order_func = desc if order_dir == 'desc' else asc
     
     # Apply cursor filtering if provided
     if cursor:
         cursor_data = decode_cursor(cursor)
-        if cursor_data and order_by in cursor_data:
-            cursor_value = cursor_data[order_by]
+        if isinstance(cursor_data, dict) and order_by in cursor_data:
+            # Convert the JSON value back to the column's type
+            try:
+                cursor_value = parse_cursor_value(cursor_data[order_by])
+            except (TypeError, ValueError, InvalidOperation):
+                cursor_value = None
             
-            # Convert string back to datetime if needed
-            if order_by in ['created_at', 'updated_at'] and isinstance(cursor_value, str):
+            # Cursors issued before the id tiebreaker only carry the order value
+            cursor_id = cursor_data.get('id')
+            if cursor_id is not None:
                 try:
-                    cursor_value = datetime.fromisoformat(cursor_value.replace('Z', '+00:00'))
-                except ValueError:
+                    cursor_id = model.id.type.python_type(cursor_id)
+                except (AttributeError, TypeError, ValueError):  # uuid.UUID(5) raises AttributeError
                     cursor_value = None
             
             if cursor_value is not None:
+                if cursor_id is not None:
+                    position = tuple_(order_field, model.id)
+                    cursor_key = tuple_(cursor_value, cursor_id)
+                else:
+                    position = order_field
+                    cursor_key = cursor_value
+                
                 if order_dir == 'desc':
-                    query = query.filter(order_field < cursor_value)
+                    query = query.filter(position < cursor_key)
                 else:
-                    query = query.filter(order_field > cursor_value)
+                    query = query.filter(position > cursor_key)
     
     # Apply ordering and limit
-    query = query.order_by(order_func(order_field))
+    query = query.order_by(order_func(order_field), order_func(model.id))
     
     # Fetch one extra item to check if there are more pages
     items = query.limit(limit + 1).all()
@@ -88,15 +160,13 @@ def apply_cursor_pagination(query, model, cursor=None, limit=20, order_by='creat
     
     # Generate next cursor
     next_cursor = None
-    if has_next and items:
+    if generate_next_cursor and has_next and items:
         last_item = items[-1]
-        cursor_value = getattr(last_item, order_by)
-        
-        # Convert datetime to string for JSON serialization
-        if isinstance(cursor_value, datetime):
-            cursor_value = cursor_value.isoformat()
-        
-        next_cursor = encode_cursor({order_by: cursor_value})
+        # orjson writes datetimes as isoformat() strings and UUIDs as str, which
+        # the CURSOR_ORDER_FIELDS parsers turn back into column values
+        next_cursor = encode_cursor({
+            **(cursor_extra or {}), order_by: getattr(last_item, order_by), 'id': last_item.id
+        })
     
     return items, next_cursor, has_next
 
@@ -105,17 +175,24 @@ def get_pagination_params():
     """Extract pagination parameters from request.
     
     Returns:
-        Dictionary with pagination parameters
+        Dictionary with pagination parameters; limit is clamped to 1-100 and
+        falls back to 20 when it is not an integer
     """
+    args = request.args
+    try:
+        limit = min(max(1, int(args.get('limit', 20))), 100)
+    except ValueError:
+        limit = 20
+    
     return {
-        'cursor': request.args.get('cursor'),
-        'limit': request.args.get('limit', 20, type=int),
-        'order_by': request.args.get('order_by', 'created_at'),
-        'order_dir': request.args.get('order_dir', 'desc')
+        'cursor': args.get('cursor'),
+        'limit': limit,
+        'order_by': args.get('order_by', 'created_at'),
+        'order_dir': args.get('order_dir', 'desc')
     }
 
 
-def create_pagination_response(items, next_cursor, has_next, total_count=None):
+def create_pagination_response(items, next_cursor, has_next, total_count=None, serialize=None):
     """Create standardized pagination response.
     
     Args:
@@ -123,12 +200,19 @@ def create_pagination_response(items, next_cursor, has_next, total_count=None):
         next_cursor: Cursor for next page (None if no next page)
         has_next: Boolean indicating if there are more pages
         total_count: Optional total count of items
+        serialize: Optional function turning one item into a dict, e.g.
+            serialize_registration_row for column rows. Defaults to the
+            items' own to_dict() when they have one.
         
     Returns:
         Dictionary with pagination metadata
     """
+    # Pick the serializer once for the page instead of probing every item
+    if serialize is None and items and hasattr(items[0], 'to_dict'):
+        serialize = type(items[0]).to_dict
+    
     response = {
-        'items': [item.to_dict() if hasattr(item, 'to_dict') else item for item in items],
+        'items': [serialize(item) for item in items] if serialize else list(items),
         'pagination': {
             'has_next': has_next,
             'next_cursor': next_cursor,
@@ -1,49 +1,109 @@
 """Rate limiting utilities for API endpoints."""
+import threading
 import time
+from collections import OrderedDict
 from functools import wraps
-from flask import request, jsonify, current_app
+from flask import request, jsonify, current_app, g
 from flask_login import current_user
 from datetime import datetime, timedelta
-from collections import defaultdict, deque
+
+# Number of independently locked bucket dicts (must be a power of two)
+RATE_LIMIT_SHARDS = 16
+
+# Keys tracked before the least recently seen ones are evicted
+RATE_LIMIT_MAX_KEYS = 100_000
 
 
 class InMemoryRateLimiter:
-    """Simple in-memory rate limiter for development/testing."""
+    """Simple in-memory token bucket rate limiter for development/testing.
     
-    def __init__(self):
-        # Store request timestamps per user/IP
-        self.requests = defaultdict(deque)
+    Each key holds ``limit`` tokens that refill at ``limit / window_seconds``
+    per second, so both checks are O(1) and a key costs two floats instead of
+    one timestamp per request in the window.
     
-    def is_allowed(self, key, limit, window_seconds):
-        """Check if request is allowed based on rate limit."""
-        now = time.time()
-        window_start = now - window_seconds
+    Buckets are spread over ``RATE_LIMIT_SHARDS`` dicts, each with its own
+    lock, so request threads only contend with clients on the same shard.
+    Each shard keeps its keys in LRU order and evicts the least recently seen
+    beyond its share of ``max_keys``; an evicted key starts again with a full
+    bucket, as it would have after being idle for a window.
+    """
+    
+    def __init__(self, max_keys=RATE_LIMIT_MAX_KEYS):
+        self.max_keys_per_shard = max(1, max_keys // RATE_LIMIT_SHARDS)
+        # (lock, {key: (tokens, last_refill)} in LRU order) per shard
+        self.shards = [(threading.Lock(), OrderedDict()) for _ in range(RATE_LIMIT_SHARDS)]
+    
+    def _shard(self, key):
+        """Get the (lock, buckets) shard holding a key."""
+        return self.shards[hash(key) & (RATE_LIMIT_SHARDS - 1)]
+    
+    def check(self, key, limit, window_seconds):
+        """Take a token for a request if one is available.
         
-        # Remove old requests outside the window
-        while self.requests[key] and self.requests[key][0] < window_start:
-            self.requests[key].popleft()
+        Args:
+            key: Rate limit key (user or IP)
+            limit: Number of requests allowed per window
+            window_seconds: Window length in seconds
         
-        # Check if under limit
-        if len(self.requests[key]) < limit:
-            self.requests[key].append(now)
-            return True
+        Returns:
+            Tuple of (allowed, seconds until the next request would be allowed)
+        """
+        lock, buckets = self._shard(key)
+        refill_rate = limit / window_seconds
         
-        return False
+        with lock:
+            now = time.time()
+            tokens, last_refill = buckets.get(key, (limit, now))
+            tokens = min(limit, tokens + (now - last_refill) * refill_rate)
+            
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            
+            buckets[key] = (tokens, now)
+            buckets.move_to_end(key)
+            if len(buckets) > self.max_keys_per_shard:
+                buckets.popitem(last=False)
+        return allowed, max(0, (1 - tokens) / refill_rate)
+    
+    def is_allowed(self, key, limit, window_seconds):
+        """Check if request is allowed based on rate limit."""
+        return self.check(key, limit, window_seconds)[0]
     
-    def time_until_reset(self, key, window_seconds):
-        """Get time until rate limit resets."""
-        if not self.requests[key]:
+    def time_until_reset(self, key, limit, window_seconds):
+        """Get time until the next request is allowed under ``limit`` per window."""
+        lock, buckets = self._shard(key)
+        with lock:
+            bucket = buckets.get(key)
+        if bucket is None:
             return 0
         
-        oldest_request = self.requests[key][0]
-        reset_time = oldest_request + window_seconds
-        return max(0, reset_time - time.time())
+        tokens, last_refill = bucket
+        refill_rate = limit / window_seconds
+        tokens = min(limit, tokens + (time.time() - last_refill) * refill_rate)
+        return max(0, (1 - tokens) / refill_rate)
 
 
 # Global rate limiter instance
 rate_limiter = InMemoryRateLimiter()
 
 
+def _request_rate_limit_key(per):
+    """Get the rate limit key for this request, derived once per request.
+    
+    Stacked rate_limit decorators with the same ``per`` share the key.
+    """
+    keys = g.setdefault('_rate_limit_keys', {})
+    key = keys.get(per)
+    if key is None:
+        if per == 'user' and current_user.is_authenticated:
+            key = f"user:{current_user.id}"
+        else:
+            key = f"ip:{request.remote_addr}"
+        keys[per] = key
+    return key
+
+
 def rate_limit(limit=60, window=60, per='user'):
     """Rate limiting decorator.
     
@@ -55,15 +115,11 @@ def rate_limit(limit=60, window=60, per='user'):
     def decorator(f):
         @wraps(f)
         def decorated_function(*args, **kwargs):
-            # Determine the key for rate limiting
-            if per == 'user' and current_user.is_authenticated:
-                key = f"user:{current_user.id}"
-            else:
-                key = f"ip:{request.remote_addr}"
+            key = _request_rate_limit_key(per)
             
             # Check rate limit
-            if not rate_limiter.is_allowed(key, limit, window):
-                reset_time = rate_limiter.time_until_reset(key, window)
+            allowed, reset_time = rate_limiter.check(key, limit, window)
+            if not allowed:
                 
                 current_app.logger.warning(f"Rate limit exceeded for {key} on {request.endpoint}")
                 
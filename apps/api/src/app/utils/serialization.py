@@ -0,0 +1,61 @@
+"""Row-level serialization helpers for registration queries."""
+from app.models.registration import WeightRegistration
+from app.models.user import User
+
+
+# Registration columns joined with the registering user's columns. Selecting
+# these directly skips ORM instance hydration and the lazy user load that
+# WeightRegistration.to_dict() triggers per item.
+REGISTRATION_ROW_COLUMNS = (
+    WeightRegistration.id,
+    WeightRegistration.weight,
+    WeightRegistration.cut_type,
+    WeightRegistration.supplier,
+    WeightRegistration.registered_by,
+    WeightRegistration.photo_url,
+    WeightRegistration.ocr_confidence,
+    WeightRegistration.created_at,
+    WeightRegistration.updated_at,
+    WeightRegistration.deleted_at,
+    WeightRegistration.sync_status,
+    WeightRegistration.updated_by,
+    WeightRegistration.update_reason,
+    User.id.label('user_id'),
+    User.name.label('user_name'),
+    User.role.label('user_role'),
+    User.created_at.label('user_created_at'),
+    User.last_login.label('user_last_login'),
+)
+
+
+def serialize_registration_row(row):
+    """Serialize a REGISTRATION_ROW_COLUMNS row mapping.
+
+    Args:
+        row: Row mapping keyed by the REGISTRATION_ROW_COLUMNS names
+
+    Returns:
+        Dictionary with the same shape as WeightRegistration.to_dict()
+    """
+    return {
+        'id': str(row['id']),
+        'weight': float(row['weight']),
+        'cut_type': row['cut_type'],
+        'supplier': row['supplier'],
+        'registered_by': str(row['registered_by']),
+        'photo_url': row['photo_url'],
+        'ocr_confidence': float(row['ocr_confidence']) if row['ocr_confidence'] else None,
+        'created_at': row['created_at'].isoformat() if row['created_at'] else None,
+        'updated_at': row['updated_at'].isoformat() if row['updated_at'] else None,
+        'deleted_at': row['deleted_at'].isoformat() if row['deleted_at'] else None,
+        'sync_status': row['sync_status'],
+        'updated_by': str(row['updated_by']) if row['updated_by'] else None,
+        'update_reason': row['update_reason'],
+        'user': {
+            'id': str(row['user_id']),
+            'name': row['user_name'],
+            'role': row['user_role'],
+            'created_at': row['user_created_at'].isoformat() if row['user_created_at'] else None,
+            'last_login': row['user_last_login'].isoformat() if row['user_last_login'] else None
+        }
+    }
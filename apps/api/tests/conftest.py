@@ -2,39 +2,90 @@
 import os
 import sys
 import pytest
-import tempfile
+from functools import partial
+from sqlalchemy import event, insert
+from sqlalchemy.orm import scoped_session
 
 # Add src directory to Python path for imports
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
 
 from app import create_app
 from app.models import db, User, WeightRegistration
+from fixtures.create_test_images import ensure_test_images
 
 
-@pytest.fixture
-def app():
-    """Create Flask application for testing."""
-    # Create temporary database file
-    db_fd, db_path = tempfile.mkstemp()
+def _enable_sqlite_savepoints(engine):
+    """Let pysqlite run real BEGIN/SAVEPOINT statements.
+    
+    pysqlite's own transaction handling defers BEGIN and breaks SAVEPOINT,
+    so rollbacks of the outer test transaction would not undo anything.
+    """
+    @event.listens_for(engine, 'connect')
+    def _disable_pysqlite_transactions(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
     
+    @event.listens_for(engine, 'begin')
+    def _emit_begin(connection):
+        connection.exec_driver_sql('BEGIN')
+
+
+@pytest.fixture(scope='session')
+def _database_engine():
+    """Create the test database tables once per test session."""
     app = create_app('testing')
-    app.config.update({
-        'TESTING': True,
-        'WTF_CSRF_ENABLED': False,
-        'DATABASE_URL': f'sqlite:///{db_path}',
-        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{db_path}'
-    })
     
     with app.app_context():
+        engine = db.engine
+        if engine.dialect.name == 'sqlite':
+            _enable_sqlite_savepoints(engine)
         # Create all database tables
         db.create_all()
-        yield app
+    
+    yield engine
+    
+    with app.app_context():
         # Clean up database
         db.drop_all()
+
+
+@pytest.fixture
+def app(_database_engine):
+    """Create Flask application for testing.
+    
+    Each test gets a fresh application whose sessions run inside one outer
+    transaction on the shared test database. Sessions join it with
+    SAVEPOINTs, so code under test can commit and roll back as usual, and the
+    outer rollback leaves the tables empty for the next test.
+    """
+    app = create_app('testing')
+    app.config.update({
+        'TESTING': True,
+        'WTF_CSRF_ENABLED': False
+    })
     
-    # Close and remove temporary database file
-    os.close(db_fd)
-    os.unlink(db_path)
+    with app.app_context():
+        connection = _database_engine.connect()
+        transaction = connection.begin()
+        db.engines[None] = connection
+        
+        session = db.session
+        db.session = scoped_session(
+            partial(session.session_factory, join_transaction_mode='create_savepoint'),
+            scopefunc=session.registry.scopefunc
+        )
+        try:
+            yield app
+        finally:
+            db.session.remove()
+            db.session = session
+            transaction.rollback()
+            connection.close()
+
+
+@pytest.fixture(scope='session')
+def test_images_dir():
+    """Path to the OCR test images, generated once if missing."""
+    return ensure_test_images()
 
 
 @pytest.fixture
@@ -103,12 +154,8 @@ def sample_users(app):
             {'name': 'Pedro López', 'role': 'operator'},
         ]
         
-        users = []
-        for user_data in users_data:
-            user = User(name=user_data['name'], role=user_data['role'])
-            db.session.add(user)
-            users.append(user_data)
-        
+        # One executemany INSERT instead of a flush per user
+        db.session.execute(insert(User), users_data)
         db.session.commit()
         return users_data
 
@@ -5,12 +5,39 @@ from PIL import Image, ImageDraw, ImageFont, ImageFilter
 import numpy as np
 
 
+IMAGES_DIR = os.path.join(os.path.dirname(__file__), 'test_images')
+
+# Files written by create_test_images()
+TEST_IMAGE_NAMES = (
+    'clear_label.jpg',
+    'blurry_label.jpg',
+    'rotated_label.jpg',
+    'low_contrast_label.jpg',
+    'noisy_label.jpg',
+    'grams_label.jpg',
+    'spanish_peso_label.jpg',
+    'english_weight_label.jpg',
+    'comma_decimal_label.jpg',
+    'no_weight_label.jpg',
+)
+
+
+def ensure_test_images():
+    """Create the test images only if any of them is missing.
+    
+    Returns:
+        Path to the test images directory
+    """
+    if not all(os.path.exists(os.path.join(IMAGES_DIR, name)) for name in TEST_IMAGE_NAMES):
+        create_test_images()
+    return IMAGES_DIR
+
+
 def create_test_images():
     """Create various test images for OCR testing."""
     
     # Base directory for test images
-    base_dir = os.path.dirname(__file__)
-    images_dir = os.path.join(base_dir, 'test_images')
+    images_dir = IMAGES_DIR
     
     # Ensure directory exists
     os.makedirs(images_dir, exist_ok=True)
@@ -1,26 +1,31 @@
 """Integration tests for audit logging functionality."""
+import os
+import uuid
 import pytest
 import json
 from datetime import datetime
+from decimal import Decimal
+from types import SimpleNamespace
 from unittest.mock import patch, MagicMock
-from flask import Flask
+from flask import Flask, g
+from sqlalchemy import event
 from app.routes.registrations import registrations_bp
+from app.models import db
+from app.models.user import User
 from app.models.registration import WeightRegistration
 from app.models.audit_log import RegistrationAuditLog
-from app.utils.audit import log_registration_action
+from app.utils.audit import log_registration_action, log_registration_actions, sanitize_user_agent
 
 
 class TestAuditLoggingIntegration:
     """Integration tests for audit logging across the registration workflow."""
     
-    @pytest.fixture
+    @pytest.fixture(scope='class')
     def app(self):
-        """Create test Flask app with database setup."""
+        """Create a bare test Flask app; these tests patch ``db`` instead of using a database."""
         app = Flask(__name__)
         app.register_blueprint(registrations_bp)
-        app.config['TESTING'] = True
-        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
-        app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        app.testing = True
         return app
     
     @pytest.fixture
@@ -28,172 +33,76 @@ class TestAuditLoggingIntegration:
         """Create test client."""
         return app.test_client()
     
-    @patch('app.routes.registrations.current_user')
-    @patch('app.routes.registrations.db')
-    @patch('app.routes.registrations.log_registration_action')
-    def test_create_registration_audit_logging(self, mock_log_action, mock_db, mock_user, client):
-        """Test that creating a registration logs the action."""
-        # Setup mocks
-        mock_user.id = 'user-123'
-        mock_user.name = 'Test User'
-        mock_user.role = 'operator'
-        
-        # Mock successful registration creation
-        mock_registration = MagicMock()
-        mock_registration.id = 'reg-123'
-        mock_registration.to_dict.return_value = {
-            'id': 'reg-123',
-            'weight': 15.5,
-            'cut_type': 'jamón',
-            'supplier': 'Test Supplier'
-        }
-        
-        mock_db.session.add.return_value = None
-        mock_db.session.commit.return_value = None
-        
-        # Mock model creation
-        with patch('app.routes.registrations.WeightRegistration') as mock_model:
-            mock_model.return_value = mock_registration
-            
-            # Make request
-            response = client.post('/api/v1/registrations', 
-                                 json={
-                                     'weight': 15.5,
-                                     'cut_type': 'jamón',
-                                     'supplier': 'Test Supplier'
-                                 },
-                                 headers={'Content-Type': 'application/json'})
-            
-            # Verify response
-            assert response.status_code == 201
-            
-            # Verify audit logging was called
-            mock_log_action.assert_called_once_with('reg-123', 'CREATE', None)
+    @pytest.fixture(autouse=True)
+    def routes(self, monkeypatch):
+        """Replace the route module's collaborators with plain stand-ins."""
+        calls = []
+        
+        def log_registration_action(*args):
+            calls.append(args)
+        
+        stubs = SimpleNamespace(
+            current_user=SimpleNamespace(id='user-123', name='Test User', role='operator',
+                                         is_authenticated=True),
+            db=MagicMock(),
+            model=MagicMock(),
+            log_calls=calls,
+        )
+        # The role decorators read their own current_user before the view runs
+        monkeypatch.setattr('app.middleware.auth_middleware.current_user', stubs.current_user)
+        monkeypatch.setattr('app.routes.registrations.current_user', stubs.current_user)
+        monkeypatch.setattr('app.routes.registrations.db', stubs.db)
+        monkeypatch.setattr('app.routes.registrations.WeightRegistration', stubs.model)
+        monkeypatch.setattr('app.routes.registrations.log_registration_action', log_registration_action)
+        return stubs
     
-    @patch('app.routes.registrations.current_user')
-    @patch('app.routes.registrations.WeightRegistration')
-    @patch('app.routes.registrations.db')
-    @patch('app.routes.registrations.log_registration_action')
-    @patch('app.routes.registrations.calculate_changes')
-    def test_update_registration_audit_logging(self, mock_calc_changes, mock_log_action, 
-                                             mock_db, mock_registration, mock_user, client):
-        """Test that updating a registration logs the changes."""
-        # Setup mocks
-        mock_user.id = 'user-123'
-        mock_user.role = 'supervisor'
-        
-        # Mock existing registration
-        existing_reg = MagicMock()
-        existing_reg.id = 'reg-123'
-        existing_reg.registered_by = 'user-123'
-        existing_reg.weight = 15.5
-        existing_reg.supplier = 'Old Supplier'
-        existing_reg.to_dict.return_value = {'id': 'reg-123', 'weight': 16.0}
-        
-        mock_query = MagicMock()
-        mock_query.filter.return_value.first.return_value = existing_reg
-        mock_registration.query = mock_query
-        
-        # Mock change calculation
-        changes = {'weight': {'old': 15.5, 'new': 16.0}}
-        mock_calc_changes.return_value = changes
-        
-        # Make request
-        response = client.put('/api/v1/registrations/reg-123',
-                            json={
-                                'weight': 16.0,
-                                'update_reason': 'weight_correction'
-                            },
-                            headers={'Content-Type': 'application/json'})
-        
-        # Verify response
-        assert response.status_code == 200
-        
-        # Verify audit logging was called with changes
-        mock_log_action.assert_called_once_with('reg-123', 'UPDATE', changes)
-        
-        # Verify change calculation was called
-        mock_calc_changes.assert_called_once()
+    @pytest.fixture
+    def existing_registration(self, routes):
+        """Registration returned both by the model constructor and by lookups."""
+        registration = SimpleNamespace(
+            id='reg-123',
+            registered_by='user-123',
+            weight=15.5,
+            supplier='Old Supplier',
+            photo_url='old-photo.jpg',
+            ocr_confidence=0.8,
+            deleted_at=None,
+            deleted_by=None,
+            to_dict=lambda: {'id': 'reg-123'},
+        )
+        registration.soft_delete = lambda user_id: setattr(registration, 'deleted_by', user_id)
+        routes.model.return_value = registration
+        routes.db.session.get.return_value = registration
+        return registration
     
-    @patch('app.routes.registrations.current_user')
-    @patch('app.routes.registrations.WeightRegistration')
-    @patch('app.routes.registrations.db')
-    @patch('app.routes.registrations.log_registration_action')
-    def test_delete_registration_audit_logging(self, mock_log_action, mock_db, 
-                                             mock_registration, mock_user, client):
-        """Test that deleting a registration logs the action."""
-        # Setup mocks
-        mock_user.id = 'supervisor-456'
-        mock_user.role = 'supervisor'
-        
-        # Mock existing registration
-        existing_reg = MagicMock()
-        existing_reg.id = 'reg-123'
-        existing_reg.soft_delete = MagicMock()
-        
-        mock_query = MagicMock()
-        mock_query.filter.return_value.first.return_value = existing_reg
-        mock_registration.query = mock_query
-        
-        # Make request
-        response = client.delete('/api/v1/registrations/reg-123')
-        
-        # Verify response
-        assert response.status_code == 204
-        
-        # Verify soft delete was called
-        existing_reg.soft_delete.assert_called_once_with('supervisor-456')
-        
-        # Verify audit logging was called
-        mock_log_action.assert_called_once_with('reg-123', 'DELETE', 
-                                              {'deleted_by': 'supervisor-456'})
-    
-    @patch('app.routes.registrations.current_user')
-    @patch('app.routes.registrations.WeightRegistration')
-    @patch('app.routes.registrations.db')
-    @patch('app.routes.registrations.log_registration_action')
-    def test_photo_update_audit_logging(self, mock_log_action, mock_db, 
-                                       mock_registration, mock_user, client):
-        """Test that updating a photo logs the changes."""
-        # Setup mocks
-        mock_user.id = 'user-123'
-        mock_user.role = 'operator'
-        
-        # Mock existing registration
-        existing_reg = MagicMock()
-        existing_reg.id = 'reg-123'
-        existing_reg.registered_by = 'user-123'
-        existing_reg.photo_url = 'old-photo.jpg'
-        existing_reg.ocr_confidence = 0.8
-        existing_reg.to_dict.return_value = {'id': 'reg-123', 'photo_url': 'new-photo.jpg'}
-        
-        mock_query = MagicMock()
-        mock_query.filter.return_value.first.return_value = existing_reg
-        mock_registration.query = mock_query
-        
-        # Make request
-        response = client.patch('/api/v1/registrations/reg-123/photo',
-                              json={
-                                  'photo_url': 'https://example.com/new-photo.jpg',
-                                  'ocr_confidence': 0.95,
-                                  'update_reason': 'better_photo'
-                              },
-                              headers={'Content-Type': 'application/json'})
-        
-        # Verify response
-        assert response.status_code == 200
-        
-        # Verify audit logging was called
-        mock_log_action.assert_called_once()
-        call_args = mock_log_action.call_args
-        assert call_args[0][0] == 'reg-123'  # registration_id
-        assert call_args[0][1] == 'UPDATE'   # action
-        
-        # Verify changes include photo_url
-        changes = call_args[0][2]
-        assert 'photo_url' in changes
-        assert changes['photo_url']['old'] == 'old-photo.jpg'
-        assert changes['photo_url']['new'] == 'https://example.com/new-photo.jpg'
+    @pytest.mark.parametrize('method,path,json_body,role,status,expected_action,expected_changes', [
+        ('POST', '/api/v1/registrations',
+         {'weight': 15.5, 'cut_type': 'jamón', 'supplier': 'Test Supplier'},
+         'operator', 201, 'CREATE', None),
+        ('PUT', '/api/v1/registrations/reg-123',
+         {'weight': 16.0, 'update_reason': 'weight_correction'},
+         'supervisor', 200, 'UPDATE', {'weight': {'old': 15.5, 'new': 16.0}}),
+        ('DELETE', '/api/v1/registrations/reg-123', None,
+         'supervisor', 204, 'DELETE', {'deleted_by': 'user-123'}),
+        ('PATCH', '/api/v1/registrations/reg-123/photo',
+         {'photo_url': 'https://example.com/new-photo.jpg', 'ocr_confidence': 0.95,
+          'update_reason': 'better_photo'},
+         'operator', 200, 'UPDATE',
+         {'photo_url': {'old': 'old-photo.jpg', 'new': 'https://example.com/new-photo.jpg'},
+          'ocr_confidence': {'old': 0.8, 'new': 0.95}}),
+    ], ids=['create', 'update', 'delete', 'photo_update'])
+    def test_registration_action_is_audited(self, routes, existing_registration, client,
+                                            method, path, json_body, role, status,
+                                            expected_action, expected_changes):
+        """Test that each mutating endpoint logs its action and changes."""
+        routes.current_user.role = role
+        
+        response = client.open(path, method=method, json=json_body)
+        
+        assert response.status_code == status
+        assert routes.log_calls == [('reg-123', expected_action, expected_changes)]
+        if expected_action == 'DELETE':
+            assert existing_registration.deleted_by == 'user-123'
     
     def test_audit_log_model_creation(self):
         """Test that audit log entries are created correctly."""
@@ -221,36 +130,33 @@ class TestAuditLoggingIntegration:
         assert result['action'] == 'UPDATE'
         assert result['changes'] == {'weight': {'old': 10.0, 'new': 12.0}}
     
-    @patch('app.utils.audit.current_app')
-    @patch('app.utils.audit.current_user')
-    @patch('app.utils.audit.request')
     @patch('app.utils.audit.db')
-    def test_log_registration_action_integration(self, mock_db, mock_request, 
-                                               mock_user, mock_app):
+    def test_log_registration_action_integration(self, mock_db):
         """Test the complete audit logging workflow."""
-        # Setup mocks
-        mock_user.id = 'user-789'
-        mock_request.remote_addr = '10.0.0.1'
-        mock_request.headers.get.return_value = 'Mobile/1.0'
-        
+        app = Flask(__name__)
         changes = {
             'weight': {'old': 15.0, 'new': 16.5},
             'supplier': {'old': 'Old Supplier', 'new': 'New Supplier'}
         }
         
-        # Call the function
-        log_registration_action('reg-456', 'UPDATE', changes)
+        with patch('app.utils.audit.current_user', new=SimpleNamespace(id='user-789')):
+            with app.test_request_context(headers={'User-Agent': 'Mobile/1.0'},
+                                          environ_base={'REMOTE_ADDR': '10.0.0.1'}):
+                with patch.object(app.logger, 'info') as mock_info:
+                    log_registration_action('reg-456', 'UPDATE', changes)
         
-        # Verify database operations
-        mock_db.session.add.assert_called_once()
-        mock_db.session.commit.assert_called_once()
+        # Verify the entry is added to the caller's transaction, not committed
+        mock_db.session.execute.assert_called_once()
+        mock_db.session.begin_nested.assert_called_once()
+        mock_db.session.commit.assert_not_called()
         
         # Verify logging
-        mock_app.logger.info.assert_called_once()
+        mock_info.assert_called_once()
         
-        # Get the audit log object that was added
-        add_call_args = mock_db.session.add.call_args[0]
-        audit_log = add_call_args[0]
+        # Get the audit log row that was inserted
+        rows = mock_db.session.execute.call_args[0][1]
+        assert len(rows) == 1
+        audit_log = SimpleNamespace(**rows[0])
         
         # Verify the audit log properties
         assert audit_log.registration_id == 'reg-456'
@@ -260,21 +166,147 @@ class TestAuditLoggingIntegration:
         assert audit_log.ip_address == '10.0.0.1'
         assert audit_log.user_agent == 'Mobile/1.0'
     
-    @patch('app.utils.audit.current_app')
     @patch('app.utils.audit.db')
-    def test_audit_logging_error_handling(self, mock_db, mock_app):
+    def test_log_registration_actions_batch(self, mock_db):
+        """Test that several actions are added to the session in one call."""
+        app = Flask(__name__)
+        mock_user = MagicMock(id='user-789')
+        
+        with patch('app.utils.audit.current_user', new=mock_user):
+            with app.test_request_context(headers={'User-Agent': 'Mobile/1.0'},
+                                          environ_base={'REMOTE_ADDR': '10.0.0.1'}):
+                log_registration_actions([
+                    ('reg-1', 'UPDATE', {'weight': {'old': 10.0, 'new': 11.0}}),
+                    ('reg-2', 'DELETE', {'deleted_by': 'user-789'}),
+                ])
+        
+        mock_db.session.execute.assert_called_once()
+        mock_db.session.add.assert_not_called()
+        mock_db.session.commit.assert_not_called()
+        
+        statement, rows = mock_db.session.execute.call_args[0]
+        assert statement.entity_description['entity'] is RegistrationAuditLog
+        assert rows == [
+            {'registration_id': 'reg-1', 'action': 'UPDATE', 'user_id': 'user-789',
+             'changes': {'weight': {'old': 10.0, 'new': 11.0}},
+             'ip_address': '10.0.0.1', 'user_agent': 'Mobile/1.0'},
+            {'registration_id': 'reg-2', 'action': 'DELETE', 'user_id': 'user-789',
+             'changes': {'deleted_by': 'user-789'},
+             'ip_address': '10.0.0.1', 'user_agent': 'Mobile/1.0'},
+        ]
+    
+    @patch('app.utils.audit.db')
+    def test_request_metadata_read_once_per_request(self, mock_db):
+        """Test that audit calls in one request reuse the cached IP and User-Agent."""
+        app = Flask(__name__)
+        
+        with patch('app.utils.audit.current_user', new=MagicMock(id='user-789')), \
+                patch('app.utils.audit.sanitize_user_agent', wraps=sanitize_user_agent) as mock_sanitize:
+            with app.test_request_context(headers={'User-Agent': 'Mobile/1.0'},
+                                          environ_base={'REMOTE_ADDR': '10.0.0.1'}):
+                for registration_id in ('reg-1', 'reg-2', 'reg-3'):
+                    log_registration_action(registration_id, 'DELETE', {'deleted_by': 'user-789'})
+                
+                assert g._audit_metadata == ('10.0.0.1', 'Mobile/1.0')
+        
+        mock_sanitize.assert_called_once_with('Mobile/1.0')
+        assert mock_db.session.execute.call_count == 3
+    
+    @patch('app.utils.audit.db')
+    def test_update_without_changes_is_not_logged(self, mock_db):
+        """Test that a no-op update (e.g. re-sending the same photo) adds no entry."""
+        log_registration_action('reg-123', 'UPDATE', None)
+        log_registration_actions([('reg-123', 'UPDATE', {})])
+        
+        mock_db.session.execute.assert_not_called()
+    
+    @patch('app.utils.audit.db')
+    def test_audit_logging_error_handling(self, mock_db):
         """Test that audit logging errors don't break main operations."""
+        app = Flask(__name__)
+        
         # Setup mock to raise exception
-        mock_db.session.add.side_effect = Exception("Database error")
+        mock_db.session.execute.side_effect = Exception("Database error")
         
-        # This should not raise an exception
-        log_registration_action('reg-error', 'CREATE', None)
+        with patch('app.utils.audit.current_user', new=SimpleNamespace(id='user-789')):
+            with app.test_request_context():
+                with patch.object(app.logger, 'error') as mock_error:
+                    # This should not raise an exception
+                    log_registration_action('reg-error', 'CREATE', None)
         
         # Verify error was logged
-        mock_app.logger.error.assert_called_once()
+        mock_error.assert_called_once()
+        mock_db.session.execute.assert_called_once()
         
-        # Verify rollback was called
-        mock_db.session.rollback.assert_called_once()
+        # Verify the caller's pending changes were not rolled back
+        mock_db.session.rollback.assert_not_called()
+
+
+@pytest.mark.skipif(
+    not os.environ.get('TEST_DATABASE_URL', '').startswith('postgresql'),
+    reason='needs TEST_DATABASE_URL on PostgreSQL: the models use PostgreSQL UUID '
+           'columns, which SQLite cannot create'
+)
+class TestAuditLoggingTransaction:
+    """Audit logging against the test database, in the caller's transaction."""
+    
+    def test_failed_audit_insert_keeps_caller_change(self, app):
+        """Test that the caller's change still commits when the audit insert fails."""
+        user = User(name='audit_supervisor', role='supervisor')
+        user.id = uuid.uuid4()
+        db.session.add(user)
+        registration = WeightRegistration(
+            weight=25.5,
+            cut_type='jamón',
+            supplier='Test Supplier',
+            registered_by=user.id
+        )
+        db.session.add(registration)
+        db.session.commit()
+        registration_id = registration.id
+        
+        statements = []
+        
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement.split()[:2])
+        
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            with app.test_request_context(), \
+                    patch('app.utils.audit.current_user', new=SimpleNamespace(id=user.id)):
+                registration.weight = Decimal('30.0')
+                # registration_id is NOT NULL, so this INSERT fails in the database
+                log_registration_action(None, 'UPDATE', {'weight': {'old': 25.5, 'new': 30.0}})
+                db.session.commit()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+        
+        # PostgreSQL aborts the whole transaction on a failed statement, so the
+        # audit INSERT must be isolated in its own savepoint
+        insert_at = statements.index(['INSERT', 'INTO'])
+        assert statements[insert_at - 1][0] == 'SAVEPOINT'
+        assert statements[insert_at + 1] == ['ROLLBACK', 'TO']
+        
+        db.session.expire_all()
+        assert db.session.get(WeightRegistration, registration_id).weight == Decimal('30.0')
+        assert db.session.query(RegistrationAuditLog).count() == 0
+    
+    def test_audit_entry_commits_with_caller_change(self, app):
+        """Test that a successful audit entry is committed with the change."""
+        user = User(name='audit_supervisor', role='supervisor')
+        user.id = uuid.uuid4()
+        db.session.add(user)
+        db.session.commit()
+        registration_id = uuid.uuid4()
+        
+        with app.test_request_context(), \
+                patch('app.utils.audit.current_user', new=SimpleNamespace(id=user.id)):
+            log_registration_action(registration_id, 'DELETE', {'deleted_by': str(user.id)})
+            db.session.commit()
+        
+        audit_log = db.session.query(RegistrationAuditLog).one()
+        assert audit_log.registration_id == registration_id
+        assert audit_log.action == 'DELETE'
 
 
 if __name__ == '__main__':
@@ -1,9 +1,11 @@
 """Integration tests for authentication endpoints."""
 import pytest
-import json
 from datetime import datetime
+from unittest.mock import patch
+from flask import Flask, Request
 from app.models.user import User
 from app.models import db
+from app.routes.auth import auth_bp, MAX_LOGIN_BODY_SIZE
 
 
 class TestAuthLoginEndpoint:
@@ -16,8 +18,7 @@ class TestAuthLoginEndpoint:
         
         response = client.post(
             '/api/v1/auth/login',
-            data=json.dumps({'name': user_data['name']}),
-            content_type='application/json'
+            json={'name': user_data['name']}
         )
         
         assert response.status_code == 200
@@ -42,14 +43,13 @@ class TestAuthLoginEndpoint:
         
         response = client.post(
             '/api/v1/auth/login',
-            data=json.dumps({'name': user_data['name']}),
-            content_type='application/json'
+            json={'name': user_data['name']}
         )
         
         assert response.status_code == 200
         
-        # Check that last_login was updated
-        user = User.query.filter_by(name=user_data['name']).first()
+        # Check that last_login was updated; reload the same row by primary key
+        db.session.refresh(user)
         assert user.last_login != initial_last_login
         assert user.last_login is not None
     
@@ -57,8 +57,7 @@ class TestAuthLoginEndpoint:
         """Test login with non-existent user."""
         response = client.post(
             '/api/v1/auth/login',
-            data=json.dumps({'name': 'Nonexistent User'}),
-            content_type='application/json'
+            json={'name': 'Nonexistent User'}
         )
         
         assert response.status_code == 401
@@ -77,8 +76,7 @@ class TestAuthLoginEndpoint:
         
         response = client.post(
             '/api/v1/auth/login',
-            data=json.dumps({'name': 'Inactive User'}),
-            content_type='application/json'
+            json={'name': 'Inactive User'}
         )
         
         assert response.status_code == 401
@@ -91,8 +89,7 @@ class TestAuthLoginEndpoint:
         """Test login with missing name field."""
         response = client.post(
             '/api/v1/auth/login',
-            data=json.dumps({}),
-            content_type='application/json'
+            json={}
         )
         
         assert response.status_code == 400
@@ -105,8 +102,7 @@ class TestAuthLoginEndpoint:
         """Test login with empty name."""
         response = client.post(
             '/api/v1/auth/login',
-            data=json.dumps({'name': '   '}),
-            content_type='application/json'
+            json={'name': '   '}
         )
         
         assert response.status_code == 400
@@ -121,8 +117,7 @@ class TestAuthLoginEndpoint:
         
         response = client.post(
             '/api/v1/auth/login',
-            data=json.dumps({'name': long_name}),
-            content_type='application/json'
+            json={'name': long_name}
         )
         
         assert response.status_code == 400
@@ -131,6 +126,18 @@ class TestAuthLoginEndpoint:
         assert data['error']['code'] == 'VALIDATION_ERROR'
         assert 'must be 255 characters or less' in data['error']['message']
     
+    def test_login_body_too_large(self, client):
+        """Test that oversized login bodies are rejected before parsing."""
+        response = client.post(
+            '/api/v1/auth/login',
+            json={'name': 'A' * 5000}
+        )
+        
+        assert response.status_code == 413
+        data = response.get_json()
+        
+        assert data['error']['code'] == 'PAYLOAD_TOO_LARGE'
+    
     def test_login_invalid_json(self, client):
         """Test login with invalid JSON."""
         response = client.post(
@@ -214,8 +221,7 @@ class TestAuthenticationFlow:
         # Step 1: Login
         login_response = client.post(
             '/api/v1/auth/login',
-            data=json.dumps({'name': user_data['name']}),
-            content_type='application/json'
+            json={'name': user_data['name']}
         )
         assert login_response.status_code == 200
         
@@ -233,44 +239,23 @@ class TestAuthenticationFlow:
         protected_response = client.get('/api/v1/auth/current-user')
         assert protected_response.status_code == 401
     
-    def test_session_persistence_across_requests(self, client, sample_users):
+    def test_session_persistence_across_requests(self, client, authenticated_user):
         """Test that session persists across multiple requests."""
-        user_data = sample_users[0]
-        
-        # Login
-        login_response = client.post(
-            '/api/v1/auth/login',
-            data=json.dumps({'name': user_data['name']}),
-            content_type='application/json'
-        )
-        assert login_response.status_code == 200
-        
-        # Make multiple requests to verify session persistence
-        for _ in range(3):
+        # The second request proves the cookie survives the first one
+        for _ in range(2):
             response = client.get('/api/v1/auth/current-user')
             assert response.status_code == 200
             data = response.get_json()
-            assert data['name'] == user_data['name']
+            assert data['name'] == authenticated_user.name
     
-    def test_multiple_logins_same_user(self, client, sample_users):
+    def test_multiple_logins_same_user(self, client, authenticated_user):
         """Test multiple logins with the same user."""
-        user_data = sample_users[0]
-        
-        # First login
-        response1 = client.post(
-            '/api/v1/auth/login',
-            data=json.dumps({'name': user_data['name']}),
-            content_type='application/json'
-        )
-        assert response1.status_code == 200
-        
         # Second login (should work and update session)
-        response2 = client.post(
+        response = client.post(
             '/api/v1/auth/login',
-            data=json.dumps({'name': user_data['name']}),
-            content_type='application/json'
+            json={'name': authenticated_user.name}
         )
-        assert response2.status_code == 200
+        assert response.status_code == 200
         
         # Should still be able to access protected resources
         user_response = client.get('/api/v1/auth/current-user')
@@ -284,8 +269,7 @@ class TestErrorHandling:
         """Test that error responses follow the expected format."""
         response = client.post(
             '/api/v1/auth/login',
-            data=json.dumps({'name': 'Nonexistent User'}),
-            content_type='application/json'
+            json={'name': 'Nonexistent User'}
         )
         
         assert response.status_code == 401
@@ -307,8 +291,7 @@ class TestErrorHandling:
         """Test that request ID is included in error responses."""
         response = client.post(
             '/api/v1/auth/login',
-            data=json.dumps({'name': 'Nonexistent User'}),
-            content_type='application/json',
+            json={'name': 'Nonexistent User'},
             headers={'X-Request-ID': 'test-request-123'}
         )
         
@@ -321,11 +304,50 @@ class TestErrorHandling:
         """Test that default request ID is used when not provided."""
         response = client.post(
             '/api/v1/auth/login',
-            data=json.dumps({'name': 'Nonexistent User'}),
-            content_type='application/json'
+            json={'name': 'Nonexistent User'}
         )
         
         assert response.status_code == 401
         data = response.get_json()
         
-        assert data['error']['requestId'] == 'unknown'
\ No newline at end of file
+        assert data['error']['requestId'] == 'unknown'
+
+
+class TestLoginBodySize:
+    """Test the login body size limit on a bare app; it needs no database."""
+    
+    @pytest.fixture
+    def client(self):
+        """Create a client for an app with only the auth blueprint."""
+        app = Flask(__name__)
+        app.register_blueprint(auth_bp)
+        app.testing = True
+        return app.test_client()
+    
+    def test_oversized_body_is_rejected_before_parsing(self, client):
+        """Test that a body over MAX_LOGIN_BODY_SIZE gets 413 without being decoded."""
+        with patch.object(Request, 'get_json') as mock_get_json, \
+                patch('app.routes.auth.User') as mock_user:
+            response = client.post(
+                '/api/v1/auth/login',
+                json={'name': 'A' * MAX_LOGIN_BODY_SIZE},
+                environ_base={'REMOTE_ADDR': '10.0.0.41'}
+            )
+        
+        assert response.status_code == 413
+        assert response.get_json()['error']['code'] == 'PAYLOAD_TOO_LARGE'
+        mock_get_json.assert_not_called()
+        mock_user.query.filter_by.assert_not_called()
+    
+    def test_body_within_limit_is_parsed(self, client):
+        """Test that a normal login body passes the size check."""
+        with patch('app.routes.auth.User') as mock_user:
+            mock_user.query.filter_by.return_value.first.return_value = None
+            response = client.post(
+                '/api/v1/auth/login',
+                json={'name': 'Juan Pérez'},
+                environ_base={'REMOTE_ADDR': '10.0.0.42'}
+            )
+        
+        assert response.status_code == 401
+        mock_user.query.filter_by.assert_called_once_with(name='Juan Pérez')
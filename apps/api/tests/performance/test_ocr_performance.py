@@ -3,6 +3,7 @@
 import pytest
 import time
 import os
+from io import BytesIO
 from statistics import mean, median
 from PIL import Image
 from unittest.mock import patch
@@ -19,11 +20,6 @@ class TestOCRPerformance:
         """Create OCR service for performance testing."""
         return OCRService()
     
-    @pytest.fixture
-    def test_images_dir(self):
-        """Path to test images directory."""
-        return os.path.join(os.path.dirname(__file__), '..', 'fixtures', 'test_images')
-    
     @pytest.fixture
     def sample_test_images(self, test_images_dir):
         """Load sample test images for performance testing."""
@@ -43,6 +39,19 @@ class TestOCRPerformance:
         
         return images
     
+    @pytest.fixture
+    def sample_test_image_bytes(self, test_images_dir):
+        """Load the raw file contents of the sample test images."""
+        image_bytes = []
+        for filename in ['clear_label.jpg', 'blurry_label.jpg', 'rotated_label.jpg',
+                         'low_contrast_label.jpg', 'noisy_label.jpg']:
+            filepath = os.path.join(test_images_dir, filename)
+            if os.path.exists(filepath):
+                with open(filepath, 'rb') as f:
+                    image_bytes.append(f.read())
+        
+        return image_bytes
+    
     def measure_processing_time(self, func, *args, **kwargs):
         """Measure execution time of a function."""
         start_time = time.perf_counter()
@@ -76,8 +85,8 @@ class TestOCRPerformance:
         assert avg_time < 500, f"Average preprocessing time {avg_time:.2f}ms exceeds 500ms limit"
         assert max_time < 1000, f"Max preprocessing time {max_time:.2f}ms exceeds 1000ms limit"
     
-    @patch('app.services.ocr_service.pytesseract.image_to_string')
-    @patch('app.services.ocr_service.pytesseract.image_to_data')
+    @patch('pytesseract.image_to_string')
+    @patch('pytesseract.image_to_data')
     def test_tesseract_ocr_performance(self, mock_image_to_data, mock_image_to_string, 
                                      ocr_service, sample_test_images):
         """Test Tesseract OCR performance."""
@@ -109,7 +118,7 @@ class TestOCRPerformance:
         assert avg_time < 800, f"Average Tesseract OCR time {avg_time:.2f}ms exceeds 800ms limit"
         assert max_time < 1500, f"Max Tesseract OCR time {max_time:.2f}ms exceeds 1500ms limit"
     
-    @patch('app.services.ocr_service.vision.ImageAnnotatorClient')
+    @patch('google.cloud.vision.ImageAnnotatorClient')
     def test_google_vision_ocr_performance(self, mock_client_class, ocr_service, sample_test_images):
         """Test Google Vision OCR performance."""
         # Mock Google Vision client and response
@@ -181,18 +190,18 @@ class TestOCRPerformance:
         assert avg_time < 10, f"Average weight extraction time {avg_time:.2f}ms exceeds 10ms limit"
         assert max_time < 50, f"Max weight extraction time {max_time:.2f}ms exceeds 50ms limit"
     
-    @patch('app.services.ocr_service.OCRService._download_image')
-    @patch('app.services.ocr_service.preprocess_image_for_ocr')
+    @patch('app.services.ocr_service.OCRService._download_image_bytes')
+    @patch('app.services.ocr_service.preprocess_array_for_ocr')
     @patch('app.services.ocr_service.OCRService._extract_with_tesseract')
     @patch('app.services.ocr_service.OCRService._log_ocr_processing')
     def test_end_to_end_ocr_performance(self, mock_log, mock_tesseract, mock_preprocess, 
-                                       mock_download, ocr_service, sample_test_images):
+                                       mock_download, ocr_service, sample_test_image_bytes):
         """Test complete end-to-end OCR processing performance (<2s requirement)."""
-        if not sample_test_images:
+        if not sample_test_image_bytes:
             pytest.skip("No test images available")
         
         # Mock dependencies for consistent timing
-        mock_download.side_effect = sample_test_images
+        mock_download.side_effect = sample_test_image_bytes
         mock_preprocess.side_effect = lambda x: x  # Pass through
         mock_tesseract.return_value = {
             'extracted_text': 'PESO: 2.5 kg',
@@ -204,7 +213,7 @@ class TestOCRPerformance:
         processing_times = []
         
         # Test multiple iterations for statistical significance
-        for i in range(len(sample_test_images)):
+        for i in range(len(sample_test_image_bytes)):
             _, processing_time = self.measure_processing_time(
                 ocr_service.process_image, f'http://example.com/image{i}.jpg'
             )
@@ -234,11 +243,13 @@ class TestOCRPerformance:
         import queue
         
         # Mock OCR processing to focus on concurrency overhead
-        with patch.object(ocr_service, '_download_image') as mock_download, \
-             patch('app.services.ocr_service.preprocess_image_for_ocr') as mock_preprocess, \
+        with patch.object(ocr_service, '_download_image_bytes') as mock_download, \
+             patch('app.services.ocr_service.preprocess_array_for_ocr') as mock_preprocess, \
              patch.object(ocr_service, '_extract_with_tesseract') as mock_tesseract:
             
-            mock_download.return_value = Image.new('RGB', (200, 100), 'white')
+            buffer = BytesIO()
+            Image.new('RGB', (200, 100), 'white').save(buffer, format='PNG')
+            mock_download.return_value = buffer.getvalue()
             mock_preprocess.side_effect = lambda x: x
             mock_tesseract.return_value = {
                 'extracted_text': 'PESO: 2.5 kg',
@@ -315,22 +326,22 @@ class TestOCRPerformance:
             assert max_concurrent_time < 3000, f"Max concurrent OCR time {max_concurrent_time:.2f}ms exceeds 3000ms"
             assert total_time < 10000, f"Total concurrent processing time {total_time:.2f}ms exceeds 10000ms"
     
-    def test_memory_usage_during_processing(self, ocr_service, sample_test_images):
+    def test_memory_usage_during_processing(self, ocr_service, sample_test_image_bytes):
         """Test memory usage during OCR processing."""
         import psutil
         import gc
         
-        if not sample_test_images:
+        if not sample_test_image_bytes:
             pytest.skip("No test images available")
         
         # Get initial memory usage
         process = psutil.Process()
         initial_memory = process.memory_info().rss / 1024 / 1024  # MB
         
-        with patch.object(ocr_service, '_download_image') as mock_download, \
+        with patch.object(ocr_service, '_download_image_bytes') as mock_download, \
              patch.object(ocr_service, '_extract_with_tesseract') as mock_tesseract:
             
-            mock_download.side_effect = sample_test_images
+            mock_download.side_effect = sample_test_image_bytes
             mock_tesseract.return_value = {
                 'extracted_text': 'PESO: 2.5 kg',
                 'extracted_weight': 2.5,
@@ -341,7 +352,7 @@ class TestOCRPerformance:
             max_memory = initial_memory
             
             # Process multiple images and track memory usage
-            for i in range(len(sample_test_images)):
+            for i in range(len(sample_test_image_bytes)):
                 ocr_service.process_image(f'http://example.com/image{i}.jpg')
                 
                 current_memory = process.memory_info().rss / 1024 / 1024  # MB
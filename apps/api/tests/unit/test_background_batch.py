@@ -0,0 +1,54 @@
+"""Unit tests for the shared background batcher."""
+import threading
+
+from app.services.background_batch import BackgroundBatcher
+
+
+class BlockingBatcher(BackgroundBatcher):
+    """Batcher whose batches wait until the test releases them."""
+
+    def __init__(self, **kwargs):
+        super().__init__(max_batch_size=10, max_wait_time=0.01, thread_name='test-batcher', **kwargs)
+        self.release = threading.Event()
+        self.processed = []
+
+    def _process_batch(self, batch):
+        self.release.wait(5)
+        self.processed.extend(batch)
+
+
+class TestBackgroundBatcher:
+    """Test flushing of queued items."""
+
+    def test_flush_times_out_while_batch_is_running(self):
+        """Test that flush(timeout) gives up instead of blocking forever."""
+        batcher = BlockingBatcher()
+        batcher._put(1)
+
+        assert batcher.flush(timeout=0.05) is False
+
+        batcher.release.set()
+        assert batcher.flush(timeout=5) is True
+        assert batcher.processed == [1]
+
+    def test_exit_flush_logs_dropped_items(self, caplog):
+        """Test that items still queued after the exit timeout are reported."""
+        batcher = BlockingBatcher(exit_flush_timeout=0.05)
+        batcher._put(1)
+
+        batcher._flush_at_exit()
+
+        assert 'dropped at exit' in caplog.text
+        batcher.release.set()
+        batcher.flush()
+
+    def test_failed_batch_is_marked_done(self):
+        """Test that an exception in _process_batch does not block flush()."""
+        class FailingBatcher(BackgroundBatcher):
+            def _process_batch(self, batch):
+                raise RuntimeError('boom')
+
+        batcher = FailingBatcher(max_batch_size=10, max_wait_time=0.01, thread_name='failing-batcher')
+        batcher._put(1)
+
+        assert batcher.flush(timeout=5) is True
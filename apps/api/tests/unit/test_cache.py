@@ -0,0 +1,49 @@
+"""Unit tests for the in-process TTL cache."""
+from unittest.mock import patch
+from app.utils.cache import TTLCache
+
+
+class TestTTLCache:
+    """Test TTLCache expiry and eviction."""
+
+    def test_get_returns_stored_value(self):
+        """Test that stored values are returned before they expire."""
+        cache = TTLCache(maxsize=4, ttl=60)
+        cache.set(('2025-08-01', '2025-09-01'), b'{}')
+
+        assert cache.get(('2025-08-01', '2025-09-01')) == b'{}'
+        assert cache.get(('2025-07-01', '2025-08-01')) is None
+
+    @patch('app.utils.cache.time.monotonic')
+    def test_entries_expire_after_ttl(self, mock_monotonic):
+        """Test that entries are dropped once their TTL has passed."""
+        mock_monotonic.return_value = 100.0
+        cache = TTLCache(maxsize=4, ttl=60)
+        cache.set('key', 'value')
+
+        mock_monotonic.return_value = 159.0
+        assert cache.get('key') == 'value'
+
+        mock_monotonic.return_value = 160.0
+        assert cache.get('key') is None
+        assert len(cache) == 0
+
+    def test_evicts_least_recently_used(self):
+        """Test that the least recently used entry is evicted when full."""
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+
+        assert cache.get('a') == 1
+        assert cache.get('b') is None
+        assert cache.get('c') == 3
+
+    def test_clear(self):
+        """Test that clear removes every entry."""
+        cache = TTLCache()
+        cache.set('a', 1)
+        cache.clear()
+
+        assert cache.get('a') is None
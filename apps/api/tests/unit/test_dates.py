@@ -0,0 +1,34 @@
+"""Unit tests for date parsing utilities."""
+from datetime import date
+import pytest
+from app.utils.dates import parse_ymd
+
+
+class TestParseYmd:
+    """Test the YYYY-MM-DD parser."""
+
+    def test_valid_date(self):
+        """Test parsing a well-formed date."""
+        assert parse_ymd('2025-08-21') == date(2025, 8, 21)
+
+    def test_leap_day(self):
+        """Test that calendar validation is applied."""
+        assert parse_ymd('2024-02-29') == date(2024, 2, 29)
+        with pytest.raises(ValueError):
+            parse_ymd('2025-02-29')
+
+    @pytest.mark.parametrize('value', [
+        '',
+        'invalid-date',
+        '2025/08/21',
+        '2025-8-21',
+        '2025-08-21T10:00',
+        '2025-13-01',
+        '2025-00-10',
+        '+025-08-21',
+        '2025-0８-21',
+    ])
+    def test_invalid_dates(self, value):
+        """Test that malformed input raises ValueError."""
+        with pytest.raises(ValueError):
+            parse_ymd(value)
@@ -0,0 +1,133 @@
+"""Unit tests for background registration exports."""
+import csv
+import gzip
+import io
+import uuid
+from datetime import datetime
+from decimal import Decimal
+from unittest.mock import patch
+import pytest
+from flask import Flask
+from app.routes.reports import _parse_export_filters
+from app.services.export_jobs import export_file_id, write_export_csv
+from app.services.registration_export import CSV_HEADER, csv_row
+
+
+def _row(**overrides):
+    """Build an export row mapping."""
+    row = {
+        'id': uuid.UUID('00000000-0000-0000-0000-000000000001'),
+        'weight': Decimal('15.500'),
+        'cut_type': 'jamón',
+        'supplier': 'Proveedor A',
+        'user_name': 'juan_operator',
+        'user_role': 'operator',
+        'photo_url': None,
+        'ocr_confidence': None,
+        'sync_status': 'synced',
+        'created_at': datetime(2025, 8, 21, 10, 30),
+        'updated_at': None
+    }
+    row.update(overrides)
+    return row
+
+
+class TestCsvRow:
+    """Test export CSV record formatting."""
+
+    def test_matches_header(self):
+        """Test that records line up with the header columns."""
+        assert len(csv_row(_row())) == len(CSV_HEADER)
+
+    def test_optional_columns_are_blank(self):
+        """Test that missing optional values are written as empty strings."""
+        record = csv_row(_row())
+
+        assert record[0] == '00000000-0000-0000-0000-000000000001'
+        assert record[6] == ''   # Photo URL
+        assert record[7] == ''   # OCR Confidence
+        assert record[9] == '2025-08-21T10:30:00'
+        assert record[10] == ''  # Updated At
+
+
+class TestWriteExportCsv:
+    """Test gzip CSV export writing."""
+
+    @patch('app.services.export_jobs.iter_export_batches')
+    def test_writes_gzipped_csv(self, mock_batches):
+        """Test that all batches are written after the header."""
+        mock_batches.return_value = iter([
+            [_row(), _row(supplier='Proveedor B')],
+            [_row(supplier='Proveedor C', updated_at=datetime(2025, 8, 22, 9, 0))]
+        ])
+        buffer = io.BytesIO()
+
+        exported = write_export_csv(object(), buffer)
+
+        records = list(csv.reader(io.StringIO(gzip.decompress(buffer.getvalue()).decode('utf-8'))))
+        assert exported == 3
+        assert records[0] == CSV_HEADER
+        assert [record[3] for record in records[1:]] == ['Proveedor A', 'Proveedor B', 'Proveedor C']
+        assert records[3][10] == '2025-08-22T09:00:00'
+
+    @patch('app.services.export_jobs.iter_export_batches')
+    def test_empty_export_has_header_only(self, mock_batches):
+        """Test that an export with no rows still has a header."""
+        mock_batches.return_value = iter([])
+        buffer = io.BytesIO()
+
+        exported = write_export_csv(object(), buffer)
+
+        assert exported == 0
+        assert gzip.decompress(buffer.getvalue()).decode('utf-8').splitlines() == [','.join(CSV_HEADER)]
+
+
+def test_export_file_id():
+    """Test that exports are stored under exports/<job id>.csv.gz."""
+    class Job:
+        id = uuid.UUID('00000000-0000-0000-0000-000000000002')
+
+    assert export_file_id(Job()) == 'exports/00000000-0000-0000-0000-000000000002.csv.gz'
+
+
+class TestParseExportFilters:
+    """Test validation of export job filters."""
+
+    @pytest.fixture(autouse=True)
+    def request_context(self):
+        """Run each test inside a request so error responses can be built."""
+        with Flask(__name__).test_request_context():
+            yield
+
+    def test_valid_filters(self):
+        """Test that valid filters are stripped and kept."""
+        user_id = str(uuid.uuid4())
+        filters, error = _parse_export_filters({'date_from': '2025-08-01', 'supplier': ' A ', 'user_id': user_id})
+
+        assert error is None
+        assert filters == {'date_from': '2025-08-01', 'supplier': 'A', 'user_id': user_id}
+
+    @pytest.mark.parametrize('body', [[], ['user_id'], 'user_id', 5])
+    def test_non_object_body_is_rejected(self, body):
+        """Test that a body that is not a JSON object is a validation error."""
+        filters, error = _parse_export_filters(body)
+
+        assert filters is None
+        assert error.status_code == 400
+        assert error.get_json()['error']['code'] == 'VALIDATION_ERROR'
+
+    @pytest.mark.parametrize('value', [5, ['a'], {'a': 1}, True])
+    def test_non_string_value_is_rejected(self, value):
+        """Test that non-string filter values are a validation error."""
+        filters, error = _parse_export_filters({'supplier': value})
+
+        assert filters is None
+        assert error.status_code == 400
+
+    def test_invalid_user_id_is_rejected(self):
+        """Test that user_id must be a UUID before the job is queued."""
+        filters, error = _parse_export_filters({'user_id': 'not-a-uuid'})
+
+        assert filters is None
+        assert error.status_code == 400
+        assert 'user_id' in error.get_json()['error']['message']
@@ -14,7 +14,8 @@ from app.utils.image_processing import (
     reduce_noise,
     sharpen_image,
     resize_for_ocr,
-    convert_to_binary
+    convert_to_binary,
+    decode_grayscale
 )
 
 
@@ -63,6 +64,14 @@ class TestImageProcessing:
             # Result should be a PIL Image
             assert isinstance(result, Image.Image)
     
+    @pytest.mark.parametrize('mode', ['RGB', 'RGBA', 'L', 'P'])
+    def test_preprocess_image_for_ocr_returns_grayscale(self, sample_pil_image, mode):
+        """Test that the pipeline converts any input mode to single-channel grayscale."""
+        result = preprocess_image_for_ocr(sample_pil_image.convert(mode))
+        
+        assert result.mode == 'L'
+        assert result.size == sample_pil_image.size
+    
     def test_preprocess_image_for_ocr_failure_fallback(self, sample_pil_image):
         """Test preprocessing failure fallback to original image."""
         with patch('app.utils.image_processing.enhance_contrast') as mock_contrast:
@@ -172,7 +181,7 @@ class TestImageProcessing:
     def test_correct_rotation_with_lines_detected(self, sample_cv_image):
         """Test rotation correction when lines are detected."""
         with patch('cv2.Canny') as mock_canny, \
-             patch('cv2.HoughLines') as mock_hough, \
+             patch('cv2.HoughLinesP') as mock_hough, \
              patch('app.utils.image_processing.rotate_image') as mock_rotate:
             
             # Mock edge detection
@@ -180,8 +189,8 @@ class TestImageProcessing:
             
             # Mock line detection with significant angle
             mock_hough.return_value = np.array([
-                [[100, np.pi/180 * 95]],  # 5 degree rotation
-                [[120, np.pi/180 * 93]],  # 3 degree rotation
+                [[0, 0, 200, 17]],   # ~5 degree rotation
+                [[200, 10, 0, 0]],   # ~3 degree rotation, reversed endpoints
             ])
             
             rotated_image = np.ones((100, 200, 3), dtype=np.uint8) * 150
@@ -192,12 +201,12 @@ class TestImageProcessing:
             # Should call rotation with average angle (4 degrees)
             mock_rotate.assert_called_once()
             call_args = mock_rotate.call_args[0]
-            assert abs(call_args[1] - 4.0) < 0.1  # Average angle should be ~4 degrees
+            assert abs(call_args[1] - 3.86) < 0.1  # Median angle should be ~4 degrees
     
     def test_correct_rotation_no_lines_detected(self, sample_cv_image):
         """Test rotation correction when no lines are detected."""
         with patch('cv2.Canny') as mock_canny, \
-             patch('cv2.HoughLines') as mock_hough:
+             patch('cv2.HoughLinesP') as mock_hough:
             
             mock_canny.return_value = np.zeros((100, 200), dtype=np.uint8)
             mock_hough.return_value = None  # No lines detected
@@ -210,13 +219,13 @@ class TestImageProcessing:
     def test_correct_rotation_small_angle_ignored(self, sample_cv_image):
         """Test rotation correction ignores small angles."""
         with patch('cv2.Canny') as mock_canny, \
-             patch('cv2.HoughLines') as mock_hough:
+             patch('cv2.HoughLinesP') as mock_hough:
             
             mock_canny.return_value = np.zeros((100, 200), dtype=np.uint8)
             
             # Mock line detection with small angle (< 2 degrees)
             mock_hough.return_value = np.array([
-                [[100, np.pi/180 * 91]],  # 1 degree rotation
+                [[0, 0, 200, 3]],  # ~1 degree rotation
             ])
             
             result = correct_rotation(sample_cv_image)
@@ -224,6 +233,23 @@ class TestImageProcessing:
             # Should return original image for small angles
             np.testing.assert_array_equal(result, sample_cv_image)
     
+    def test_correct_rotation_estimates_on_downscaled_copy(self):
+        """Test that large images are downscaled for angle detection but rotated at full size."""
+        large_image = np.full((1500, 2560), 255, dtype=np.uint8)
+        
+        with patch('cv2.Canny', wraps=cv2.Canny) as mock_canny, \
+             patch('cv2.HoughLinesP') as mock_hough, \
+             patch('app.utils.image_processing.rotate_image') as mock_rotate:
+            
+            mock_hough.return_value = np.array([[[0, 0, 200, 17]]])
+            
+            correct_rotation(large_image)
+            
+            assert mock_canny.call_args[0][0].shape == (375, 640)
+            assert mock_hough.call_args[1]['threshold'] == 25
+            assert mock_rotate.call_args[0][0] is large_image
+            assert abs(mock_rotate.call_args[0][1] - 4.86) < 0.1
+    
     def test_reduce_noise_color_image(self, sample_cv_image):
         """Test noise reduction on color image."""
         with patch('cv2.bilateralFilter') as mock_bilateral:
@@ -284,7 +310,18 @@ class TestImageProcessing:
             args, kwargs = mock_resize.call_args
             
             assert args[1] == (600, 300)  # New width, height
-            assert kwargs['interpolation'] == cv2.INTER_CUBIC
+            assert kwargs['interpolation'] == cv2.INTER_LANCZOS4  # 6x upscale
+    
+    def test_resize_for_ocr_small_upscale_uses_bilinear(self):
+        """Test that upscales of 2x or less use bilinear interpolation."""
+        image = np.ones((200, 400), dtype=np.uint8) * 128
+        
+        result = resize_for_ocr(image, min_height=300)
+        
+        assert result.shape == (300, 600)
+        with patch('cv2.resize', wraps=cv2.resize) as mock_resize:
+            resize_for_ocr(image, min_height=300)
+            assert mock_resize.call_args[1]['interpolation'] == cv2.INTER_LINEAR
     
     def test_resize_for_ocr_large_image_no_change(self):
         """Test that large images are not resized."""
@@ -363,4 +400,19 @@ class TestImageProcessing:
                 result = func(sample_cv_image)
                 
                 # Each function should return original image on error
-                np.testing.assert_array_equal(result, sample_cv_image)
\ No newline at end of file
+                np.testing.assert_array_equal(result, sample_cv_image)
+    
+    def test_decode_grayscale(self, sample_pil_image):
+        """Test decoding encoded image bytes straight to a grayscale array."""
+        ok, encoded = cv2.imencode('.png', np.array(sample_pil_image))
+        assert ok
+        
+        result = decode_grayscale(encoded.tobytes())
+        
+        assert result.shape == (100, 200)
+        assert result.dtype == np.uint8
+    
+    def test_decode_grayscale_invalid_bytes(self):
+        """Test that undecodable bytes raise ValueError."""
+        with pytest.raises(ValueError):
+            decode_grayscale(b'not an image')
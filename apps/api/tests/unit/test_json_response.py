@@ -0,0 +1,87 @@
+"""Unit tests for orjson-backed JSON responses."""
+import uuid
+from datetime import datetime
+from decimal import Decimal
+import pytest
+from flask import Flask
+from app.utils.json_response import error_response, ojsonify
+
+
+class TestOjsonify:
+    """Test the ojsonify response helper."""
+
+    @pytest.fixture
+    def app(self):
+        """Create test Flask app."""
+        app = Flask(__name__)
+        app.config['TESTING'] = True
+        return app
+
+    def test_default_status_and_mimetype(self, app):
+        """Test that responses default to 200 with JSON mimetype."""
+        with app.app_context():
+            response = ojsonify({'message': 'ok'})
+
+        assert response.status_code == 200
+        assert response.mimetype == 'application/json'
+        assert response.get_json() == {'message': 'ok'}
+
+    def test_custom_status(self, app):
+        """Test that a custom status code is applied."""
+        with app.app_context():
+            response = ojsonify({'id': 1}, 201)
+
+        assert response.status_code == 201
+
+    def test_serializes_decimal_datetime_and_uuid(self, app):
+        """Test serialization of types jsonify needs hooks for."""
+        registration_id = uuid.uuid4()
+        with app.app_context():
+            response = ojsonify({
+                'id': registration_id,
+                'weight': Decimal('15.50'),
+                'created_at': datetime(2025, 8, 21, 10, 30)
+            })
+
+        data = response.get_json()
+        assert data['id'] == str(registration_id)
+        assert data['weight'] == 15.5
+        assert data['created_at'] == '2025-08-21T10:30:00'
+
+    def test_unsupported_type_raises(self, app):
+        """Test that unknown types are rejected."""
+        with app.app_context():
+            with pytest.raises(TypeError):
+                ojsonify({'value': object()})
+
+
+class TestErrorResponse:
+    """Test the standard error envelope helper."""
+
+    @pytest.fixture
+    def app(self):
+        """Create test Flask app."""
+        app = Flask(__name__)
+        app.config['TESTING'] = True
+        return app
+
+    def test_error_envelope(self, app):
+        """Test that errors carry code, message, timestamp and request id."""
+        with app.test_request_context(headers={'X-Request-ID': 'req-123'}):
+            response = error_response('VALIDATION_ERROR', 'Name is required', 400)
+
+        error = response.get_json()['error']
+        assert response.status_code == 400
+        assert response.mimetype == 'application/json'
+        assert error['code'] == 'VALIDATION_ERROR'
+        assert error['message'] == 'Name is required'
+        assert error['requestId'] == 'req-123'
+        assert datetime.fromisoformat(error['timestamp'])
+
+    def test_missing_request_id(self, app):
+        """Test that a missing X-Request-ID header is reported as unknown."""
+        with app.test_request_context():
+            response = error_response('INTERNAL_ERROR', 'Internal server error', 500)
+
+        assert response.status_code == 500
+        assert response.get_json()['error']['requestId'] == 'unknown'
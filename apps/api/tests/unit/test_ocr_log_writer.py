@@ -0,0 +1,95 @@
+"""Unit tests for the background OCR log writer."""
+from unittest.mock import MagicMock, patch
+from app.services.ocr_log_writer import OCRLogWriter
+
+
+class TestOCRLogWriter:
+    """Test batching of queued OCR log rows."""
+
+    def test_rows_are_written_in_one_batch(self):
+        """Test that rows queued together are inserted by a single write."""
+        writer = OCRLogWriter(batch_size=200, max_wait_time=0.5)
+        app = object()
+
+        with patch.object(OCRLogWriter, '_write') as mock_write:
+            for i in range(5):
+                writer.submit(app, {'processing_time_ms': i})
+            writer.flush()
+
+        batches = [call[0][0] for call in mock_write.call_args_list]
+        assert sum(len(batch) for batch in batches) == 5
+        assert len(batches) <= 2
+        assert [row['processing_time_ms'] for batch in batches for _, row in batch] == [0, 1, 2, 3, 4]
+
+    def test_batch_size_is_capped(self):
+        """Test that no write exceeds batch_size rows."""
+        writer = OCRLogWriter(batch_size=2, max_wait_time=0.2)
+
+        with patch.object(OCRLogWriter, '_write') as mock_write:
+            for i in range(5):
+                writer.submit(object(), {'processing_time_ms': i})
+            writer.flush()
+
+        sizes = [len(call[0][0]) for call in mock_write.call_args_list]
+        assert sum(sizes) == 5
+        assert max(sizes) <= 2
+
+    def test_flush_returns_after_failed_write(self):
+        """Test that a failing write does not leave flush() blocked."""
+        writer = OCRLogWriter(max_wait_time=0.01)
+
+        with patch.object(OCRLogWriter, '_write', side_effect=RuntimeError('db down')):
+            writer.submit(object(), {'processing_time_ms': 1})
+            writer.flush()
+
+
+class TestOCRLogWriterWrite:
+    """Test how a batch of rows is written to the database."""
+
+    def test_rows_are_grouped_by_app(self):
+        """Test that each app gets one INSERT and one commit for its rows."""
+        app_a, app_b = MagicMock(), MagicMock()
+        batch = [
+            (app_a, {'processing_time_ms': 1}),
+            (app_b, {'processing_time_ms': 2}),
+            (app_a, {'processing_time_ms': 3}),
+        ]
+
+        with patch('app.services.ocr_log_writer.db') as mock_db:
+            OCRLogWriter()._write(batch)
+
+        app_a.app_context.assert_called_once()
+        app_b.app_context.assert_called_once()
+        inserted = [call[0][1] for call in mock_db.session.execute.call_args_list]
+        assert inserted == [
+            [{'processing_time_ms': 1}, {'processing_time_ms': 3}],
+            [{'processing_time_ms': 2}],
+        ]
+        assert mock_db.session.commit.call_count == 2
+        mock_db.session.rollback.assert_not_called()
+
+    def test_failed_insert_is_rolled_back(self):
+        """Test that a failing app's rows are rolled back without blocking the others."""
+        app_a, app_b = MagicMock(), MagicMock()
+        batch = [(app_a, {'processing_time_ms': 1}), (app_b, {'processing_time_ms': 2})]
+
+        with patch('app.services.ocr_log_writer.db') as mock_db:
+            mock_db.session.execute.side_effect = [RuntimeError('db down'), None]
+            OCRLogWriter()._write(batch)
+
+        assert mock_db.session.execute.call_count == 2
+        mock_db.session.rollback.assert_called_once()
+        mock_db.session.commit.assert_called_once()
+
+    def test_exit_flush_is_registered_once(self):
+        """Test that starting the worker registers a bounded flush at exit."""
+        writer = OCRLogWriter(max_wait_time=0.01, exit_flush_timeout=2)
+
+        with patch.object(OCRLogWriter, '_write'), \
+                patch('app.services.background_batch.atexit.register') as mock_register:
+            writer.submit(object(), {'processing_time_ms': 1})
+            writer._worker_pid = None  # as if the process had forked
+            writer.submit(object(), {'processing_time_ms': 2})
+            writer.flush()
+
+        mock_register.assert_called_once_with(writer._flush_at_exit)
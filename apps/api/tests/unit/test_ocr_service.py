@@ -2,11 +2,16 @@
 
 import pytest
 import time
+import uuid
+from io import BytesIO
 from unittest.mock import Mock, patch, MagicMock
+from flask import Flask
+from google.api_core.exceptions import ResourceExhausted
 from PIL import Image
 import numpy as np
 
-from app.services.ocr_service import OCRService
+from app.services.ocr_service import OCRService, _result_cache
+from app.utils.cache import TTLCache
 
 
 class TestOCRService:
@@ -23,6 +28,18 @@ class TestOCRService:
         # Create a simple 100x100 white image
         return Image.new('RGB', (100, 100), 'white')
     
+    @pytest.fixture
+    def mock_image_bytes(self, mock_image):
+        """Encode the mock image as PNG file contents."""
+        buffer = BytesIO()
+        mock_image.save(buffer, format='PNG')
+        return buffer.getvalue()
+    
+    @pytest.fixture(autouse=True)
+    def clear_result_cache(self):
+        """Start every test with an empty OCR result cache."""
+        _result_cache.clear()
+    
     @pytest.fixture
     def sample_weight_text(self):
         """Sample OCR text containing weight information."""
@@ -33,6 +50,23 @@ class TestOCRService:
         assert ocr_service.tesseract_config == '--oem 3 --psm 6 -c tessedit_char_whitelist=0123456789.,KkGg'
         assert hasattr(ocr_service, 'vision_client')
     
+    @patch('google.cloud.vision.ImageAnnotatorClient')
+    def test_vision_client_created_on_first_use(self, mock_client_class):
+        """Test that the Vision client is created lazily, once."""
+        service = OCRService()
+        mock_client_class.assert_not_called()
+        
+        assert service.vision_client is mock_client_class.return_value
+        assert service.vision_client is mock_client_class.return_value
+        mock_client_class.assert_called_once()
+    
+    @patch('google.cloud.vision.ImageAnnotatorClient')
+    def test_vision_client_unavailable(self, mock_client_class):
+        """Test that a failed Vision client creation leaves the client unset."""
+        mock_client_class.side_effect = Exception("No credentials")
+        
+        assert OCRService().vision_client is None
+    
     def test_weight_extraction_with_kg_unit(self, ocr_service):
         """Test weight extraction with kg unit."""
         text = "PESO: 2.5 kg"
@@ -102,8 +136,8 @@ class TestOCRService:
         """Test weight validation rounds to 2 decimal places."""
         assert ocr_service._validate_weight_value(2.56789) == 2.57
     
-    @patch('app.services.ocr_service.requests.get')
-    def test_download_image_remote_url(self, mock_get, ocr_service, mock_image):
+    @patch('app.services.ocr_service._http_session.get')
+    def test_download_image_remote_url(self, mock_get, ocr_service):
         """Test downloading image from remote URL."""
         # Mock successful HTTP response
         mock_response = Mock()
@@ -111,49 +145,69 @@ class TestOCRService:
         mock_response.content = b'fake_image_data'
         mock_get.return_value = mock_response
         
-        with patch('app.services.ocr_service.Image.open') as mock_open:
-            mock_open.return_value = mock_image
-            result = ocr_service._download_image('http://example.com/image.jpg')
-            assert result == mock_image
-            mock_get.assert_called_once_with('http://example.com/image.jpg', timeout=10)
+        result = ocr_service._download_image_bytes('http://example.com/image.jpg')
+        assert result == b'fake_image_data'
+        mock_get.assert_called_once_with('http://example.com/image.jpg', timeout=10)
     
-    @patch('app.services.ocr_service.Image.open')
-    def test_download_image_local_file(self, mock_open, ocr_service, mock_image):
+    def test_download_image_local_file(self, ocr_service, mock_image_bytes, tmp_path):
         """Test loading image from local file URL."""
-        mock_open.return_value = mock_image
-        result = ocr_service._download_image('file:///tmp/test.jpg')
-        assert result == mock_image
-        mock_open.assert_called_once_with('/tmp/test.jpg')
+        image_path = tmp_path / 'test.png'
+        image_path.write_bytes(mock_image_bytes)
+        result = ocr_service._download_image_bytes(f'file://{image_path}')
+        assert result == mock_image_bytes
     
-    @patch('app.services.ocr_service.requests.get')
+    @patch('app.services.ocr_service._http_session.get')
     def test_download_image_failure(self, mock_get, ocr_service):
         """Test image download failure handling."""
         mock_get.side_effect = Exception("Network error")
         
         with pytest.raises(ValueError, match="Failed to load image"):
-            ocr_service._download_image('http://example.com/image.jpg')
+            ocr_service._download_image_bytes('http://example.com/image.jpg')
     
-    @patch('app.services.ocr_service.pytesseract.image_to_string')
-    @patch('app.services.ocr_service.pytesseract.image_to_data')
+    @patch('pytesseract.image_to_string')
+    @patch('pytesseract.image_to_data')
     def test_extract_with_tesseract_success(self, mock_image_to_data, mock_image_to_string, 
                                           ocr_service, mock_image, sample_weight_text):
         """Test successful Tesseract OCR extraction."""
-        mock_image_to_string.return_value = sample_weight_text
         mock_image_to_data.return_value = {
-            'conf': ['85', '90', '95', '80', '75']
+            'text': ['', 'PESO:', '2.5', 'kg', 'Fecha:', '2025-08-21'],
+            'conf': ['-1', '85', '90.5', '95', '80', '74.5'],
+            'block_num': [1, 1, 1, 1, 1, 1],
+            'par_num': [1, 1, 1, 1, 1, 1],
+            'line_num': [0, 1, 1, 1, 2, 2]
         }
         
         result = ocr_service._extract_with_tesseract(mock_image)
         
-        assert result['extracted_text'] == sample_weight_text.strip()
+        assert result['extracted_text'] == 'PESO: 2.5 kg\nFecha: 2025-08-21'
         assert result['extracted_weight'] == 2.5
         assert result['confidence_score'] == 0.85  # Average of confidences / 100
         assert result['ocr_engine'] == 'tesseract'
+        mock_image_to_string.assert_not_called()
+    
+    @patch('pytesseract.image_to_string')
+    @patch('pytesseract.image_to_data')
+    def test_extract_with_tesseract_uses_tesserocr_when_available(self, mock_image_to_data,
+                                                                  mock_image_to_string,
+                                                                  ocr_service, mock_image,
+                                                                  sample_weight_text):
+        """Test that the in-process tesserocr API replaces the pytesseract subprocesses."""
+        ocr_service._tess_api = Mock()
+        ocr_service._tess_api.GetUTF8Text.return_value = sample_weight_text
+        ocr_service._tess_api.AllWordConfidences.return_value = [90, 80, 0]
+        
+        result = ocr_service._extract_with_tesseract(mock_image)
+        
+        assert result['extracted_weight'] == 2.5
+        assert result['confidence_score'] == 0.85
+        ocr_service._tess_api.SetImage.assert_called_once()
+        mock_image_to_string.assert_not_called()
+        mock_image_to_data.assert_not_called()
     
-    @patch('app.services.ocr_service.pytesseract.image_to_string')
-    def test_extract_with_tesseract_failure(self, mock_image_to_string, ocr_service, mock_image):
+    @patch('pytesseract.image_to_data')
+    def test_extract_with_tesseract_failure(self, mock_image_to_data, ocr_service, mock_image):
         """Test Tesseract OCR extraction failure."""
-        mock_image_to_string.side_effect = Exception("Tesseract error")
+        mock_image_to_data.side_effect = Exception("Tesseract error")
         
         result = ocr_service._extract_with_tesseract(mock_image)
         
@@ -162,7 +216,7 @@ class TestOCRService:
         assert result['confidence_score'] == 0.0
         assert result['ocr_engine'] == 'tesseract'
     
-    @patch('app.services.ocr_service.vision.ImageAnnotatorClient')
+    @patch('google.cloud.vision.ImageAnnotatorClient')
     def test_extract_with_google_vision_success(self, mock_client_class, ocr_service, 
                                                mock_image, sample_weight_text):
         """Test successful Google Vision OCR extraction."""
@@ -177,7 +231,7 @@ class TestOCRService:
         mock_response.text_annotations = [mock_annotation]
         mock_response.error.message = ""
         
-        mock_client.text_detection.return_value = mock_response
+        mock_client.batch_annotate_images.return_value = Mock(responses=[mock_response])
         
         # Reinitialize service to use mocked client
         ocr_service.vision_client = mock_client
@@ -188,6 +242,31 @@ class TestOCRService:
         assert result['extracted_weight'] == 2.5
         assert result['confidence_score'] == 0.85
         assert result['ocr_engine'] == 'google_vision'
+        mock_client.batch_annotate_images.assert_called_once()
+        sent = mock_client.batch_annotate_images.call_args[1]['requests'][0]
+        assert sent.image.content[:2] == b'\xff\xd8'  # JPEG start-of-image marker
+    
+    @patch('time.sleep')
+    def test_extract_with_google_vision_retries_quota_errors(self, mock_sleep, ocr_service,
+                                                             mock_image, sample_weight_text):
+        """Test that quota errors from Vision are retried with backoff."""
+        mock_annotation = Mock()
+        mock_annotation.description = sample_weight_text
+        mock_response = Mock()
+        mock_response.text_annotations = [mock_annotation]
+        mock_response.error.message = ""
+        
+        ocr_service.vision_client = Mock()
+        ocr_service.vision_client.batch_annotate_images.side_effect = [
+            ResourceExhausted('Quota exceeded'),
+            Mock(responses=[mock_response])
+        ]
+        
+        result = ocr_service._extract_with_google_vision(mock_image)
+        
+        assert result['extracted_weight'] == 2.5
+        assert ocr_service.vision_client.batch_annotate_images.call_count == 2
+        mock_sleep.assert_called_once()
     
     def test_extract_with_google_vision_no_client(self, ocr_service, mock_image):
         """Test Google Vision extraction when client is unavailable."""
@@ -200,57 +279,55 @@ class TestOCRService:
         assert result['confidence_score'] == 0.0
         assert result['ocr_engine'] == 'google_vision'
     
-    @patch('app.services.ocr_service.OCRProcessingLog')
-    @patch('app.services.ocr_service.db.session')
-    def test_log_ocr_processing_success(self, mock_session, mock_ocr_log, ocr_service):
-        """Test successful OCR processing logging."""
-        mock_log_instance = Mock()
-        mock_ocr_log.return_value = mock_log_instance
-        
-        ocr_service._log_ocr_processing(
-            registration_id='test-id',
-            extracted_text='test text',
-            confidence_score=0.85,
-            processing_time_ms=1500,
-            ocr_engine='tesseract'
-        )
-        
-        mock_ocr_log.assert_called_once_with(
-            registration_id='test-id',
-            extracted_text='test text',
-            confidence_score=0.85,
-            processing_time_ms=1500,
-            ocr_engine='tesseract'
-        )
-        mock_session.add.assert_called_once_with(mock_log_instance)
-        mock_session.commit.assert_called_once()
-    
-    @patch('app.services.ocr_service.OCRProcessingLog')
-    @patch('app.services.ocr_service.db.session')
-    def test_log_ocr_processing_failure(self, mock_session, mock_ocr_log, ocr_service):
-        """Test OCR processing logging failure handling."""
-        mock_session.commit.side_effect = Exception("Database error")
+    @patch('app.services.ocr_service.ocr_log_writer')
+    def test_log_ocr_processing_success(self, mock_writer, ocr_service):
+        """Test that OCR logs are queued for the background writer."""
+        app = Flask(__name__)
+        registration_id = '00000000-0000-0000-0000-000000000001'
         
-        # Should not raise exception, just log error
-        ocr_service._log_ocr_processing(
-            registration_id='test-id',
-            extracted_text='test text',
-            confidence_score=0.85,
-            processing_time_ms=1500,
-            ocr_engine='tesseract'
-        )
+        with app.app_context():
+            ocr_service._log_ocr_processing(
+                registration_id=registration_id,
+                extracted_text='test text',
+                confidence_score=0.85,
+                processing_time_ms=1500,
+                ocr_engine='tesseract'
+            )
         
-        mock_session.rollback.assert_called_once()
+        mock_writer.submit.assert_called_once()
+        submitted_app, row = mock_writer.submit.call_args[0]
+        assert submitted_app is app
+        assert row['registration_id'] == uuid.UUID(registration_id)
+        assert row['extracted_text'] == 'test text'
+        assert row['confidence_score'] == 0.85
+        assert row['processing_time_ms'] == 1500
+        assert row['ocr_engine'] == 'tesseract'
+        assert row['created_at'] is not None
     
-    @patch('app.services.ocr_service.OCRService._download_image')
-    @patch('app.services.ocr_service.preprocess_image_for_ocr')
+    @patch('app.services.ocr_service.ocr_log_writer')
+    def test_log_ocr_processing_failure(self, mock_writer, ocr_service):
+        """Test OCR processing logging failure handling."""
+        with Flask(__name__).app_context():
+            # Should not raise exception, just log error
+            ocr_service._log_ocr_processing(
+                registration_id='not-a-uuid',
+                extracted_text='test text',
+                confidence_score=0.85,
+                processing_time_ms=1500,
+                ocr_engine='tesseract'
+            )
+        
+        mock_writer.submit.assert_not_called()
+    
+    @patch('app.services.ocr_service.OCRService._download_image_bytes')
+    @patch('app.services.ocr_service.preprocess_array_for_ocr')
     @patch('app.services.ocr_service.OCRService._extract_with_tesseract')
     @patch('app.services.ocr_service.OCRService._log_ocr_processing')
     def test_process_image_tesseract_high_confidence(self, mock_log, mock_tesseract, 
                                                    mock_preprocess, mock_download, 
-                                                   ocr_service, mock_image):
+                                                   ocr_service, mock_image, mock_image_bytes):
         """Test image processing with high Tesseract confidence."""
-        mock_download.return_value = mock_image
+        mock_download.return_value = mock_image_bytes
         mock_preprocess.return_value = mock_image
         mock_tesseract.return_value = {
             'extracted_text': 'PESO: 2.5 kg',
@@ -269,16 +346,17 @@ class TestOCRService:
         
         mock_log.assert_called_once()
     
-    @patch('app.services.ocr_service.OCRService._download_image')
-    @patch('app.services.ocr_service.preprocess_image_for_ocr')
+    @patch('app.services.ocr_service.OCRService._download_image_bytes')
+    @patch('app.services.ocr_service.preprocess_array_for_ocr')
     @patch('app.services.ocr_service.OCRService._extract_with_tesseract')
     @patch('app.services.ocr_service.OCRService._extract_with_google_vision')
     @patch('app.services.ocr_service.OCRService._log_ocr_processing')
     def test_process_image_fallback_to_google_vision(self, mock_log, mock_google, 
                                                    mock_tesseract, mock_preprocess, 
-                                                   mock_download, ocr_service, mock_image):
+                                                   mock_download, ocr_service, mock_image,
+                                                   mock_image_bytes):
         """Test image processing fallback to Google Vision for low confidence."""
-        mock_download.return_value = mock_image
+        mock_download.return_value = mock_image_bytes
         mock_preprocess.return_value = mock_image
         
         # Low confidence Tesseract result
@@ -307,7 +385,92 @@ class TestOCRService:
         mock_google.assert_called_once()
         mock_log.assert_called_once()
     
-    @patch('app.services.ocr_service.OCRService._download_image')
+    @patch('app.services.ocr_service._result_cache', TTLCache(maxsize=4, ttl=60))
+    @patch('app.services.ocr_service.OCRService._download_image_bytes')
+    @patch('app.services.ocr_service.preprocess_array_for_ocr')
+    @patch('app.services.ocr_service.OCRService._extract_with_tesseract')
+    def test_process_image_reuses_cached_result(self, mock_tesseract, mock_preprocess,
+                                                mock_download, ocr_service, mock_image,
+                                                mock_image_bytes):
+        """Test that a repeated image skips preprocessing and OCR."""
+        mock_download.return_value = mock_image_bytes
+        mock_preprocess.return_value = mock_image
+        mock_tesseract.return_value = {
+            'extracted_text': 'PESO: 2.5 kg',
+            'extracted_weight': 2.5,
+            'confidence_score': 0.85,
+            'ocr_engine': 'tesseract'
+        }
+        
+        first = ocr_service.process_image('http://example.com/image.jpg')
+        second = ocr_service.process_image('http://example.com/image.jpg')
+        
+        assert mock_tesseract.call_count == 1
+        assert mock_preprocess.call_count == 1
+        assert second['success'] is True
+        for field in ('extracted_text', 'extracted_weight', 'confidence_score', 'ocr_engine'):
+            assert second[field] == first[field]
+    
+    @patch('app.services.ocr_service.redis.Redis.from_url')
+    def test_result_cache_redis_built_from_redis_url(self, mock_from_url, ocr_service):
+        """Test that the result cache's Redis client comes from REDIS_URL, once."""
+        app = Flask(__name__)
+        app.config['REDIS_URL'] = 'redis://cache:6379/2'
+        
+        assert ocr_service._result_cache_redis() is None
+        with app.app_context():
+            assert ocr_service._result_cache_redis() is mock_from_url.return_value
+            assert ocr_service._result_cache_redis() is mock_from_url.return_value
+        # Kept for the process, also outside the app context
+        assert ocr_service._result_cache_redis() is mock_from_url.return_value
+        
+        mock_from_url.assert_called_once_with('redis://cache:6379/2', socket_connect_timeout=0.5,
+                                              socket_timeout=0.5)
+    
+    @patch('app.services.ocr_service.redis.Redis.from_url')
+    def test_result_cache_redis_without_redis_url(self, mock_from_url, ocr_service):
+        """Test that the result cache stays per-process when REDIS_URL is unset."""
+        with Flask(__name__).app_context():
+            assert ocr_service._result_cache_redis() is None
+        
+        mock_from_url.assert_not_called()
+    
+    def test_cached_result_is_shared_through_redis(self, ocr_service):
+        """Test that a result cached by one worker is found by another through Redis."""
+        store = {}
+        redis_client = MagicMock()
+        redis_client.set.side_effect = lambda key, value, ex: store.__setitem__(key, value)
+        redis_client.get.side_effect = store.get
+        ocr_service._redis_client = redis_client
+        result = {
+            'extracted_text': 'PESO: 2.5 kg',
+            'extracted_weight': 2.5,
+            'confidence_score': 0.85,
+            'ocr_engine': 'tesseract'
+        }
+        
+        ocr_service._set_cached_result('abc', result)
+        redis_client.set.assert_called_once_with('ocr:abc', store['ocr:abc'], ex=86400)
+        
+        # Another worker starts with an empty in-process cache
+        _result_cache.clear()
+        assert ocr_service._get_cached_result('abc') == result
+        assert _result_cache.get('abc') is not None
+    
+    def test_redis_cache_errors_are_misses(self, ocr_service):
+        """Test that an unreachable Redis does not fail OCR."""
+        redis_client = MagicMock()
+        redis_client.get.side_effect = ConnectionError('refused')
+        redis_client.set.side_effect = ConnectionError('refused')
+        ocr_service._redis_client = redis_client
+        
+        assert ocr_service._get_cached_result('abc') is None
+        ocr_service._set_cached_result('abc', {
+            'extracted_text': '', 'extracted_weight': None,
+            'confidence_score': 0.0, 'ocr_engine': 'tesseract'
+        })
+    
+    @patch('app.services.ocr_service.OCRService._download_image_bytes')
     def test_process_image_failure(self, mock_download, ocr_service):
         """Test image processing failure handling."""
         mock_download.side_effect = Exception("Download failed")
@@ -321,13 +484,13 @@ class TestOCRService:
         assert 'error' in result
         assert 'processing_time_ms' in result
     
-    def test_performance_timing(self, ocr_service):
+    def test_performance_timing(self, ocr_service, mock_image_bytes):
         """Test that processing time is tracked."""
-        with patch.object(ocr_service, '_download_image') as mock_download, \
-             patch('app.services.ocr_service.preprocess_image_for_ocr') as mock_preprocess, \
+        with patch.object(ocr_service, '_download_image_bytes') as mock_download, \
+             patch('app.services.ocr_service.preprocess_array_for_ocr') as mock_preprocess, \
              patch.object(ocr_service, '_extract_with_tesseract') as mock_tesseract:
             
-            mock_download.return_value = Image.new('RGB', (100, 100), 'white')
+            mock_download.return_value = mock_image_bytes
             mock_preprocess.return_value = Image.new('RGB', (100, 100), 'white')
             mock_tesseract.return_value = {
                 'extracted_text': 'PESO: 2.5 kg',
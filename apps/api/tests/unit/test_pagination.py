@@ -0,0 +1,247 @@
+"""Unit tests for cursor pagination helpers."""
+import base64
+import json
+import uuid
+from datetime import datetime, timezone
+from decimal import Decimal
+from unittest.mock import patch
+import pytest
+from flask import Flask
+from sqlalchemy import Column, DateTime, Integer, Uuid, create_engine
+from sqlalchemy.orm import Session, declarative_base
+from app.utils.pagination import (
+    CURSOR_ORDER_FIELDS, encode_cursor, decode_cursor, apply_cursor_pagination, get_pagination_params,
+    create_pagination_response, get_cursor_value, _parse_datetime
+)
+
+
+class TestCursorEncoding:
+    """Test cursor encode/decode round trips."""
+
+    def test_round_trip(self):
+        """Test that a decoded cursor matches the encoded data."""
+        cursor = encode_cursor({'created_at': '2025-08-21T10:30:00', 'weight': 2.5})
+
+        assert decode_cursor(cursor) == {'created_at': '2025-08-21T10:30:00', 'weight': 2.5}
+
+    def test_non_json_values_use_str(self):
+        """Test that values JSON cannot represent are encoded as strings."""
+        cursor = encode_cursor({'created_at': datetime(2025, 8, 21, 10, 30), 'weight': Decimal('2.50')})
+
+        assert decode_cursor(cursor) == {'created_at': '2025-08-21T10:30:00', 'weight': '2.50'}
+
+    def test_cursor_is_url_safe_without_padding(self):
+        """Test that cursors need no percent-encoding in a query string."""
+        cursor = encode_cursor({'id': '>>>???'})
+
+        assert '=' not in cursor
+        assert '+' not in cursor and '/' not in cursor
+        assert decode_cursor(cursor) == {'id': '>>>???'}
+
+    def test_decodes_legacy_standard_base64_cursor(self):
+        """Test that padded standard base64 cursors still decode."""
+        legacy = base64.b64encode(json.dumps({'id': '>>>???'}).encode()).decode()
+
+        assert decode_cursor(legacy) == {'id': '>>>???'}
+
+    def test_parse_datetime_accepts_z_suffix(self):
+        """Test that UTC cursor values written with Z parse as aware datetimes."""
+        assert _parse_datetime('2025-08-21T10:30:00Z') == datetime(2025, 8, 21, 10, 30, tzinfo=timezone.utc)
+
+    @pytest.mark.parametrize('cursor', ['not-base64!', 'bm90IGpzb24=', 'Zm9vé'])
+    def test_invalid_cursor_returns_none(self, cursor):
+        """Test that malformed cursors decode to None."""
+        assert decode_cursor(cursor) is None
+
+
+Base = declarative_base()
+
+
+class Item(Base):
+    """Minimal paginated model."""
+    __tablename__ = 'items'
+
+    id = Column(Integer, primary_key=True)
+    created_at = Column(DateTime, nullable=False)
+
+
+class UuidItem(Base):
+    """Paginated model with a UUID primary key, like the app's models."""
+    __tablename__ = 'uuid_items'
+
+    id = Column(Uuid, primary_key=True)
+    created_at = Column(DateTime, nullable=False)
+
+
+class TestApplyCursorPagination:
+    """Test keyset pagination in apply_cursor_pagination."""
+
+    @pytest.fixture(autouse=True)
+    def sortable_item(self):
+        """Allow paginating the test model on created_at."""
+        with patch.dict(CURSOR_ORDER_FIELDS, {
+            Item: {'created_at': (Item.created_at, _parse_datetime)},
+            UuidItem: {'created_at': (UuidItem.created_at, _parse_datetime)},
+        }):
+            yield
+
+    @pytest.fixture
+    def session(self):
+        """In-memory database with five rows, three sharing a timestamp."""
+        engine = create_engine('sqlite://')
+        Base.metadata.create_all(engine)
+        with Session(engine) as session:
+            session.add_all([
+                Item(id=1, created_at=datetime(2025, 8, 21, 10)),
+                Item(id=2, created_at=datetime(2025, 8, 21, 11)),
+                Item(id=3, created_at=datetime(2025, 8, 21, 11)),
+                Item(id=4, created_at=datetime(2025, 8, 21, 11)),
+                Item(id=5, created_at=datetime(2025, 8, 21, 12)),
+            ])
+            session.commit()
+            yield session
+
+    def _walk(self, session, order_dir):
+        """Collect ids across every page of size two."""
+        ids, cursor = [], None
+        while True:
+            items, cursor, has_next = apply_cursor_pagination(
+                session.query(Item), Item, cursor=cursor, limit=2, order_dir=order_dir
+            )
+            ids.extend(item.id for item in items)
+            if not has_next:
+                return ids
+
+    @pytest.mark.parametrize('order_dir,expected', [
+        ('desc', [5, 4, 3, 2, 1]),
+        ('asc', [1, 2, 3, 4, 5]),
+    ])
+    def test_pages_through_duplicate_timestamps(self, session, order_dir, expected):
+        """Test that rows sharing a timestamp are neither skipped nor repeated."""
+        assert self._walk(session, order_dir) == expected
+
+    def test_legacy_cursor_without_id(self, session):
+        """Test that cursors without an id still filter on the order field."""
+        cursor = encode_cursor({'created_at': '2025-08-21T11:00:00'})
+
+        items, _, has_next = apply_cursor_pagination(session.query(Item), Item, cursor=cursor)
+
+        assert [item.id for item in items] == [1]
+        assert has_next is False
+
+    def test_cursor_extra_is_carried_to_next_page(self, session):
+        """Test that extra values ride along in the next cursor."""
+        _, next_cursor, _ = apply_cursor_pagination(
+            session.query(Item), Item, limit=2, cursor_extra={'totals': {'count': 5}}
+        )
+
+        assert get_cursor_value(next_cursor, 'totals') == {'count': 5}
+
+    @pytest.mark.parametrize('cursor', [None, '', 'not-base64!', encode_cursor(['list'])])
+    def test_get_cursor_value_without_valid_cursor(self, cursor):
+        """Test that missing or malformed cursors carry nothing."""
+        assert get_cursor_value(cursor, 'totals') is None
+
+    @patch('app.utils.pagination.decode_cursor')
+    def test_first_page_skips_cursor_decode(self, mock_decode, session):
+        """Test that no cursor means no decode."""
+        items, next_cursor, has_next = apply_cursor_pagination(session.query(Item), Item, limit=2)
+
+        assert [item.id for item in items] == [5, 4]
+        assert decode_cursor(next_cursor) == {'created_at': '2025-08-21T11:00:00', 'id': 4}
+        mock_decode.assert_not_called()
+
+    @patch('app.utils.pagination.encode_cursor')
+    def test_generate_next_cursor_false_skips_encode(self, mock_encode, session):
+        """Test that callers needing a single page get no cursor."""
+        items, next_cursor, has_next = apply_cursor_pagination(
+            session.query(Item), Item, limit=2, generate_next_cursor=False
+        )
+
+        assert len(items) == 2
+        assert has_next is True
+        assert next_cursor is None
+        mock_encode.assert_not_called()
+
+    def test_rejects_unlisted_order_field(self, session):
+        """Test that only allowlisted columns can be sorted on."""
+        with pytest.raises(ValueError):
+            apply_cursor_pagination(session.query(Item), Item, order_by='id')
+
+    def test_unparseable_cursor_value_is_ignored(self, session):
+        """Test that a tampered cursor value falls back to the first page."""
+        cursor = encode_cursor({'created_at': 'yesterday', 'id': 4})
+
+        items, _, _ = apply_cursor_pagination(session.query(Item), Item, cursor=cursor, limit=2)
+
+        assert [item.id for item in items] == [5, 4]
+
+    @pytest.mark.parametrize('cursor_id', [5, ['a'], {'a': 1}, 'not-a-uuid'])
+    def test_tampered_uuid_cursor_id_is_ignored(self, session, cursor_id):
+        """Test that a cursor id that is not a UUID string falls back to the first page."""
+        session.add(UuidItem(id=uuid.uuid4(), created_at=datetime(2025, 8, 21, 10)))
+        session.commit()
+        cursor = encode_cursor({'created_at': '2025-08-21T11:00:00', 'id': cursor_id})
+
+        items, _, _ = apply_cursor_pagination(session.query(UuidItem), UuidItem, cursor=cursor)
+
+        assert len(items) == 1
+
+    @pytest.mark.parametrize('cursor_data', [['created_at'], 'created_at'])
+    def test_non_object_cursor_is_ignored(self, session, cursor_data):
+        """Test that a cursor that is not a JSON object falls back to the first page."""
+        cursor = encode_cursor(cursor_data)
+
+        items, _, _ = apply_cursor_pagination(session.query(Item), Item, cursor=cursor, limit=2)
+
+        assert [item.id for item in items] == [5, 4]
+
+
+class TestGetPaginationParams:
+    """Test pagination query string parsing."""
+
+    @pytest.mark.parametrize('query_string,expected', [
+        ('', 20),
+        ('limit=50', 50),
+        ('limit=0', 1),
+        ('limit=500', 100),
+        ('limit=abc', 20),
+    ])
+    def test_limit_is_clamped(self, query_string, expected):
+        """Test that limit is clamped to 1-100 with a default of 20."""
+        with Flask(__name__).test_request_context(f'/?{query_string}'):
+            assert get_pagination_params()['limit'] == expected
+
+    def test_defaults(self):
+        """Test defaults when no parameters are sent."""
+        with Flask(__name__).test_request_context('/'):
+            assert get_pagination_params() == {
+                'cursor': None, 'limit': 20, 'order_by': 'created_at', 'order_dir': 'desc'
+            }
+
+
+class TestCreatePaginationResponse:
+    """Test page serialization in create_pagination_response."""
+
+    def test_uses_to_dict(self):
+        """Test that model instances are serialized with to_dict()."""
+        items = [Item(id=1), Item(id=2)]
+        with patch.object(Item, 'to_dict', lambda self: {'id': self.id}, create=True):
+            response = create_pagination_response(items, 'next', True, total_count=5)
+
+        assert response == {
+            'items': [{'id': 1}, {'id': 2}],
+            'pagination': {'has_next': True, 'next_cursor': 'next', 'count': 2, 'total_count': 5}
+        }
+
+    def test_custom_serializer(self):
+        """Test that an explicit serializer is applied to every item."""
+        response = create_pagination_response([{'id': 1}], None, False, serialize=lambda row: row['id'])
+
+        assert response['items'] == [1]
+
+    def test_plain_items_pass_through(self):
+        """Test that items without to_dict() are returned as-is."""
+        response = create_pagination_response([{'id': 1}], None, False)
+
+        assert response['items'] == [{'id': 1}]
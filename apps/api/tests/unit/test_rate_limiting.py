@@ -1,9 +1,10 @@
 """Unit tests for rate limiting functionality."""
 import pytest
 import time
+import threading
 from unittest.mock import patch, MagicMock
 from flask import Flask
-from app.utils.rate_limiting import InMemoryRateLimiter, rate_limit, get_client_key
+from app.utils.rate_limiting import InMemoryRateLimiter, rate_limit, get_client_key, _request_rate_limit_key
 from app.routes.registrations import registrations_bp
 
 
@@ -77,16 +78,68 @@ class TestInMemoryRateLimiter:
             
             # Check time until reset
             mock_time.return_value = 130  # 30 seconds later
-            reset_time = limiter.time_until_reset('user:123', window_seconds=60)
+            reset_time = limiter.time_until_reset('user:123', limit=1, window_seconds=60)
             
             # Should have 30 seconds left (160 - 130)
             assert reset_time == 30
     
+    def test_tokens_refill_gradually(self):
+        """Test that spent tokens come back at limit / window per second."""
+        limiter = InMemoryRateLimiter()
+        
+        with patch('app.utils.rate_limiting.time.time') as mock_time:
+            mock_time.return_value = 0
+            for i in range(6):
+                limiter.is_allowed('user:123', limit=6, window_seconds=60)
+            assert not limiter.is_allowed('user:123', limit=6, window_seconds=60)
+            assert limiter.time_until_reset('user:123', limit=6, window_seconds=60) == 10
+            
+            # One token every 10 seconds
+            mock_time.return_value = 10
+            assert limiter.is_allowed('user:123', limit=6, window_seconds=60)
+            assert not limiter.is_allowed('user:123', limit=6, window_seconds=60)
+    
+    def test_concurrent_requests_share_one_limit(self):
+        """Test that concurrent threads never exceed the limit for a key."""
+        limiter = InMemoryRateLimiter()
+        results = []
+        
+        def worker():
+            for i in range(50):
+                results.append(limiter.is_allowed('user:123', limit=100, window_seconds=3600))
+        
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert results.count(True) == 100
+    
+    def test_check_returns_retry_after(self):
+        """Test that a rejected check reports when the next token arrives."""
+        limiter = InMemoryRateLimiter()
+        
+        with patch('app.utils.rate_limiting.time.time') as mock_time:
+            mock_time.return_value = 0
+            assert limiter.check('user:123', limit=2, window_seconds=60) == (True, 0)
+            assert limiter.check('user:123', limit=2, window_seconds=60) == (True, 30)
+            assert limiter.check('user:123', limit=2, window_seconds=60) == (False, 30)
+    
+    def test_evicts_least_recently_seen_keys(self):
+        """Test that the key map stays bounded."""
+        limiter = InMemoryRateLimiter(max_keys=16)
+        
+        for i in range(1000):
+            limiter.is_allowed(f'ip:{i}', limit=5, window_seconds=60)
+        
+        assert sum(len(buckets) for _, buckets in limiter.shards) <= 16
+    
     def test_empty_key_reset_time(self):
         """Test reset time for key with no requests."""
         limiter = InMemoryRateLimiter()
         
-        reset_time = limiter.time_until_reset('unknown:key', window_seconds=60)
+        reset_time = limiter.time_until_reset('unknown:key', limit=1, window_seconds=60)
         assert reset_time == 0
 
 
@@ -141,8 +194,7 @@ class TestRateLimitDecorator:
         mock_request.headers.get.return_value = 'test-id'
         
         # Mock rate limiter to return False (over limit)
-        mock_limiter.is_allowed.return_value = False
-        mock_limiter.time_until_reset.return_value = 30
+        mock_limiter.check.return_value = (False, 30)
         
         @app.route('/test')
         @rate_limit(limit=5, window=60, per='user')
@@ -180,6 +232,27 @@ class TestRateLimitDecorator:
                 assert response.status_code == 200
 
 
+class TestRequestRateLimitKey:
+    """Test per-request caching of rate limit keys."""
+    
+    def test_key_derived_once_per_request(self):
+        """Test that stacked decorators reuse the key derived for the request."""
+        app = Flask(__name__)
+        
+        mock_user = MagicMock(is_authenticated=True, id='user-123')
+        
+        with patch('app.utils.rate_limiting.current_user', new=mock_user):
+            with app.test_request_context(environ_base={'REMOTE_ADDR': '10.0.0.1'}):
+                assert _request_rate_limit_key('user') == 'user:user-123'
+                mock_user.id = 'changed'
+                assert _request_rate_limit_key('user') == 'user:user-123'
+                assert _request_rate_limit_key('ip') == 'ip:10.0.0.1'
+            
+            # The next request derives its own key
+            with app.test_request_context():
+                assert _request_rate_limit_key('user') == 'user:changed'
+
+
 class TestGetClientKey:
     """Test the get_client_key utility function."""
     
@@ -234,8 +307,7 @@ class TestRateLimitIntegration:
         mock_user.id = 'supervisor-123'
         
         # Mock rate limiter to block request
-        mock_limiter.is_allowed.return_value = False
-        mock_limiter.time_until_reset.return_value = 45
+        mock_limiter.check.return_value = (False, 45)
         
         # Make request to stats endpoint
         response = client.get('/api/v1/registrations/stats')
@@ -248,7 +320,7 @@ class TestRateLimitIntegration:
         assert data['error']['retry_after'] == 46  # 45 + 1
         
         # Verify rate limiter was called with correct parameters
-        mock_limiter.is_allowed.assert_called_once_with('user:supervisor-123', 30, 60)
+        mock_limiter.check.assert_called_once_with('user:supervisor-123', 30, 60)
     
     @patch('app.routes.registrations.current_user')
     @patch('app.routes.registrations.WeightRegistration')
@@ -263,8 +335,7 @@ class TestRateLimitIntegration:
         mock_user.id = 'operator-456'
         
         # Mock rate limiter to block request
-        mock_limiter.is_allowed.return_value = False
-        mock_limiter.time_until_reset.return_value = 30
+        mock_limiter.check.return_value = (False, 30)
         
         # Make request to search endpoint
         response = client.get('/api/v1/registrations/search?q=test')
@@ -273,7 +344,7 @@ class TestRateLimitIntegration:
         assert response.status_code == 429
         
         # Verify rate limiter was called with correct parameters for search
-        mock_limiter.is_allowed.assert_called_once_with('user:operator-456', 60, 60)
+        mock_limiter.check.assert_called_once_with('user:operator-456', 60, 60)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,53 @@
+"""Unit tests for user request validation."""
+import pytest
+from app.routes.users import _validate_user_fields
+
+
+class TestValidateUserFields:
+    """Test single-pass validation of user request bodies."""
+
+    def test_normalizes_name_and_role(self):
+        """Test that name is stripped and role lower-cased."""
+        fields, message = _validate_user_fields(
+            {'name': '  Juan Pérez ', 'role': ' Supervisor '}, required=('name', 'role')
+        )
+
+        assert message is None
+        assert fields == {'name': 'Juan Pérez', 'role': 'supervisor'}
+
+    @pytest.mark.parametrize('data,expected', [
+        ({'role': 'operator'}, 'Name is required'),
+        ({'name': 'Juan'}, 'Role is required'),
+        ({'name': 'J', 'role': 'operator'}, 'Name must be between 2 and 255 characters'),
+        ({'name': 42, 'role': 'operator'}, 'Name must be between 2 and 255 characters'),
+        ({'name': 'Juan', 'role': 'admin'}, 'Role must be one of: operator, supervisor'),
+        ({'name': 'Juan', 'role': 1}, 'Role must be one of: operator, supervisor'),
+    ])
+    def test_create_errors(self, data, expected):
+        """Test the first invalid field is reported."""
+        fields, message = _validate_user_fields(data, required=('name', 'role'))
+
+        assert fields is None
+        assert message == expected
+
+    def test_partial_update_returns_only_present_fields(self):
+        """Test that updates only include the fields sent."""
+        fields, message = _validate_user_fields({'active': False})
+
+        assert message is None
+        assert fields == {'active': False}
+
+    def test_active_must_be_boolean(self):
+        """Test that non-boolean active values are rejected."""
+        fields, message = _validate_user_fields({'active': 'yes'})
+
+        assert fields is None
+        assert message == 'Active must be a boolean value'
+
+    @pytest.mark.parametrize('data', [None, [], 'name'])
+    def test_body_must_be_object(self, data):
+        """Test that non-object JSON bodies are rejected."""
+        fields, message = _validate_user_fields(data)
+
+        assert fields is None
+        assert message == 'Request body must be a JSON object'
@@ -0,0 +1,76 @@
+"""Unit tests for Google Vision request batching."""
+import threading
+import pytest
+from app.services.vision_batch import VisionBatcher
+
+
+class TestVisionBatcher:
+    """Test coalescing of concurrent Vision requests."""
+
+    def test_single_request(self):
+        """Test that a lone request is sent in a batch of one."""
+        calls = []
+
+        def annotate_batch(contents):
+            calls.append(contents)
+            return [content.upper() for content in contents]
+
+        batcher = VisionBatcher(annotate_batch, max_wait_time=0.01)
+
+        assert batcher.annotate(b'label') == b'LABEL'
+        assert calls == [[b'label']]
+
+    def test_concurrent_requests_share_a_batch(self):
+        """Test that requests arriving together are sent in one call."""
+        calls = []
+        release = threading.Event()
+
+        def annotate_batch(contents):
+            calls.append(list(contents))
+            return [content.upper() for content in contents]
+
+        batcher = VisionBatcher(annotate_batch, max_batch_size=16, max_wait_time=0.5)
+        results = {}
+
+        def submit(name):
+            release.wait()
+            results[name] = batcher.annotate(name)
+
+        threads = [threading.Thread(target=submit, args=(f'img{i}'.encode(),)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        assert len(calls) == 1
+        assert sorted(calls[0]) == [b'img0', b'img1', b'img2', b'img3']
+        assert results == {f'img{i}'.encode(): f'IMG{i}'.encode() for i in range(4)}
+
+    def test_batch_size_is_capped(self):
+        """Test that no batch exceeds max_batch_size."""
+        sizes = []
+
+        def annotate_batch(contents):
+            sizes.append(len(contents))
+            return list(contents)
+
+        batcher = VisionBatcher(annotate_batch, max_batch_size=2, max_wait_time=0.2)
+        threads = [threading.Thread(target=batcher.annotate, args=(b'x',)) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert sum(sizes) == 5
+        assert max(sizes) <= 2
+
+    def test_batch_failure_is_raised_to_caller(self):
+        """Test that a failed batch call raises in every waiting caller."""
+        def annotate_batch(contents):
+            raise RuntimeError('quota exceeded')
+
+        batcher = VisionBatcher(annotate_batch, max_wait_time=0.01)
+
+        with pytest.raises(RuntimeError, match='quota exceeded'):
+            batcher.annotate(b'label')